@@ -0,0 +1,48 @@
+from injector import Binder, Module, provider, singleton
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from pylekhagaar.app_settings import AppSettings
+from pylekhagaar.core.contracts.idocument_async_repository import IDocumentAsyncRepository
+from pylekhagaar.modules.document.document_async_repository_impl import DocumentAsyncRepositoryImpl
+
+
+# Connections kept open in the async pool, and extra ones opened under bursts of requests
+ASYNC_POOL_SIZE = 20
+ASYNC_MAX_OVERFLOW = 40
+
+# Seconds a request waits for a pooled connection before failing
+ASYNC_POOL_TIMEOUT = 10
+
+# Connections are replaced after this many seconds, before servers or proxies drop them
+ASYNC_POOL_RECYCLE = 1800
+
+
+class AsyncDatabaseModule(Module):
+    """
+    Binds the asynchronous engine (e.g. postgresql+asyncpg, or sqlite+aiosqlite in tests), its session
+    factory and the async repositories. The database URL comes from AppSettings.ASYNC_DATABASE_URL.
+    """
+
+    def configure(self, binder: Binder) -> None:
+        binder.bind(IDocumentAsyncRepository, to=DocumentAsyncRepositoryImpl)
+
+    @singleton
+    @provider
+    def provide_engine(self) -> AsyncEngine:
+        url = make_url(AppSettings().ASYNC_DATABASE_URL)
+        if url.get_backend_name() == "sqlite":
+            return create_async_engine(url)
+
+        return create_async_engine(
+            url,
+            pool_size=ASYNC_POOL_SIZE,
+            max_overflow=ASYNC_MAX_OVERFLOW,
+            pool_timeout=ASYNC_POOL_TIMEOUT,
+            pool_recycle=ASYNC_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+
+    @singleton
+    @provider
+    def provide_session_factory(self, engine: AsyncEngine) -> async_sessionmaker:
+        return async_sessionmaker(engine, expire_on_commit=False)
@@ -0,0 +1,15 @@
+from fastapi_injector import request_scope
+from injector import Binder, Module
+from pylekhagaar.core.contracts.iasync_storage_provider_factory import IAsyncStorageProviderFactory
+from pylekhagaar.modules.document.async_storage_provider_factory_impl import AsyncStorageProviderFactoryImpl
+
+
+class AsyncStorageModule(Module):
+    """
+    Binds the factory of the asynchronous storage providers used by document_async_router, once per
+    request so its providers are shared by the calls of a request. DocumentServiceImpl depends on it,
+    so install it, together with AsyncDatabaseModule, wherever the service is used.
+    """
+
+    def configure(self, binder: Binder) -> None:
+        binder.bind(IAsyncStorageProviderFactory, to=AsyncStorageProviderFactoryImpl, scope=request_scope)
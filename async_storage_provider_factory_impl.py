@@ -0,0 +1,56 @@
+import uuid
+import anyio
+from fastapi_injector import Injected
+from injector import inject
+from pylekhagaar.core.contracts.iasync_storage_provider import IAsyncStorageProvider
+from pylekhagaar.core.contracts.iasync_storage_provider_factory import IAsyncStorageProviderFactory
+from pylekhagaar.core.contracts.idocument_storage_type_repository import IDocStorageTypeRepository
+from pylekhagaar.core.enum.storage_type_enum import StorageTypeEnum
+from pylekhagaar.modules.document.azure_blob_async_storage_provider_impl import AzureBlobAsyncStorageProviderImpl
+from pylekhagaar.modules.document.local_file_async_storage_provider_impl import LocalFileAsyncStorageProviderImpl
+from pycrud.core.contracts.icrud_logger import ICrudLogger
+from pycrud.core.exceptions.not_found_exception import NotFoundException
+
+
+# Asynchronous provider implementing each storage type
+ASYNC_STORAGE_PROVIDERS: dict[StorageTypeEnum, type[IAsyncStorageProvider]] = {
+    StorageTypeEnum.AZURE_BLOB: AzureBlobAsyncStorageProviderImpl,
+    StorageTypeEnum.LOCAL_FS: LocalFileAsyncStorageProviderImpl,
+}
+
+
+class AsyncStorageProviderFactoryImpl(IAsyncStorageProviderFactory):
+    """ Builds asynchronous storage providers from their DocStorageType rows, once per storage and request. """
+
+    @inject
+    def __init__(self,
+                 storage_type_repository: IDocStorageTypeRepository = Injected(IDocStorageTypeRepository),
+                 logger: ICrudLogger = Injected(ICrudLogger),
+                 ):
+        self._storage_type_repository = storage_type_repository
+        self._crud_logger = logger
+        self._providers: dict[uuid.UUID, IAsyncStorageProvider] = {}
+
+
+    async def get_storage_provider(self, storage_id: uuid.UUID) -> IAsyncStorageProvider:
+        """ Get the initialized asynchronous storage provider of a storage.
+        :param storage_id: Id of the DocStorageType to get the provider of.
+        :return: An instance of IAsyncStorageProvider.
+        """
+        provider = self._providers.get(storage_id)
+        if provider is not None:
+            return provider
+
+        # The storage type repository is synchronous, so its lookup runs on a worker thread
+        storage_type = await anyio.to_thread.run_sync(self._storage_type_repository.get_by_id, storage_id)
+        if storage_type is None:
+            raise NotFoundException(detail=f"Storage not found for ID: {storage_id}")
+
+        provider_class = ASYNC_STORAGE_PROVIDERS.get(storage_type.storageType)
+        if provider_class is None:
+            raise ValueError(f"Storage type {storage_type.storageType} has no asynchronous provider")
+
+        provider = provider_class(logger=self._crud_logger)
+        await provider.initialize(storage_type)
+        self._providers[storage_id] = provider
+        return provider
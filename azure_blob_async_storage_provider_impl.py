@@ -0,0 +1,182 @@
+from typing import AsyncIterator
+from fastapi import UploadFile
+from fastapi_injector import Injected
+from injector import inject
+from azure.core.exceptions import ResourceExistsError
+from azure.storage.blob.aio import BlobServiceClient
+from pylekhagaar.core.contracts.iasync_storage_provider import IAsyncStorageProvider
+from pylekhagaar.core.contracts.istorage_provider import DocumentContentProperties
+from pylekhagaar.core.enum.storage_type_enum import StorageTypeEnum
+from pylekhagaar.core.schemas.document import Document
+from pylekhagaar.core.schemas.storage_type import DocStorageType
+from pylekhagaar.helpers.helper_functions import LRUCache, decompress_chunks_async, guess_mime
+from pycrud.core.contracts.icrud_logger import ICrudLogger
+
+
+# Size of each ranged GET issued while streaming a blob, overridable per storage
+# through configParam["download_chunk_size"]
+DEFAULT_DOWNLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Uploads are sent in blocks of this size, overridable through configParam["upload_block_size"]
+DEFAULT_UPLOAD_BLOCK_SIZE = 8 * 1024 * 1024
+
+# Number of blocks uploaded concurrently, overridable through configParam["upload_max_concurrency"]
+DEFAULT_UPLOAD_MAX_CONCURRENCY = 4
+
+# Clients evicted while requests may still use them, closed by close_service_clients
+_RETIRED_CLIENTS: list[BlobServiceClient] = []
+
+# Initialized asynchronous clients shared by every provider instance built from the same client
+# settings, keeping their connection pools warm. They are keyed on the connection string and chunk
+# sizes, so storages sharing an account with different settings do not replace each other's client.
+# They are bound to the event loop of the worker.
+_SERVICE_CLIENTS: LRUCache[tuple[str, int, int], BlobServiceClient] = LRUCache(
+    max_entries=32, on_evict=lambda _, client: _RETIRED_CLIENTS.append(client))
+
+
+async def close_service_clients() -> None:
+    """ Close the shared asynchronous clients and their connection pools. Registered as a shutdown
+    handler of document_async_router. """
+    clients = _SERVICE_CLIENTS.drain()
+    clients.extend(_RETIRED_CLIENTS)
+    _RETIRED_CLIENTS.clear()
+    for client in clients:
+        await client.close()
+
+# Containers already known to exist, so create_container is only sent once per container
+_ENSURED_CONTAINERS: LRUCache[tuple[str, str, str], bool] = LRUCache(max_entries=256, ttl_seconds=3600)
+
+
+class AzureBlobAsyncStorageProviderImpl(IAsyncStorageProvider):
+    """ Transfers document content to and from Azure Blob Storage with azure.storage.blob.aio. """
+
+    @inject
+    def __init__(self, logger: ICrudLogger = Injected(ICrudLogger)):
+        self._logger = logger.get_logger(__name__)
+
+
+    @property
+    def storage_type(self) -> StorageTypeEnum:
+        return StorageTypeEnum.AZURE_BLOB
+
+    async def initialize(self, storage_type: DocStorageType) -> None:
+        assert storage_type.storageType == StorageTypeEnum.AZURE_BLOB
+
+        config = storage_type.configParam
+        container_name = config.get("container_name", "documents")
+        self._download_chunk_size = int(config.get("download_chunk_size", DEFAULT_DOWNLOAD_CHUNK_SIZE))
+        self._upload_block_size = int(config.get("upload_block_size", DEFAULT_UPLOAD_BLOCK_SIZE))
+        self._upload_max_concurrency = int(config.get("upload_max_concurrency", DEFAULT_UPLOAD_MAX_CONCURRENCY))
+
+        self.blob_service_client = self._get_service_client(config)
+        self.container_client = self.blob_service_client.get_container_client(container_name)
+
+        # Ensure container exists
+        container_key = (config["AccountName"], config["BlobEndpoint"], container_name)
+        if not _ENSURED_CONTAINERS.get(container_key):
+            try:
+                await self.container_client.create_container()
+            except ResourceExistsError:
+                pass
+            _ENSURED_CONTAINERS.put(container_key, True)
+
+        self._logger.info("Initialized async Azure Blob Storage Provider")
+
+
+    async def write_document_content(self, document: Document, source_file_location: UploadFile) -> Document:
+        """ Upload a file to the document's blob, sending up to `upload_max_concurrency` blocks at a time.
+        :param document: The Document the content belongs to.
+        :param source_file: UploadFile object containing the file to upload.
+        :return: The Document with name, mime_type, physical_path and content properties set.
+        """
+        blob_name = f"{document.id}/{source_file_location.filename}"
+        blob_client = self.container_client.get_blob_client(blob_name)
+
+        size = 0
+
+        async def blocks() -> AsyncIterator[bytes]:
+            nonlocal size
+            while block := await source_file_location.read(self._upload_block_size):
+                size += len(block)
+                yield block
+
+        await source_file_location.seek(0)
+        response = await blob_client.upload_blob(blocks(), overwrite=True, max_concurrency=self._upload_max_concurrency)
+
+        DocumentContentProperties(size=size, etag=response["etag"], last_modified=response["last_modified"]).record_on(document)
+        document.physical_path = blob_name
+        document.name = source_file_location.filename
+        document.mime_type = guess_mime(source_file_location.filename)
+        document.content_hash = None
+        document.content_codec = None
+        return document
+
+
+    async def get_document_content(self, document: Document,
+                                   decompress: bool = True) -> tuple[AsyncIterator[bytes], str]:
+        """ Get the file content of a document, streamed in chunks of `download_chunk_size` bytes.
+        :param document: The already loaded Document to read.
+        :param decompress: Whether compressed content is decoded while it is streamed.
+        :return: Tuple containing an asynchronous iterator over the file content and the filename.
+        """
+        blob_client = self.container_client.get_blob_client(document.physical_path)
+        downloader = await blob_client.download_blob()
+        chunks = downloader.chunks()
+        if decompress and document.content_codec:
+            chunks = decompress_chunks_async(chunks, document.content_codec)
+        return chunks, document.name
+
+
+    async def get_document_content_properties(self, document: Document) -> DocumentContentProperties:
+        """ Get the size and validators of a document's blob without downloading it.
+        :param document: The already loaded Document.
+        :return: DocumentContentProperties built from the blob properties.
+        """
+        blob_properties = await self.container_client.get_blob_client(document.physical_path).get_blob_properties()
+        return DocumentContentProperties(
+            size=blob_properties.size,
+            etag=blob_properties.etag,
+            last_modified=blob_properties.last_modified,
+        )
+
+
+    async def get_document_content_range(self, document: Document, offset: int, length: int) -> AsyncIterator[bytes]:
+        """ Get a byte range of a document's blob with an offset/length download.
+        :param document: The already loaded Document.
+        :param offset: Position of the first byte to return.
+        :param length: Number of bytes to return.
+        :return: Asynchronous iterator over the requested bytes.
+        """
+        blob_client = self.container_client.get_blob_client(document.physical_path)
+        downloader = await blob_client.download_blob(offset=offset, length=length)
+        async for chunk in downloader.chunks():
+            yield chunk
+
+
+    def _get_service_client(self, config: dict) -> BlobServiceClient:
+        """
+        Return the shared asynchronous BlobServiceClient built from the same connection string
+        and chunk sizes, building a new one if none is cached.
+        """
+        conn_str = (
+            f"DefaultEndpointsProtocol={config['DefaultEndpointsProtocol']};"
+            f"AccountName={config['AccountName']};"
+            f"AccountKey={config['AccountKey']};"
+            f"BlobEndpoint={config['BlobEndpoint']};"
+        )
+        client_key = (conn_str, self._download_chunk_size, self._upload_block_size)
+
+        cached = _SERVICE_CLIENTS.get(client_key)
+        if cached is not None:
+            return cached
+
+        blob_service_client = BlobServiceClient.from_connection_string(
+            conn_str,
+            max_single_get_size=self._download_chunk_size,
+            max_chunk_get_size=self._download_chunk_size,
+            max_single_put_size=self._upload_block_size,
+            max_block_size=self._upload_block_size,
+        )
+        _SERVICE_CLIENTS.put(client_key, blob_service_client)
+        self._logger.info(f"Created async Azure Blob client for account {config['AccountName']}")
+        return blob_service_client
@@ -1,5 +1,12 @@
-from io import BytesIO
-from typing import BinaryIO
+import base64
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import os
+from pathlib import Path
+import threading
+import time
+from typing import BinaryIO, Iterator
 from uuid import UUID
 from fastapi import UploadFile
 from fastapi_injector import Injected
@@ -8,18 +15,63 @@ from pylekhagaar.core.contracts.idocument_repository import IDocumentRepository
 from pylekhagaar.core.contracts.idocument_storage_type_repository import IDocStorageTypeRepository
 from pylekhagaar.core.enum.storage_type_enum import StorageTypeEnum
 from pylekhagaar.core.schemas.storage_type import DocStorageType
-from pylekhagaar.helpers.helper_functions import guess_mime
+from pylekhagaar.app_settings import AppSettings
+from pylekhagaar.helpers.helper_functions import (DEFAULT_COMPRESSION_LEVEL, ZSTD_CODEC, DiskCache, LRUCache, choose_content_codec,
+                                                  compress_stream, compute_sha256, content_addressed_path,
+                                                  decompress_chunks, guess_mime, prefetch_chunks)
 from pylekhagaar.core.schemas.document import Document
+from pylekhagaar.core.schemas.document_content_url import DocumentContentUrl
+from pylekhagaar.core.schemas.upload_session import UploadSession
 from pycrud.core.exceptions.not_found_exception import NotFoundException
-from azure.storage.blob import BlobServiceClient
-from azure.core.exceptions import ResourceExistsError
+from azure.storage.blob import BlobBlock, BlobClient, BlobSasPermissions, BlobServiceClient, generate_blob_sas
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
 
 from fastapi_injector import Injected
-from pylekhagaar.core.contracts.istorage_provider import IStorageProvider
+from pylekhagaar.core.contracts.istorage_provider import DocumentContentFile, DocumentContentProperties, IStorageProvider
 from pylekhagaar.core.contracts.idocument_repository import IDocumentRepository
 from injector import inject
 from pycrud.core.contracts.icrud_logger import ICrudLogger
 
+config = AppSettings()
+TEMP_DIRECTORY = Path(config.TEMP_DIRECTORY)
+
+# Size of each ranged GET issued while streaming a blob, overridable per storage
+# through configParam["download_chunk_size"]
+DEFAULT_DOWNLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Number of chunks fetched ahead of the one being sent to the client,
+# overridable through configParam["download_prefetch_chunks"]
+DEFAULT_DOWNLOAD_PREFETCH_CHUNKS = 1
+
+# Uploads larger than one block are split into blocks of this size and staged concurrently,
+# overridable through configParam["upload_block_size"]
+DEFAULT_UPLOAD_BLOCK_SIZE = 8 * 1024 * 1024
+
+# Number of blocks staged in parallel, overridable through configParam["upload_max_concurrency"].
+# At most this many blocks (plus the one being read) are held in memory per upload.
+DEFAULT_UPLOAD_MAX_CONCURRENCY = 4
+
+# Attempts made for each block before the upload fails, overridable through configParam["upload_block_retries"]
+DEFAULT_UPLOAD_BLOCK_RETRIES = 3
+
+# Lifetime of the SAS URLs handed out for direct downloads, overridable through configParam["sas_ttl_seconds"]
+DEFAULT_SAS_TTL_SECONDS = 300
+
+# Start time of SAS URLs is moved back by this much to tolerate clock skew with the storage service
+SAS_CLOCK_SKEW = timedelta(minutes=5)
+
+# Maximum number of sub-requests Azure accepts in one blob batch
+DELETE_BATCH_SIZE = 256
+
+# Initialized clients are shared by every provider instance (and so every request) built from
+# the same client settings, keeping their connection pools warm. They are keyed on the connection
+# string and chunk size, so a changed DocStorageType config gets its own client, and clients of
+# an outdated config expire after a while.
+_SERVICE_CLIENTS: LRUCache[tuple[str, int], BlobServiceClient] = LRUCache(max_entries=32, ttl_seconds=3600)
+
+# Containers already known to exist, so create_container is only sent once per container
+_ENSURED_CONTAINERS: LRUCache[tuple[str, str, str], bool] = LRUCache(max_entries=256, ttl_seconds=3600)
 
 
 class AzureBlobStorageProviderImpl(IStorageProvider):
@@ -46,100 +98,309 @@ class AzureBlobStorageProviderImpl(IStorageProvider):
         config = storage_type.configParam
         conn_str = self._build_connection_string(config)
         container_name = config.get("container_name", "documents")
-
-        self.blob_service_client = BlobServiceClient.from_connection_string(conn_str)
+        self._download_chunk_size = int(config.get("download_chunk_size", DEFAULT_DOWNLOAD_CHUNK_SIZE))
+        self._download_prefetch_chunks = int(config.get("download_prefetch_chunks", DEFAULT_DOWNLOAD_PREFETCH_CHUNKS))
+        self._upload_block_size = int(config.get("upload_block_size", DEFAULT_UPLOAD_BLOCK_SIZE))
+        self._upload_max_concurrency = int(config.get("upload_max_concurrency", DEFAULT_UPLOAD_MAX_CONCURRENCY))
+        self._upload_block_retries = int(config.get("upload_block_retries", DEFAULT_UPLOAD_BLOCK_RETRIES))
+        self._sas_ttl = timedelta(seconds=int(config.get("sas_ttl_seconds", DEFAULT_SAS_TTL_SECONDS)))
+        self._account_name = config["AccountName"]
+        self._account_key = config["AccountKey"]
+        # Store each distinct payload once under its SHA-256, shared by every document with that content
+        self._content_addressed = bool(config.get("content_addressed", False))
+        # Store compressible uploads zstd-compressed (configParam["compression"] = "zstd")
+        self._compression = config.get("compression") == ZSTD_CODEC
+        self._compression_level = int(config.get("compression_level", DEFAULT_COMPRESSION_LEVEL))
+
+        self.blob_service_client = self._get_service_client(config, conn_str)
         self.container_client = self.blob_service_client.get_container_client(container_name)
 
+        # Optional read-through cache of blobs on local disk, enabled by configParam["disk_cache_max_bytes"]
+        cache_max_bytes = int(config.get("disk_cache_max_bytes", 0))
+        cache_directory = config.get("disk_cache_directory",
+                                     str(TEMP_DIRECTORY / "blob-cache" / config["AccountName"] / container_name))
+        self._disk_cache = DiskCache.shared(cache_directory, cache_max_bytes) if cache_max_bytes > 0 else None
+
         # Ensure container exists
-        try:
-            self.container_client.create_container()
-        except ResourceExistsError:
-            pass
+        container_key = (config["AccountName"], config["BlobEndpoint"], container_name)
+        self._container_key = container_key
+        if not _ENSURED_CONTAINERS.get(container_key):
+            try:
+                self.container_client.create_container()
+            except ResourceExistsError:
+                pass
+            _ENSURED_CONTAINERS.put(container_key, True)
 
         self._logger.info("Initialized Azure Blob Storage Provider")
 
-        
 
-    def set_document_content(self, document_id: UUID, source_file_location: UploadFile) -> Document:
+    def set_document_content(self, document: Document, source_file_location: UploadFile) -> Document:
         """ Set or update the content of a document by uploading a file.
-        :param document_id: UUID of the document to update.
+        :param document: The already loaded Document to update.
         :param source_file: UploadFile object containing the file to upload.
         :return: Updated Document object with metadata (physical_path is cleared).
         """
-        document = self._document_repository.get_by_id(document_id)
-        if not document:
-            raise NotFoundException(detail="Document not found for specified Id")
-            
+        previous_blob_name, previous_hash = document.physical_path, document.content_hash
+
+        document = self.write_document_content(document, source_file_location)
+
+        # Release the previous content once the new one is stored
+        if previous_hash or (previous_blob_name and previous_blob_name != document.physical_path):
+            self._release_content(document.storage_id, previous_blob_name, previous_hash)
+
+        updated_doc_details = self._document_repository.update(document)
+        updated_doc_details.physical_path = None
+
+        return updated_doc_details
+
+
+    def write_document_content(self, document: Document, source_file_location: UploadFile) -> Document:
+        """ Upload a file to a blob without touching document metadata in the database.
+        :param document: The Document the content belongs to.
+        :param source_file: UploadFile object containing the file to upload.
+        :return: The Document with name, mime_type, physical_path, content_hash, content_codec
+                 and content properties set (the ETag is the blob's own). A content-addressed blob is already referenced.
+        """
+        mime_type = guess_mime(source_file_location.filename)
+
+        if self._content_addressed:
+            blob_name, document.content_hash, properties = self._store_content_addressed(document, source_file_location)
+            document.content_codec = None
+        else:
+            blob_name = f"{document.id}/{source_file_location.filename}"
+            blob_client = self.container_client.get_blob_client(blob_name)
+
+            document.content_codec = self._choose_content_codec(source_file_location, mime_type)
+
+            # Reset file pointer and upload
+            source_file_location.file.seek(0)
+            source = source_file_location.file
+            if document.content_codec:
+                source = compress_stream(source, self._compression_level)
+            properties = self._upload_blob(blob_client, source)
+            document.content_hash = None
+
+        properties.record_on(document)
+        document.physical_path = blob_name
+        document.name = source_file_location.filename
+        document.mime_type = mime_type
+        return document
+    
+
+    def get_document_content(self, document: Document, decompress: bool = True) -> tuple[Iterator[bytes], str]:
+        """ Get the file content of a document.
+        The blob is streamed in chunks of `download_chunk_size` bytes, with the next
+        chunk prefetched while the current one is sent, so memory stays bounded.
+        :param document: The already loaded Document to read.
+        :param decompress: Whether compressed content is decoded while it is streamed.
+        :return: Tuple containing an iterator over the file content and the filename.
         """
-        Upload file stream to Azure Blob and return blob name.
+        blob_client = self.container_client.get_blob_client(document.physical_path)
+        downloader = blob_client.download_blob()
+        chunks = prefetch_chunks(downloader.chunks(), self._download_prefetch_chunks)
+        if decompress and document.content_codec:
+            chunks = decompress_chunks(chunks, document.content_codec)
+        return chunks, document.name
+    
+
+    def get_document_content_file(self, document: Document) -> DocumentContentFile | None:
+        """ Get a local copy of a document's blob from the disk cache, downloading it on a miss.
+        The copy is only used while the blob still has the ETag recorded on the document,
+        and stays pinned in the cache until the returned file is released.
+        :param document: The already loaded Document.
+        :return: DocumentContentFile of the cached copy, or None if the disk cache
+                 is disabled or the blob cannot be cached.
         """
-        # self._initialize_blob_client(document.storage_id)
+        if self._disk_cache is None or not document.content_etag:
+            return None
+
+        blob_client = self.container_client.get_blob_client(document.physical_path)
 
+        def fetch(file: BinaryIO) -> None:
+            # Fails if the blob changed since its ETag was recorded
+            blob_client.download_blob(etag=document.content_etag,
+                                      match_condition=MatchConditions.IfNotModified).readinto(file)
 
-        blob_name = f"{document.id}/{source_file_location.filename}"
+        try:
+            cached_path = self._disk_cache.get_or_fetch((*self._container_key, document.physical_path),
+                                                        document.content_etag, document.content_size, fetch)
+        except Exception as ex:
+            self._logger.warning(f"Serving blob {document.physical_path} without the disk cache: {ex}")
+            return None
+        if cached_path is None:
+            return None
+
+        release = functools.partial(self._disk_cache.release, cached_path)
+        try:
+            return DocumentContentFile(cached_path, os.stat(cached_path), release)
+        except Exception as ex:
+            release()
+            self._logger.warning(f"Serving blob {document.physical_path} without the disk cache: {ex}")
+            return None
+
+
+    def get_document_content_url(self, document: Document) -> DocumentContentUrl | None:
+        """ Create a read-only SAS URL for a document's blob, signed with the account key.
+        The URL makes the download carry the document's file name, type and content encoding.
+        :param document: The already loaded Document.
+        :return: The blob URL with the SAS token, and its expiry time.
+        """
+        if not document.physical_path:
+            raise NotFoundException(detail=f"Document content not found for ID: {document.id}")
+
+        blob_client = self.container_client.get_blob_client(document.physical_path)
+        now = datetime.now(timezone.utc)
+        expires_at = now + self._sas_ttl
+        sas_token = generate_blob_sas(
+            account_name=self._account_name,
+            container_name=self.container_client.container_name,
+            blob_name=document.physical_path,
+            account_key=self._account_key,
+            permission=BlobSasPermissions(read=True),
+            start=now - SAS_CLOCK_SKEW,
+            expiry=expires_at,
+            content_disposition=f'attachment; filename="{document.name}"',
+            content_type=document.mime_type,
+            content_encoding=document.content_codec,
+        )
+        return DocumentContentUrl(url=f"{blob_client.url}?{sas_token}", expires_at=expires_at)
+
+
+    def get_document_upload_url(self, document: Document, filename: str) -> DocumentContentUrl:
+        """ Create a write-only SAS URL for the blob set_document_content would write the file to.
+        Clients PUT the file to it with the header "x-ms-blob-type: BlockBlob".
+        :param document: The already loaded Document.
+        :param filename: Name of the file being uploaded.
+        :return: The blob URL with the SAS token, and its expiry time.
+        """
+        blob_name = self._direct_upload_blob_name(document, filename)
         blob_client = self.container_client.get_blob_client(blob_name)
+        now = datetime.now(timezone.utc)
+        expires_at = now + self._sas_ttl
+        sas_token = generate_blob_sas(
+            account_name=self._account_name,
+            container_name=self.container_client.container_name,
+            blob_name=blob_name,
+            account_key=self._account_key,
+            permission=BlobSasPermissions(create=True, write=True),
+            start=now - SAS_CLOCK_SKEW,
+            expiry=expires_at,
+        )
+        return DocumentContentUrl(url=f"{blob_client.url}?{sas_token}", expires_at=expires_at)
+
+
+    def complete_document_upload(self, document: Document, filename: str) -> Document:
+        """ Record a blob uploaded through get_document_upload_url as the content of a document.
+        :param document: The already loaded Document.
+        :param filename: Name of the uploaded file.
+        :return: Updated Document object with metadata (physical_path is cleared).
+        """
+        blob_name = self._direct_upload_blob_name(document, filename)
+        try:
+            properties = self._get_blob_properties(self.container_client.get_blob_client(blob_name))
+        except ResourceNotFoundError:
+            raise NotFoundException(detail=f"No content was uploaded for document {document.id} as '{filename}'")
 
-        # Reset file pointer and upload
-        source_file_location.file.seek(0)
-        blob_client.upload_blob(source_file_location.file, overwrite=True)
+        # Release the previous content now that the new one is stored
+        previous_blob_name, previous_hash = document.physical_path, document.content_hash
+        if previous_hash or (previous_blob_name and previous_blob_name != blob_name):
+            self._release_content(document.storage_id, previous_blob_name, previous_hash)
 
+        properties.record_on(document)
         document.physical_path = blob_name
-        document.name = source_file_location.filename
-        document.mime_type = guess_mime(source_file_location.filename)
+        document.name = filename
+        document.mime_type = guess_mime(filename)
+        document.content_hash = None
+        document.content_codec = None
 
         updated_doc_details = self._document_repository.update(document)
         updated_doc_details.physical_path = None
-
         return updated_doc_details
-    
 
-    def get_document_content(self, document_id: UUID) -> tuple[BinaryIO, str]:
-        """ Get the file content of a document by its ID.
-        :param document_id: UUID of the document to retrieve.
-        :return: Tuple containing a binary stream of the file content and the filename.
+
+    def begin_chunked_upload(self, document: Document, session: UploadSession) -> None:
+        """ Check the blob name of an upload session. Its chunks are staged as blocks of that blob,
+        so nothing has to be created up front.
+        :param document: The already loaded Document.
+        :param session: The new upload session.
         """
+        self._chunked_upload_blob_name(document, session)
 
-        document = self._document_repository.get_by_id(document_id)
-        if not document:
-            raise NotFoundException("Document not found")
 
-        # self._initialize_blob_client(document.storage_id)
+    def write_document_chunk(self, document: Document, session: UploadSession, index: int, chunk: bytes) -> None:
+        """ Stage a chunk as an uncommitted block of the session's blob, with a block id derived from its number.
+        :param document: The already loaded Document.
+        :param session: The upload session.
+        :param index: Zero-based number of the chunk.
+        :param chunk: The bytes of the chunk.
         """
-        Download blob and return BytesIO stream.
+        blob_client = self.container_client.get_blob_client(self._chunked_upload_blob_name(document, session))
+        blob_client.stage_block(block_id=self._chunk_block_id(index), data=chunk, length=len(chunk))
+
+
+    def complete_chunked_upload(self, document: Document, session: UploadSession) -> Document:
+        """ Commit the staged blocks of an upload session in chunk order. Content is stored as sent,
+        without compression or content addressing.
+        :param document: The already loaded Document.
+        :param session: The upload session.
+        :return: The Document with its new blob and content properties; metadata is not saved.
         """
-        blob_client = self.container_client.get_blob_client(document.physical_path)
-        downloader = blob_client.download_blob()
-        stream = BytesIO(downloader.readall())
-        stream.seek(0)  
-        return stream, document.name
-    
+        blob_name = self._chunked_upload_blob_name(document, session)
+        blob_client = self.container_client.get_blob_client(blob_name)
+        response = blob_client.commit_block_list(
+            [BlobBlock(block_id=self._chunk_block_id(index)) for index in range(session.chunk_count)])
 
-    def delete_document_content(self, document_id: UUID) -> bool:
-        """ Delete the blob content of a document by its ID.
-        :param document_id: UUID of the document to delete.
-        :return: True if deletion was attempted (even if blob not found).
+        DocumentContentProperties(size=session.size, etag=response["etag"],
+                                  last_modified=response["last_modified"]).record_on(document)
+        document.physical_path = blob_name
+        document.name = session.filename
+        document.mime_type = guess_mime(session.filename)
+        document.content_hash = None
+        document.content_codec = None
+        return document
+
+
+    def abort_chunked_upload(self, session: UploadSession) -> None:
+        """ Nothing to delete: the session's blob is never committed, and Azure discards
+        uncommitted blocks on its own after a week.
         """
-        document = self._document_repository.get_by_id(document_id)
-        if not document:
-            raise NotFoundException("Document not found")
+        pass
+
 
-        # Ensure blob client is initialized
-        # self._initialize_blob_client(document.storage_id)
+    def get_document_content_properties(self, document: Document) -> DocumentContentProperties:
+        """ Get the size and validators of a document's blob without downloading it.
+        :param document: The already loaded Document.
+        :return: DocumentContentProperties built from the blob properties.
+        """
+        return self._get_blob_properties(self.container_client.get_blob_client(document.physical_path))
 
+
+    def get_document_content_range(self, document: Document, offset: int, length: int) -> Iterator[bytes]:
+        """ Get a byte range of a document's blob with an offset/length download.
+        :param document: The already loaded Document.
+        :param offset: Position of the first byte to return.
+        :param length: Number of bytes to return.
+        :return: Iterator over the requested bytes.
+        """
+        blob_client = self.container_client.get_blob_client(document.physical_path)
+        downloader = blob_client.download_blob(offset=offset, length=length)
+        return prefetch_chunks(downloader.chunks(), self._download_prefetch_chunks)
+
+
+    def delete_document_content(self, document: Document) -> bool:
+        """ Delete the blob content of a document and its metadata.
+        :param document: The already loaded Document to delete.
+        :return: True if deletion was attempted (even if blob not found).
+        """
         if not document.physical_path:
             self._logger.warning(f"No blob path set for document {document.id}")
             return False
 
-        blob_client = self.container_client.get_blob_client(document.physical_path)
-        try:
-            blob_client.delete_blob()
-            self._logger.info(f"Deleted blob {document.physical_path} for document {document.id}")
-        except Exception as ex:
-            # If blob does not exist, Azure SDK will raise an error — handle gracefully
-            self._logger.warning(f"Failed to delete blob {document.physical_path}: {ex}")
+        # Delete the blob unless other documents share it
+        self._release_content(document.storage_id, document.physical_path, document.content_hash)
 
         # Remove DB record (or mark physical_path None, depending on your design)
-        deleted = self._document_repository.delete(document_id)
+        deleted = self._document_repository.delete(document.id)
         return deleted
 
 
@@ -164,6 +425,232 @@ class AzureBlobStorageProviderImpl(IStorageProvider):
 
 
         
+    def delete_document_contents(self, documents: list[Document]) -> dict[UUID, str | None]:
+        """ Delete the blobs of several documents with blob batch requests of up to 256 deletes.
+        Content-addressed blobs are released instead, and only deleted with their last reference.
+        Metadata entries are left untouched.
+        :param documents: The already loaded Documents whose blobs are deleted.
+        :return: For each document id, None if its blob is gone, or the error that prevented it.
+        """
+        results: dict[UUID, str | None] = {}
+        blob_owners: dict[str, list[Document]] = {}
+        for document in documents:
+            try:
+                if document.content_hash:
+                    # A failed delete rolls the release back, so the reference stays with the blob
+                    self._document_repository.release_content_reference(document.storage_id, document.content_hash,
+                                                                         self._delete_blob_if_exists)
+                elif document.physical_path:
+                    blob_owners.setdefault(document.physical_path, []).append(document)
+                results[document.id] = None
+            except Exception as ex:
+                results[document.id] = str(ex)
+
+        blob_names = list(blob_owners)
+        for start in range(0, len(blob_names), DELETE_BATCH_SIZE):
+            batch = blob_names[start:start + DELETE_BATCH_SIZE]
+            try:
+                responses = list(self.container_client.delete_blobs(*batch, raise_on_any_failure=False))
+            except Exception as ex:
+                responses = [ex] * len(batch)
+
+            for blob_name, response in zip(batch, responses):
+                if isinstance(response, Exception):
+                    error = str(response)
+                elif response.status_code in (200, 202, 404):
+                    # A blob that no longer exists counts as deleted
+                    continue
+                else:
+                    error = f"Blob delete failed with status {response.status_code}: {response.reason}"
+
+                self._logger.warning(f"Failed to delete blob {blob_name}: {error}")
+                for document in blob_owners[blob_name]:
+                    results[document.id] = error
+
+        return results
+
+
+    @staticmethod
+    def _direct_upload_blob_name(document: Document, filename: str) -> str:
+        """ Blob a directly uploaded file is written to, the same one set_document_content uses. """
+        if not filename or "/" in filename or "\\" in filename:
+            raise ValueError(f"Invalid file name '{filename}'")
+        return f"{document.id}/{filename}"
+
+
+    def _chunked_upload_blob_name(self, document: Document, session: UploadSession) -> str:
+        """ Blob of an upload session, unique to it so concurrent sessions never commit each other's blocks. """
+        return self._direct_upload_blob_name(document, f"{session.upload_id}_{session.filename}")
+
+
+    @staticmethod
+    def _chunk_block_id(index: int) -> str:
+        return base64.b64encode(f"{index:06d}".encode()).decode()
+
+
+    def _store_content_addressed(self, document: Document,
+                                 source_file_location: UploadFile) -> tuple[str, str, DocumentContentProperties]:
+        """
+        Upload a file under its SHA-256 unless a blob with the same content is already stored,
+        and reference it for the document.
+        :return: Tuple containing the blob name, the content hash and the properties of the blob.
+        """
+        content_hash = compute_sha256(source_file_location.file)
+
+        # Referenced before looking for the blob: a release deletes the blob before it commits,
+        # so while the reference is held an existing blob cannot disappear
+        blob_name = self._document_repository.acquire_content_reference(
+            document.storage_id, content_hash, content_addressed_path(content_hash))
+        blob_client = self.container_client.get_blob_client(blob_name)
+        try:
+            try:
+                properties = self._get_blob_properties(blob_client)
+            except ResourceNotFoundError:
+                properties = self._upload_blob(blob_client, source_file_location.file)
+        except Exception:
+            self._document_repository.release_content_reference(document.storage_id, content_hash)
+            raise
+
+        return blob_name, content_hash, properties
+
+
+    def _choose_content_codec(self, source_file_location: UploadFile, mime_type: str) -> str | None:
+        """ Codec to store an upload with, or None to store it as-is. """
+        if not self._compression:
+            return None
+        return choose_content_codec(source_file_location.file, mime_type, self._compression_level)
+
+
+    def _release_content(self, storage_id: UUID, blob_name: str | None, content_hash: str | None) -> None:
+        """ Delete a document's blob, or drop its reference if the blob is content-addressed
+        and only delete it once no document points at it anymore. """
+        if content_hash:
+            self._document_repository.release_content_reference(storage_id, content_hash, self._delete_blob)
+        elif blob_name:
+            self._delete_blob(blob_name)
+
+
+    def _delete_blob(self, blob_name: str) -> None:
+        """ Delete a blob and its cached copy, logging rather than raising if the blob cannot be deleted. """
+        try:
+            self._delete_blob_if_exists(blob_name)
+            self._logger.info(f"Deleted blob {blob_name}")
+        except Exception as ex:
+            self._logger.warning(f"Failed to delete blob {blob_name}: {ex}")
+
+
+    def _delete_blob_if_exists(self, blob_name: str) -> None:
+        """ Delete a blob and its cached copy. A blob that no longer exists counts as deleted. """
+        if self._disk_cache is not None:
+            self._disk_cache.invalidate((*self._container_key, blob_name))
+        try:
+            self.container_client.get_blob_client(blob_name).delete_blob()
+        except ResourceNotFoundError:
+            pass
+
+
+    def _upload_blob(self, blob_client: BlobClient, source: BinaryIO) -> DocumentContentProperties:
+        """
+        Upload a stream to a block blob. Content that fits in one block is sent with a single
+        upload_blob call; larger content is read block by block and staged concurrently,
+        then committed in order with commit_block_list.
+        :return: The size of the blob and the ETag and last modification time Azure assigned to it.
+        """
+        block = source.read(self._upload_block_size)
+        if len(block) < self._upload_block_size:
+            response = blob_client.upload_blob(block, overwrite=True)
+            return DocumentContentProperties(size=len(block), etag=response["etag"],
+                                             last_modified=response["last_modified"])
+
+        # Bounds the blocks held in memory: one slot is taken before reading a block
+        # and given back once it has been staged
+        buffer_slots = threading.BoundedSemaphore(self._upload_max_concurrency + 1)
+        buffer_slots.acquire()
+
+        # Set by the first block that fails for good, so reading stops without scanning every future
+        failed = threading.Event()
+
+        def on_staged(future: Future) -> None:
+            if future.exception() is not None:
+                failed.set()
+
+        size = 0
+        block_list: list[BlobBlock] = []
+        staged: list[Future] = []
+        with ThreadPoolExecutor(max_workers=self._upload_max_concurrency,
+                                thread_name_prefix="blob-upload") as executor:
+            while block:
+                size += len(block)
+                block_id = base64.b64encode(f"{len(block_list):06d}".encode()).decode()
+                block_list.append(BlobBlock(block_id=block_id))
+                future = executor.submit(self._stage_block, blob_client, block_id, block, buffer_slots)
+                future.add_done_callback(on_staged)
+                staged.append(future)
+
+                buffer_slots.acquire()
+                if failed.is_set():
+                    buffer_slots.release()
+                    break
+                block = source.read(self._upload_block_size)
+            else:
+                buffer_slots.release()
+
+        for future in staged:
+            future.result()
+
+        response = blob_client.commit_block_list(block_list)
+        return DocumentContentProperties(size=size, etag=response["etag"], last_modified=response["last_modified"])
+
+
+    @staticmethod
+    def _get_blob_properties(blob_client: BlobClient) -> DocumentContentProperties:
+        blob_properties = blob_client.get_blob_properties()
+        return DocumentContentProperties(
+            size=blob_properties.size,
+            etag=blob_properties.etag,
+            last_modified=blob_properties.last_modified,
+        )
+
+
+    def _stage_block(self, blob_client: BlobClient, block_id: str, block: bytes,
+                     buffer_slots: threading.BoundedSemaphore) -> None:
+        """ Stage one block, retrying it on its own with exponential backoff. """
+        try:
+            for attempt in range(1, self._upload_block_retries + 1):
+                try:
+                    blob_client.stage_block(block_id=block_id, data=block, length=len(block))
+                    return
+                except Exception as ex:
+                    if attempt == self._upload_block_retries:
+                        raise
+                    self._logger.warning(f"Staging block {block_id} of {blob_client.blob_name} failed "
+                                         f"(attempt {attempt}): {ex}")
+                    time.sleep(0.5 * 2 ** (attempt - 1))
+        finally:
+            buffer_slots.release()
+
+
+    def _get_service_client(self, config: dict, conn_str: str) -> BlobServiceClient:
+        """
+        Return the shared BlobServiceClient built from the same connection string and chunk size,
+        building a new one if none is cached.
+        """
+        client_key = (conn_str, self._download_chunk_size)
+
+        cached = _SERVICE_CLIENTS.get(client_key)
+        if cached is not None:
+            return cached
+
+        blob_service_client = BlobServiceClient.from_connection_string(
+            conn_str,
+            max_single_get_size=self._download_chunk_size,
+            max_chunk_get_size=self._download_chunk_size,
+        )
+        _SERVICE_CLIENTS.put(client_key, blob_service_client)
+        self._logger.info(f"Created Azure Blob client for account {config['AccountName']}")
+        return blob_service_client
+
+
     def _build_connection_string(self,config: dict) -> str:
         """
         Build Azure connection string from configParam stored in DB.
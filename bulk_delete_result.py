@@ -0,0 +1,13 @@
+from typing import Optional
+from uuid import UUID
+from pydantic import BaseModel
+
+
+class BulkDeleteItemResult(BaseModel):
+    """
+    Outcome of deleting one document of a bulk delete.
+    """
+
+    id: UUID
+    success: bool
+    error: Optional[str] = None
@@ -0,0 +1,14 @@
+from typing import Optional
+from uuid import UUID
+from pydantic import BaseModel
+
+
+class BulkUploadItemResult(BaseModel):
+    """
+    Outcome of one file of a bulk upload.
+    """
+
+    name: Optional[str] = None
+    id: Optional[UUID] = None
+    success: bool
+    error: Optional[str] = None
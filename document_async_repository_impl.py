@@ -0,0 +1,44 @@
+from uuid import UUID
+from fastapi_injector import Injected
+from injector import inject
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from pylekhagaar.core.contracts.idocument_async_repository import IDocumentAsyncRepository
+from pylekhagaar.core.schemas.document import Document
+from pylekhagaar.core.schemas.document_cursor_page import DocumentCursorPage
+from pylekhagaar.modules.document.document_model import DocumentModel
+from pylekhagaar.modules.document.document_repository_impl import build_find_page_queries, build_find_page_result
+from pycrud.core.contracts.itenant_provider import ITenantProvider
+from pycrud.core.data_filters.simple_search_filter import SimpleSearchFilter
+
+
+class DocumentAsyncRepositoryImpl(IDocumentAsyncRepository):
+    """Implementation of asynchronous Document repository operations on AsyncSession.
+    Each call uses its own session, so connections go back to the pool as soon as it returns."""
+
+    @inject
+    def __init__(self,
+                 session_factory: async_sessionmaker = Injected(async_sessionmaker),
+                 tenant_provider: ITenantProvider = Injected(ITenantProvider),
+                 ) -> None:
+        self._session_factory: async_sessionmaker[AsyncSession] = session_factory
+        self._tenant_provider = tenant_provider
+
+
+    async def get_by_id(self, id: UUID) -> Document | None:
+        async with self._session_factory() as session:
+            db_item = await session.scalar(
+                select(DocumentModel).where(DocumentModel.tenant_id == self._tenant_provider.get_tenant_id(),
+                                            DocumentModel.id == id)
+            )
+            return Document.model_validate(db_item) if db_item is not None else None
+
+
+    async def find_page(self, data_filter: SimpleSearchFilter, cursor: str | None = None, page_size: int = 10,
+                        include_total: bool = False) -> DocumentCursorPage:
+        query, count_query = build_find_page_queries(data_filter, cursor, page_size,
+                                                     self._tenant_provider.get_tenant_id())
+        async with self._session_factory() as session:
+            db_items = (await session.scalars(query)).all()
+            total_count = await session.scalar(count_query) if include_total else None
+            return build_find_page_result(db_items, data_filter, page_size, total_count)
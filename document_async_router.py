@@ -0,0 +1,147 @@
+from typing import Optional
+from uuid import UUID
+from fastapi import APIRouter, File, Header, HTTPException, Query, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
+from fastapi_injector import Injected
+from fastapi_utils.cbv import cbv
+from pylekhagaar.core.contracts.idocument_service import IDocumentService
+from pylekhagaar.core.contracts.istorage_provider import DocumentContentProperties
+from pylekhagaar.core.schemas.document import Document
+from pylekhagaar.core.schemas.document_cursor_page import DocumentCursorPage
+from pylekhagaar.helpers.helper_functions import (accepts_encoding, document_etag, format_http_date, if_range_matches,
+                                                  is_not_modified, parse_range_header)
+from pylekhagaar.modules.document.azure_blob_async_storage_provider_impl import close_service_clients
+from pycrud.core.data_filters.simple_search_filter import SimpleSearchFilter
+from pycrud.core.exceptions.not_found_exception import NotFoundException
+
+document_async_router = APIRouter(prefix = "/documents/async", on_shutdown=[close_service_clients])
+
+@cbv(document_async_router)
+class DocumentAsyncController:
+    """ Asynchronous counterparts of the document routes, served without holding a worker thread """
+    def __init__(self, document_service: IDocumentService = Injected(IDocumentService)) -> None:
+        self._document_service = document_service
+
+
+    @document_async_router.get(path="/", operation_id="find_documents_async")
+    async def find(self,
+                   search_text: Optional[str] = Query(None),
+                   sort_on: Optional[str] = Query(None),
+                   sort_ascending: bool = Query(True),
+                   page_size: int = Query(10),
+                   cursor: Optional[str] = Query(None),
+                   include_total: bool = Query(False)) -> DocumentCursorPage:
+        """
+        Find documents with keyset pagination, like GET /documents/?pagination=cursor.
+        :return: The page of documents and the cursor of the next one.
+        """
+        data_filter = SimpleSearchFilter(search_text=search_text, sort_on=sort_on, sort_ascending=sort_ascending)
+        try:
+            return await self._document_service.find_page_async(data_filter, cursor, page_size, include_total)
+        except ValueError as ex:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ex))
+
+
+    @document_async_router.get("/{id}/document", operation_id="get_document_by_id_async")
+    async def get_document(self, id: UUID, response: Response,
+                           if_none_match: Optional[str] = Header(None, alias="If-None-Match")) -> Document:
+        """
+        Get document metadata by ID, with an ETag answered by 304 like GET /documents/{id}/document.
+        - document_id: UUID of the document.
+        """
+        try:
+            document = await self._document_service.get_by_id_async(id)
+            etag = document_etag(document)
+            if is_not_modified(if_none_match, None, etag, None):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+            response.headers["ETag"] = etag
+            return document
+        except NotFoundException as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except Exception as ex:
+            raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ex)
+        )
+
+
+    @document_async_router.post("/{id}/content", operation_id="set_document_content_async")
+    async def set_document_content(self, id: UUID, file: UploadFile = File(...)) -> Document:
+        """
+        Upload or replace file content for an existing document.
+        - document_id: UUID of the document.
+        - file: uploaded file stream.
+        """
+        try:
+            return await self._document_service.set_document_content_async(id, file)
+        except Exception as ex:
+            raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ex)
+        )
+
+
+    @document_async_router.get("/{id}/content", operation_id="get_document_content_async")
+    async def get_document_content(self, id: UUID,
+                                   range_header: Optional[str] = Header(None, alias="Range"),
+                                   if_range: Optional[str] = Header(None, alias="If-Range"),
+                                   accept_encoding: Optional[str] = Header(None, alias="Accept-Encoding"),
+                                   if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+                                   if_modified_since: Optional[str] = Header(None, alias="If-Modified-Since")):
+        """
+            Download the file content of a document by ID.
+            Honours a single byte Range with If-Range (several ranges get the whole content),
+            conditional requests (304) and Content-Encoding like GET /documents/{id}/content.
+            - document_id: UUID of the document.
+            :return: StreamingResponse with the file content.
+            """
+        try:
+            document = await self._document_service.get_document_for_content_async(id)
+            media_type = document.mime_type or "application/octet-stream"
+
+            properties = (DocumentContentProperties.from_document(document)
+                          or await self._document_service.get_document_content_properties_async(document))
+            send_encoded = document.content_codec is not None and accepts_encoding(accept_encoding, document.content_codec)
+
+            headers = {"Accept-Ranges": "bytes" if send_encoded or not document.content_codec else "none"}
+            if document.content_codec:
+                headers["Vary"] = "Accept-Encoding"
+            if properties.etag:
+                # Decoded bytes differ from the stored ones, so their entity tag is only weak
+                headers["ETag"] = (properties.etag if send_encoded or not document.content_codec
+                                   else f"W/{properties.etag.removeprefix('W/')}")
+            if properties.last_modified:
+                headers["Last-Modified"] = format_http_date(properties.last_modified)
+
+            if is_not_modified(if_none_match, if_modified_since, properties.etag, properties.last_modified):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+            if send_encoded:
+                headers["Content-Encoding"] = document.content_codec
+
+            if range_header and headers["Accept-Ranges"] == "bytes":
+                ranges = None
+                if if_range is None or if_range_matches(if_range, properties.etag, properties.last_modified):
+                    ranges = parse_range_header(range_header, properties.size)
+
+                if ranges == []:
+                    return Response(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                                    headers={"Content-Range": f"bytes */{properties.size}"})
+                if ranges and len(ranges) == 1:
+                    start, end = ranges[0]
+                    headers["Content-Range"] = f"bytes {start}-{end}/{properties.size}"
+                    headers["Content-Length"] = str(end - start + 1)
+                    return StreamingResponse(
+                        self._document_service.get_document_content_range_async(document, start, end - start + 1),
+                        status_code=status.HTTP_206_PARTIAL_CONTENT,
+                        media_type=media_type,
+                        headers=headers)
+
+            chunks, filename = await self._document_service.open_document_content_async(document, decompress=not send_encoded)
+            headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+            return StreamingResponse(chunks, media_type=media_type, headers=headers)
+        except NotFoundException as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,14 @@
+from uuid import UUID
+from pydantic import BaseModel, Field
+
+
+# Most ids a single batch-get may ask for
+MAX_BATCH_GET_IDS = 5000
+
+
+class DocumentBatchGetRequest(BaseModel):
+    """
+    Lists the documents whose metadata a client wants in one request.
+    """
+
+    ids: list[UUID] = Field(max_length=MAX_BATCH_GET_IDS)
@@ -0,0 +1,13 @@
+from uuid import UUID
+from pydantic import BaseModel
+from pylekhagaar.core.schemas.document import Document
+
+
+class DocumentBatchGetResult(BaseModel):
+    """
+    Metadata of the documents found by a batch-get, in request order, and the ids that were not found.
+    physical_path is never included.
+    """
+
+    items: list[Document]
+    missing_ids: list[UUID]
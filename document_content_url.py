@@ -0,0 +1,11 @@
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class DocumentContentUrl(BaseModel):
+    """
+    Short-lived URL giving direct access to the stored content of a document.
+    """
+
+    url: str
+    expires_at: datetime
@@ -0,0 +1,14 @@
+from typing import Optional
+from pydantic import BaseModel
+from pylekhagaar.core.schemas.document import Document
+
+
+class DocumentCursorPage(BaseModel):
+    """
+    One page of documents fetched with keyset pagination.
+    Pass next_cursor back to fetch the following page; it is None on the last page.
+    """
+
+    items: list[Document]
+    next_cursor: Optional[str] = None
+    total_count: Optional[int] = None
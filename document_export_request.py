@@ -0,0 +1,14 @@
+from typing import Optional
+from uuid import UUID
+from pydantic import BaseModel
+
+
+class DocumentExportRequest(BaseModel):
+    """
+    Selects the documents to export, either by id or with a search filter.
+    """
+
+    ids: Optional[list[UUID]] = None
+    search_text: Optional[str] = None
+    sort_on: Optional[str] = None
+    sort_ascending: bool = True
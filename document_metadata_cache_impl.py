@@ -0,0 +1,115 @@
+import threading
+from uuid import UUID
+from pylekhagaar.core.contracts.idocument_metadata_cache import IDocumentMetadataCache
+from pylekhagaar.core.schemas.document import Document
+from pylekhagaar.helpers.helper_functions import LRUCache
+from pycrud.core.contracts.icrud_logger import ICrudLogger
+
+try:
+    import redis
+except ImportError:  # the shared backend is optional
+    redis = None
+
+
+# Documents kept by the in-process cache, least recently used ones are evicted first
+LOCAL_CACHE_MAX_ENTRIES = 10000
+
+# Entries expire after this many seconds, bounding how long another process's update can go unnoticed
+CACHE_TTL_SECONDS = 60
+
+# Seconds a Redis command may take before the cache is bypassed, so an unreachable server does not stall requests
+REDIS_TIMEOUT_SECONDS = 0.5
+
+
+class LocalDocumentMetadataCache(IDocumentMetadataCache):
+    """
+    In-process cache bounded by entry count with LRU eviction. Updates made by other processes
+    are only picked up once entries expire, so deployments with several workers should prefer
+    the shared backend.
+    """
+
+    def __init__(self, max_entries: int = LOCAL_CACHE_MAX_ENTRIES, ttl_seconds: float = CACHE_TTL_SECONDS):
+        self._entries: LRUCache[tuple, Document] = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    def get(self, tenant_id, document_id: UUID) -> Document | None:
+        document = self._entries.get((tenant_id, document_id))
+        return document.model_copy(deep=True) if document is not None else None
+
+    def put(self, tenant_id, document: Document) -> None:
+        self._entries.put((tenant_id, document.id), document.model_copy(deep=True))
+
+    def invalidate(self, tenant_id, document_ids: list[UUID]) -> None:
+        for document_id in document_ids:
+            self._entries.pop((tenant_id, document_id))
+
+    def is_shared(self) -> bool:
+        return False
+
+    def stats(self) -> dict:
+        return {"backend": "local", **self._entries.stats()}
+
+
+class RedisDocumentMetadataCache(IDocumentMetadataCache):
+    """
+    Cache shared by every process through Redis. Entries expire after ttl_seconds; bounding
+    the number of entries is left to the server's LRU eviction policy (maxmemory-policy).
+    Hit, miss and error counters are those of this process.
+    When Redis cannot be reached, lookups count as misses and are answered from the database,
+    and failed writes are logged; entries a failed invalidation leaves behind expire after ttl_seconds.
+    """
+
+    def __init__(self, url: str, logger: ICrudLogger, ttl_seconds: int = CACHE_TTL_SECONDS):
+        if redis is None:
+            raise RuntimeError("The redis package is required for the shared document metadata cache")
+        self._client = redis.Redis.from_url(url, socket_timeout=REDIS_TIMEOUT_SECONDS,
+                                            socket_connect_timeout=REDIS_TIMEOUT_SECONDS)
+        self._logger = logger.get_logger(__name__)
+        self._ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def get(self, tenant_id, document_id: UUID) -> Document | None:
+        try:
+            cached = self._client.get(self._key(tenant_id, document_id))
+        except redis.RedisError as ex:
+            self._record_error(f"Failed to read document {document_id} from the metadata cache: {ex}")
+            cached = None
+        with self._lock:
+            if cached is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return Document.model_validate_json(cached)
+
+    def put(self, tenant_id, document: Document) -> None:
+        try:
+            self._client.set(self._key(tenant_id, document.id), document.model_dump_json(), ex=self._ttl_seconds)
+        except redis.RedisError as ex:
+            self._record_error(f"Failed to cache document {document.id}: {ex}")
+
+    def invalidate(self, tenant_id, document_ids: list[UUID]) -> None:
+        if not document_ids:
+            return
+        try:
+            self._client.delete(*(self._key(tenant_id, document_id) for document_id in document_ids))
+        except redis.RedisError as ex:
+            self._record_error(f"Failed to invalidate {len(document_ids)} documents in the metadata cache, "
+                               f"they may be served stale for up to {self._ttl_seconds} s: {ex}")
+
+    def is_shared(self) -> bool:
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": "redis", "hits": self.hits, "misses": self.misses, "errors": self.errors}
+
+    def _record_error(self, message: str) -> None:
+        with self._lock:
+            self.errors += 1
+        self._logger.warning(message)
+
+    @staticmethod
+    def _key(tenant_id, document_id: UUID) -> str:
+        return f"document:{tenant_id}:{document_id}"
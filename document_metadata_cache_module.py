@@ -0,0 +1,21 @@
+from injector import Module, provider, singleton
+from pylekhagaar.app_settings import AppSettings
+from pylekhagaar.core.contracts.idocument_metadata_cache import IDocumentMetadataCache
+from pylekhagaar.modules.document.document_metadata_cache_impl import (LocalDocumentMetadataCache,
+                                                                         RedisDocumentMetadataCache)
+from pycrud.core.contracts.icrud_logger import ICrudLogger
+
+
+class DocumentMetadataCacheModule(Module):
+    """
+    Binds the process-wide document metadata cache used by DocumentRepositoryImpl and DocumentServiceImpl:
+    shared through Redis when AppSettings.DOCUMENT_CACHE_REDIS_URL is set, in-process otherwise.
+    """
+
+    @singleton
+    @provider
+    def provide_metadata_cache(self, logger: ICrudLogger) -> IDocumentMetadataCache:
+        redis_url = AppSettings().DOCUMENT_CACHE_REDIS_URL
+        if redis_url:
+            return RedisDocumentMetadataCache(redis_url, logger)
+        return LocalDocumentMetadataCache()
@@ -1,9 +1,10 @@
 from typing import Optional
 import uuid
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String
+from datetime import datetime
+from sqlalchemy import DDL, BigInteger, Column, DateTime, Index, Integer, String, Table, Text, event, func
 from pycrud.models.base_tenant_model import BaseTenantModel
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
 
 
 class DocumentModel(BaseTenantModel):
@@ -21,7 +22,66 @@ class DocumentModel(BaseTenantModel):
     doc_type: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
     storage_type: Mapped[Optional[str]] = mapped_column(String(500),default="filesystem", nullable=True)
     storage_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid = True), nullable = True)
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True, index=True)
+    # Codec the content is stored with (e.g. "zstd"), None if stored as uploaded
+    content_codec: Mapped[Optional[str]] = mapped_column(String(20), nullable=True)
+    # Size and validators of the stored content, recorded on upload so conditional requests
+    # can be answered without touching storage
+    content_size: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    content_etag: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    content_modified_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    # Maintained by a trigger on PostgreSQL from name, description and author; unused elsewhere
+    search_vector: Mapped[Optional[str]] = mapped_column(TSVECTOR().with_variant(Text(), "sqlite"), nullable=True)
 
 
     def must_implement(self) -> None:
         pass
+
+
+# Keyset pagination walks (tenant, sort key, id) in index order, see DocumentRepositoryImpl.find_page
+Index("ix_document_detail_tenant_created_at", DocumentModel.tenant_id, DocumentModel.created_at, DocumentModel.id)
+Index("ix_document_detail_tenant_name", DocumentModel.tenant_id, func.coalesce(DocumentModel.name, ""), DocumentModel.id)
+
+# Full-text search on search_vector, and trigram matching of partial file names
+Index("ix_document_detail_search_vector", DocumentModel.search_vector, postgresql_using="gin")
+Index("ix_document_detail_name_trgm", DocumentModel.name, postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"})
+
+# The extension and trigger below are only installed when the table is created; existing
+# databases get them, along with the columns and indexes above, from
+# migrations/0001_document_content_and_search.sql
+event.listen(
+    DocumentModel.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+event.listen(
+    DocumentModel.__table__,
+    "after_create",
+    DDL("""
+        CREATE OR REPLACE FUNCTION document_detail_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce(NEW.author, '')), 'C');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER document_detail_search_vector_trigger
+            BEFORE INSERT OR UPDATE OF name, description, author ON document_detail
+            FOR EACH ROW EXECUTE FUNCTION document_detail_search_vector_update();
+    """).execute_if(dialect="postgresql"),
+)
+
+
+# Reference counts of content-addressed payloads. Each distinct payload is stored once per
+# storage under its SHA-256 and removed when the last document pointing at it goes away.
+document_content_reference = Table(
+    "document_content_reference",
+    DocumentModel.metadata,
+    Column("storage_id", UUID(as_uuid=True), primary_key=True),
+    Column("content_hash", String(64), primary_key=True),
+    Column("physical_path", String(1000), nullable=False),
+    Column("reference_count", Integer, nullable=False, default=1),
+)
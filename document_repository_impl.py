@@ -1,12 +1,19 @@
+from datetime import datetime
 import os
-from typing import BinaryIO
+from typing import BinaryIO, Callable, Sequence
 from uuid import UUID
 from fastapi_injector import Injected
 from injector import inject
+from sqlalchemy import Double, Select, case, cast, delete, func, insert, or_, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from pylekhagaar.core.contracts.idocument_metadata_cache import IDocumentMetadataCache
 from pylekhagaar.core.contracts.idocument_repository import IDocumentRepository
 from pylekhagaar.core.schemas.document import Document
-from pylekhagaar.modules.document.document_model import DocumentModel
+from pylekhagaar.core.schemas.document_cursor_page import DocumentCursorPage
+from pylekhagaar.core.schemas.document_row_page import DocumentRowPage
+from pylekhagaar.helpers.helper_functions import decode_cursor, encode_cursor
+from pylekhagaar.modules.document.document_model import DocumentModel, document_content_reference
 from pycrud.core.contracts.icrud_logger import ICrudLogger
 from pycrud.core.contracts.icurrent_user_provider import ICurrentUserProvider
 from pycrud.core.contracts.idatetime_provider import IDateTimeProvider
@@ -15,6 +22,189 @@ from pycrud.repository.base_tenant_repository_impl import BaseTenantRepositoryIm
 from pycrud.core.schemas.paged_result import PagedResult
 from pycrud.core.contracts.idata_filter import IDataFilter
 from pycrud.core.contracts.itenant_provider import ITenantProvider
+from pycrud.core.data_filters.simple_search_filter import SimpleSearchFilter
+
+
+# Maximum number of ids bound into a single IN clause
+BATCH_STATEMENT_SIZE = 1000
+
+# Sort keys supported by keyset pagination, each backed by a (tenant_id, key, id) index
+KEYSET_SORT_KEYS = {
+    "created_at": DocumentModel.created_at,
+    "name": func.coalesce(DocumentModel.name, ""),
+}
+
+# Columns that list queries may project with fields=; physical_path is deliberately absent
+LIST_FIELDS = {
+    "id": DocumentModel.id,
+    "tenant_id": DocumentModel.tenant_id,
+    "created_at": DocumentModel.created_at,
+    "name": DocumentModel.name,
+    "description": DocumentModel.description,
+    "mime_type": DocumentModel.mime_type,
+    "author": DocumentModel.author,
+    "doc_type": DocumentModel.doc_type,
+    "storage_type": DocumentModel.storage_type,
+    "storage_id": DocumentModel.storage_id,
+    "content_hash": DocumentModel.content_hash,
+}
+
+# Columns loaded by metadata lookups that are exposed to clients: every column but the storage path and search index
+METADATA_COLUMNS = [column for column in DocumentModel.__table__.columns
+                    if column.key not in ("physical_path", "search_vector")]
+
+
+def contains_pattern(text: str) -> str:
+    """ LIKE pattern matching text anywhere, with its wildcards escaped; use with escape="\\". """
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def build_find_page_queries(data_filter: SimpleSearchFilter, cursor: str | None, page_size: int,
+                            tenant_id) -> tuple[Select, Select]:
+    """
+    Build the statements of a keyset page (see DocumentRepositoryImpl.find_page), shared by the
+    sync and async repositories.
+    :return: Tuple containing the query of the page's rows (one more than page_size, to detect
+             a following page) and the query counting all matching documents.
+    """
+    sort_on = data_filter.sort_on or "created_at"
+    if sort_on not in KEYSET_SORT_KEYS:
+        raise ValueError(f"Cursor pagination cannot sort on '{sort_on}'")
+    sort_key = KEYSET_SORT_KEYS[sort_on]
+    ascending = data_filter.sort_ascending
+
+    conditions = [DocumentModel.tenant_id == tenant_id]
+    if data_filter.search_text:
+        pattern = f"%{data_filter.search_text}%"
+        conditions.append(or_(DocumentModel.name.ilike(pattern),
+                              DocumentModel.description.ilike(pattern),
+                              DocumentModel.author.ilike(pattern)))
+
+    query = select(DocumentModel).where(*conditions)
+    if cursor:
+        cursor_sort_on, cursor_ascending, last_key, last_id = decode_cursor(cursor, str, bool, str, str)
+        if (cursor_sort_on, cursor_ascending) != (sort_on, ascending):
+            raise ValueError("Cursor does not match the requested sort order")
+        # Both raise ValueError on a malformed value
+        if sort_on == "created_at":
+            last_key = datetime.fromisoformat(last_key)
+        last_id = UUID(last_id)
+
+        position = tuple_(sort_key, DocumentModel.id)
+        last_position = tuple_(last_key, last_id)
+        query = query.where(position > last_position if ascending else position < last_position)
+
+    order = (sort_key.asc(), DocumentModel.id.asc()) if ascending else (sort_key.desc(), DocumentModel.id.desc())
+    count_query = select(func.count()).select_from(DocumentModel).where(*conditions)
+    return query.order_by(*order).limit(page_size + 1), count_query
+
+
+def build_find_page_result(db_items: Sequence[DocumentModel], data_filter: SimpleSearchFilter, page_size: int,
+                           total_count: int | None) -> DocumentCursorPage:
+    """ Build a keyset page from the rows fetched with build_find_page_queries. physical_path is cleared. """
+    sort_on = data_filter.sort_on or "created_at"
+
+    next_cursor = None
+    if len(db_items) > page_size:
+        db_items = db_items[:page_size]
+        last = db_items[-1]
+        last_key = last.created_at.isoformat() if sort_on == "created_at" else (last.name or "")
+        next_cursor = encode_cursor([sort_on, data_filter.sort_ascending, last_key, str(last.id)])
+
+    items = [Document.model_validate(db_item) for db_item in db_items]
+    for item in items:
+        item.physical_path = None
+
+    return DocumentCursorPage(items=items, next_cursor=next_cursor, total_count=total_count)
+
+
+def acquire_content_reference_row(session: Session, storage_id: UUID, content_hash: str, physical_path: str) -> str:
+    """
+    Add a reference to a content-addressed payload in the caller's transaction, registering it if it is new.
+    See DocumentRepositoryImpl.acquire_content_reference.
+    """
+    reference = document_content_reference.c
+    key = (reference.storage_id == storage_id) & (reference.content_hash == content_hash)
+
+    for _ in range(2):
+        updated = session.execute(
+            update(document_content_reference).where(key)
+            .values(reference_count=reference.reference_count + 1)
+            .returning(reference.physical_path)
+        ).scalar_one_or_none()
+        if updated is not None:
+            return updated
+
+        try:
+            with session.begin_nested():
+                session.execute(insert(document_content_reference).values(
+                    storage_id=storage_id,
+                    content_hash=content_hash,
+                    physical_path=physical_path,
+                    reference_count=1,
+                ))
+            return physical_path
+        except IntegrityError:
+            # Registered concurrently by another upload, count this one against it
+            continue
+
+    raise RuntimeError(f"Could not register content {content_hash}")
+
+
+def release_content_reference_row(session: Session, storage_id: UUID, content_hash: str) -> str | None:
+    """
+    Drop a reference to a content-addressed payload in the caller's transaction.
+    See DocumentRepositoryImpl.release_content_reference.
+    """
+    reference = document_content_reference.c
+    key = (reference.storage_id == storage_id) & (reference.content_hash == content_hash)
+
+    session.execute(
+        update(document_content_reference).where(key)
+        .values(reference_count=reference.reference_count - 1)
+    )
+    return session.execute(
+        delete(document_content_reference).where(key & (reference.reference_count <= 0))
+        .returning(reference.physical_path)
+    ).scalar_one_or_none()
+
+
+def replace_document_content(session: Session, stored: Document) -> list[Document]:
+    """
+    Record content written with IStorageProvider.write_document_content on its document row, in the
+    caller's transaction. Meant for background work, which has no request-scoped repository.
+    The row is locked while it is read and updated, so concurrent callers are serialized, and recording
+    the same content twice changes nothing.
+    :param session: Session owned by the caller, who commits it.
+    :param stored: The Document returned by write_document_content.
+    :return: Content no document uses anymore, for the caller to release with IStorageProvider.delete_document_contents:
+             the previous content of the document, or the new content if the document was deleted meanwhile
+             or already holds it.
+    """
+    db_item = session.get(DocumentModel, stored.id, with_for_update=True)
+    if db_item is None:
+        return [stored]
+
+    if (db_item.content_etag == stored.content_etag and db_item.content_hash == stored.content_hash
+            and (stored.content_hash or db_item.physical_path == stored.physical_path)):
+        # The write took one more reference to a content-addressed payload the document already holds
+        return [stored] if stored.content_hash else []
+
+    previous = Document.model_validate(db_item)
+
+    db_item.name = stored.name
+    db_item.mime_type = stored.mime_type
+    db_item.physical_path = stored.physical_path
+    db_item.content_hash = stored.content_hash
+    db_item.content_codec = stored.content_codec
+    db_item.content_size = stored.content_size
+    db_item.content_etag = stored.content_etag
+    db_item.content_modified_at = stored.content_modified_at
+
+    if previous.content_hash or (previous.physical_path and previous.physical_path != stored.physical_path):
+        return [previous]
+    return []
 
 
 class DocumentRepositoryImpl(IDocumentRepository, BaseTenantRepositoryImpl[Document, DocumentModel]):
@@ -30,6 +220,7 @@ class DocumentRepositoryImpl(IDocumentRepository, BaseTenantRepositoryImpl[Docum
                  tenant_provider: ITenantProvider = Injected(ITenantProvider),
                  current_user_provider: ICurrentUserProvider = Injected(ICurrentUserProvider),
                  date_time_provider: IDateTimeProvider = Injected(IDateTimeProvider),
+                 metadata_cache: IDocumentMetadataCache = Injected(IDocumentMetadataCache),
                  ) -> None:
         
         super().__init__(
@@ -40,6 +231,57 @@ class DocumentRepositoryImpl(IDocumentRepository, BaseTenantRepositoryImpl[Docum
                         date_time_provider=date_time_provider,
                         item_schema=Document,
                         item_db_model=DocumentModel)
+        self._session = session
+        self._engine = session.get_bind()
+        self._tenant_provider = tenant_provider
+        self._current_user_provider = current_user_provider
+        self._date_time_provider = date_time_provider
+        self._metadata_cache = metadata_cache
+
+
+    def get_by_id(self, id: UUID) -> Document | None:
+        """
+        Load a document of the current tenant, from the metadata cache when possible.
+        :param id: UUID of the document.
+        :return: A Document the caller may modify, or None if it does not exist.
+        """
+        tenant_id = self._current_tenant_id()
+        document = self._metadata_cache.get(tenant_id, id)
+        if document is None:
+            document = super().get_by_id(id)
+            if document is not None:
+                self._metadata_cache.put(tenant_id, document)
+        return document
+
+
+    def get_by_id_uncached(self, id: UUID) -> Document | None:
+        """
+        Load a document of the current tenant from the database, bypassing the metadata cache, and
+        refresh its cache entry. Operations replacing or deleting content use it, and so do content
+        reads when the cache is in-process: it may hold an entry another process has since replaced,
+        whose physical_path or validators no longer match the stored content.
+        :param id: UUID of the document.
+        :return: A Document the caller may modify, or None if it does not exist.
+        """
+        tenant_id = self._current_tenant_id()
+        document = super().get_by_id(id)
+        if document is not None:
+            self._metadata_cache.put(tenant_id, document)
+        else:
+            self._metadata_cache.invalidate(tenant_id, [id])
+        return document
+
+
+    def update(self, item: Document) -> Document:
+        updated = super().update(item)
+        self._metadata_cache.invalidate(self._current_tenant_id(), [item.id])
+        return updated
+
+
+    def delete(self, id: UUID):
+        deleted = super().delete(id)
+        self._metadata_cache.invalidate(self._current_tenant_id(), [id])
+        return deleted
 
 
 
@@ -54,6 +296,125 @@ class DocumentRepositoryImpl(IDocumentRepository, BaseTenantRepositoryImpl[Docum
 
         return result
 
+
+    def find_fields(self, data_filter: SimpleSearchFilter, fields: list[str], page_index: int = -1,
+                    page_size: int = 10) -> DocumentRowPage:
+        """
+        Find documents, selecting only the requested columns instead of loading whole rows.
+        :param data_filter: Search text and sort order. Only LIST_FIELDS can be sorted on.
+        :param fields: Names of the columns to return, from LIST_FIELDS; id is always included.
+        :param page_index: Zero-based page number, or -1 for all documents.
+        :param page_size: Number of documents per page.
+        :return: The page of rows, each mapping the requested field names to their values.
+        """
+        unknown_fields = [field for field in fields if field not in LIST_FIELDS]
+        if unknown_fields:
+            raise ValueError(f"Unknown fields: {', '.join(unknown_fields)}")
+        selected = ["id"] + [field for field in dict.fromkeys(fields) if field != "id"]
+
+        conditions = [DocumentModel.tenant_id == self._current_tenant_id()]
+        if data_filter.search_text:
+            pattern = f"%{data_filter.search_text}%"
+            conditions.append(or_(DocumentModel.name.ilike(pattern),
+                                  DocumentModel.description.ilike(pattern),
+                                  DocumentModel.author.ilike(pattern)))
+
+        query = select(*(LIST_FIELDS[field].label(field) for field in selected)).where(*conditions)
+        if data_filter.sort_on:
+            if data_filter.sort_on not in LIST_FIELDS:
+                raise ValueError(f"Cannot sort on '{data_filter.sort_on}'")
+            sort_key = LIST_FIELDS[data_filter.sort_on]
+            query = query.order_by(sort_key.asc() if data_filter.sort_ascending else sort_key.desc(),
+                                   DocumentModel.id)
+        if page_index >= 0:
+            query = query.offset(page_index * page_size).limit(page_size)
+
+        rows = self._session.execute(query).mappings().all()
+        total_count = self._session.scalar(select(func.count()).select_from(DocumentModel).where(*conditions))
+
+        return DocumentRowPage(items=[dict(row) for row in rows], total_count=total_count,
+                               page_index=page_index, page_size=page_size)
+
+
+    def find_page(self, data_filter: SimpleSearchFilter, cursor: str | None = None, page_size: int = 10,
+                  include_total: bool = False) -> DocumentCursorPage:
+        """
+        Find documents with keyset pagination: each page continues after the (sort key, id) of the
+        previous one, so any page costs the same as the first.
+        :param data_filter: Search text and sort order. Only KEYSET_SORT_KEYS can be sorted on.
+        :param cursor: next_cursor of the previous page, or None for the first page.
+        :param page_size: Number of documents per page.
+        :param include_total: Whether to also count all matching documents.
+        :return: The page of documents and the cursor of the next one.
+        """
+        query, count_query = build_find_page_queries(data_filter, cursor, page_size, self._current_tenant_id())
+        db_items = self._session.scalars(query).all()
+        total_count = self._session.scalar(count_query) if include_total else None
+        return build_find_page_result(db_items, data_filter, page_size, total_count)
+
+
+    def search(self, search_text: str, cursor: str | None = None, page_size: int = 10,
+               include_total: bool = False) -> DocumentCursorPage:
+        """
+        Full-text search over name, description and author, best matches first, then newest first.
+        On PostgreSQL this uses the GIN-indexed search_vector, with a trigram match on the name
+        so partial file names are still found. Other databases (SQLite in tests) fall back to
+        substring matching. Pages continue after the (rank, created_at, id) of the previous one,
+        so documents added meanwhile neither shift nor repeat results.
+        :param search_text: Words to search for.
+        :param cursor: next_cursor of the previous page, or None for the first page.
+        :param page_size: Number of documents per page.
+        :param include_total: Whether to also count all matching documents.
+        :return: The page of documents and the cursor of the next one.
+        """
+        pattern = contains_pattern(search_text)
+        if self._session.get_bind().dialect.name == "postgresql":
+            ts_query = func.websearch_to_tsquery("simple", search_text)
+            match = or_(DocumentModel.search_vector.op("@@")(ts_query),
+                        DocumentModel.name.ilike(pattern, escape="\\"))
+            # ts_rank and similarity return real; ranks are compared as double precision, the type
+            # a cursor's rank is bound back as, so the last rank of a page matches its rows exactly
+            rank = cast(func.greatest(func.ts_rank(DocumentModel.search_vector, ts_query),
+                                      func.similarity(DocumentModel.name, search_text)), Double)
+        else:
+            match = or_(DocumentModel.name.ilike(pattern, escape="\\"),
+                        DocumentModel.description.ilike(pattern, escape="\\"),
+                        DocumentModel.author.ilike(pattern, escape="\\"))
+            rank = case((DocumentModel.name.ilike(pattern, escape="\\"), 3),
+                        (DocumentModel.description.ilike(pattern, escape="\\"), 2),
+                        else_=1)
+
+        conditions = [DocumentModel.tenant_id == self._current_tenant_id(), match]
+
+        total_count = None
+        if include_total:
+            total_count = self._session.scalar(select(func.count()).select_from(DocumentModel).where(*conditions))
+
+        position = tuple_(rank, DocumentModel.created_at, DocumentModel.id)
+        query = select(DocumentModel, rank).where(*conditions)
+        if cursor:
+            cursor_kind, last_rank, last_created_at, last_id = decode_cursor(cursor, str, float, str, str)
+            if cursor_kind != "search":
+                raise ValueError("Cursor does not belong to a search")
+            query = query.where(position < tuple_(last_rank, datetime.fromisoformat(last_created_at), UUID(last_id)))
+
+        rows = self._session.execute(
+            query.order_by(rank.desc(), DocumentModel.created_at.desc(), DocumentModel.id.desc()).limit(page_size + 1)
+        ).all()
+
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last, last_rank = rows[-1]
+            next_cursor = encode_cursor(["search", float(last_rank), last.created_at.isoformat(), str(last.id)])
+        db_items = [db_item for db_item, _ in rows]
+
+        items = [Document.model_validate(db_item) for db_item in db_items]
+        for item in items:
+            item.physical_path = None
+
+        return DocumentCursorPage(items=items, next_cursor=next_cursor, total_count=total_count)
+
         
     def get_document_content(self, document_id: UUID) -> tuple[BinaryIO, str|None]:
         """
@@ -87,4 +448,174 @@ class DocumentRepositoryImpl(IDocumentRepository, BaseTenantRepositoryImpl[Docum
         # Delete metadata from database
         super().delete(document_id)
 
-        return True
\ No newline at end of file
+        return True
+
+
+    def get_many(self, ids: list[UUID]) -> list[Document]:
+        """
+        Load several documents of the current tenant with IN queries of up to BATCH_STATEMENT_SIZE ids,
+        keeping their storage details.
+        :param ids: Ids of the documents to load.
+        :return: The Documents found, each once, in the order their ids first appear. Unknown ids are skipped.
+        """
+        unique_ids = list(dict.fromkeys(ids))
+        if not unique_ids:
+            return []
+
+        by_id: dict[UUID, Document] = {}
+        for start in range(0, len(unique_ids), BATCH_STATEMENT_SIZE):
+            db_items = self._session.scalars(
+                select(DocumentModel).where(
+                    DocumentModel.tenant_id == self._current_tenant_id(),
+                    DocumentModel.id.in_(unique_ids[start:start + BATCH_STATEMENT_SIZE]),
+                )
+            )
+            by_id.update((db_item.id, Document.model_validate(db_item)) for db_item in db_items)
+
+        return [by_id[id] for id in unique_ids if id in by_id]
+
+
+    def get_many_metadata(self, ids: list[UUID]) -> list[Document]:
+        """
+        Load the metadata of several documents of the current tenant with IN queries of up to
+        BATCH_STATEMENT_SIZE ids. Only METADATA_COLUMNS are selected, so physical_path never leaves the database.
+        :param ids: Ids of the documents to load; duplicates are queried once.
+        :return: The Documents found, in the order of ids. Unknown ids are skipped.
+        """
+        unique_ids = list(dict.fromkeys(ids))
+        if not unique_ids:
+            return []
+
+        by_id: dict[UUID, Document] = {}
+        for start in range(0, len(unique_ids), BATCH_STATEMENT_SIZE):
+            rows = self._session.execute(
+                select(*METADATA_COLUMNS).where(
+                    DocumentModel.tenant_id == self._current_tenant_id(),
+                    DocumentModel.id.in_(unique_ids[start:start + BATCH_STATEMENT_SIZE]),
+                )
+            ).mappings()
+            by_id.update((row["id"], Document.model_validate(dict(row))) for row in rows)
+
+        return [by_id[id] for id in ids if id in by_id]
+
+
+    def find_all(self, data_filter: IDataFilter) -> list[Document]:
+        """
+        Load every document matching a filter, keeping their storage details.
+        :param data_filter: The filter to apply.
+        :return: The matching Documents.
+        """
+        return super().find(data_filter).items
+
+
+    def add_many(self, items: list[Document]) -> list[Document]:
+        """
+        Insert several documents with a single batched INSERT and one commit.
+        :param items: Documents to insert.
+        :return: The inserted Documents, in the same order.
+        """
+        db_items = [self._new_db_item(item) for item in items]
+        self._session.add_all(db_items)
+        self._session.flush()
+
+        # Convert before committing so the items are not expired and reloaded one by one
+        documents = [Document.model_validate(db_item) for db_item in db_items]
+        self._session.commit()
+        return documents
+
+
+    def update_content_many(self, items: list[Document]) -> None:
+        """
+        Record the stored content (name, mime_type, physical_path, content_hash, content_codec and properties) of several
+        documents of the current tenant with one batched UPDATE. Rows of other tenants are left untouched.
+        :param items: Documents whose content was written with IStorageProvider.write_document_content,
+                      which already referenced content-addressed payloads.
+        """
+        if not items:
+            return
+
+        tenant_id = self._current_tenant_id()
+        # Each row is matched by its id, bound per parameter set, and by the current tenant
+        self._session.execute(update(DocumentModel).where(DocumentModel.tenant_id == tenant_id), [
+            {
+                "id": item.id,
+                "name": item.name,
+                "mime_type": item.mime_type,
+                "physical_path": item.physical_path,
+                "content_hash": item.content_hash,
+                "content_codec": item.content_codec,
+                "content_size": item.content_size,
+                "content_etag": item.content_etag,
+                "content_modified_at": item.content_modified_at,
+            }
+            for item in items
+        ])
+        self._session.commit()
+        self._metadata_cache.invalidate(tenant_id, [item.id for item in items])
+
+
+    def delete_many(self, ids: list[UUID]) -> int:
+        """
+        Delete the metadata of several documents of the current tenant with set-based DELETE statements.
+        :param ids: Ids of the documents to delete.
+        :return: Number of rows deleted.
+        """
+        deleted = 0
+        for start in range(0, len(ids), BATCH_STATEMENT_SIZE):
+            deleted += self._session.execute(
+                delete(DocumentModel).where(
+                    DocumentModel.tenant_id == self._current_tenant_id(),
+                    DocumentModel.id.in_(ids[start:start + BATCH_STATEMENT_SIZE]),
+                )
+            ).rowcount
+        self._session.commit()
+        self._metadata_cache.invalidate(self._current_tenant_id(), ids)
+        return deleted
+
+
+    def acquire_content_reference(self, storage_id: UUID, content_hash: str, physical_path: str) -> str:
+        """
+        Add a reference to a content-addressed payload, registering it if it is new.
+        Committed in a session of its own, so storage providers may call it from worker threads.
+        :param storage_id: Storage holding the payload.
+        :param content_hash: SHA-256 of the payload.
+        :param physical_path: Location the caller stored the payload at.
+        :return: Location of the registered payload, which is the existing one if the payload was already known.
+        """
+        with Session(self._engine) as session:
+            physical_path = acquire_content_reference_row(session, storage_id, content_hash, physical_path)
+            session.commit()
+        return physical_path
+
+
+    def release_content_reference(self, storage_id: UUID, content_hash: str,
+                                  delete_payload: Callable[[str], None] | None = None) -> str | None:
+        """
+        Drop a reference to a content-addressed payload.
+        Committed in a session of its own, so storage providers may call it from worker threads.
+        :param storage_id: Storage holding the payload.
+        :param content_hash: SHA-256 of the payload.
+        :param delete_payload: Deletes the payload when this was its last reference. It runs before the release
+                               commits, so a concurrent acquire_content_reference waits for it and then registers
+                               the payload anew; if it fails the reference is kept.
+        :return: Location of the payload if this was its last reference, None otherwise.
+        """
+        with Session(self._engine) as session:
+            physical_path = release_content_reference_row(session, storage_id, content_hash)
+            if physical_path and delete_payload is not None:
+                delete_payload(physical_path)
+            session.commit()
+        return physical_path
+
+
+    def _current_tenant_id(self):
+        return self._tenant_provider.get_tenant_id()
+
+
+    def _new_db_item(self, item: Document) -> DocumentModel:
+        """ Build a DocumentModel for insertion, stamped like add does with the current tenant, user and time. """
+        db_item = DocumentModel(**item.model_dump(exclude_none=True))
+        db_item.tenant_id = self._current_tenant_id()
+        db_item.created_by = self._current_user_provider.get_current_user()
+        db_item.created_at = self._date_time_provider.get_current_datetime()
+        return db_item
@@ -1,12 +1,27 @@
-from typing import Optional
-from uuid import UUID
-from fastapi import APIRouter, File, HTTPException, UploadFile,status
+from typing import Iterator, Optional
+from uuid import UUID, uuid4
+from fastapi import APIRouter, Body, File, Form, Header, HTTPException, Response, UploadFile,status
 from fastapi import Query
-from fastapi.responses import StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi_injector import Injected
 from fastapi_utils.cbv import cbv
 from pylekhagaar.core.contracts.idocument_service import IDocumentService
+from pylekhagaar.core.contracts.istorage_provider import DocumentContentProperties
+from pylekhagaar.core.exceptions.ingest_queue_full_exception import IngestQueueFullException
+from pylekhagaar.helpers.helper_functions import (accepts_encoding, document_etag, format_http_date, if_range_matches,
+                                                  is_not_modified, parse_range_header)
+from pylekhagaar.core.schemas.bulk_delete_result import BulkDeleteItemResult
+from pylekhagaar.core.schemas.bulk_upload_result import BulkUploadItemResult
 from pylekhagaar.core.schemas.document import Document
+from pylekhagaar.core.schemas.document_batch_get_request import DocumentBatchGetRequest
+from pylekhagaar.core.schemas.document_batch_get_result import DocumentBatchGetResult
+from pylekhagaar.core.schemas.document_content_url import DocumentContentUrl
+from pylekhagaar.core.schemas.document_export_request import DocumentExportRequest
+from pylekhagaar.core.schemas.document_upload_request import DocumentUploadRequest
+from pylekhagaar.core.schemas.ingest_job_status import IngestJobStatus
+from pylekhagaar.core.schemas.upload_session import UploadSession
+from pylekhagaar.core.schemas.upload_session_request import UploadSessionRequest
 from pycrud.core.data_filters.simple_search_filter import SimpleSearchFilter
 from pycrud.core.schemas.paged_result import PagedResult
 from pycrud.core.exceptions.not_found_exception import NotFoundException
@@ -26,10 +41,21 @@ class DocumentController:
              sort_on: Optional[str] = Query(None),
              sort_ascending: bool = Query(True),
              page_index: int = Query(0),
-             page_size: int = Query(10)
+             page_size: int = Query(10),
+             pagination: str = Query("offset", pattern="^(offset|cursor)$"),
+             cursor: Optional[str] = Query(None),
+             include_total: bool = Query(False),
+             search_mode: str = Query("substring", pattern="^(substring|fulltext)$"),
+             fields: Optional[str] = Query(None)
              ):
         """
         Find all documents.
+        With pagination=cursor, pages are fetched by keyset: pass the returned next_cursor to get
+        the following page (page_index is ignored, and the total is only counted if include_total is set).
+        With search_mode=fulltext, search_text is matched with the full-text index and results are
+        ranked by relevance; they are paged with next_cursor as well.
+        With fields=name,mime_type,... (offset pagination only), each item holds just the listed
+        fields plus id.
         :return: A paged result containing a list of documents meta data.
         """
 
@@ -39,6 +65,25 @@ class DocumentController:
                                          sort_on=sort_on,
                                          sort_ascending=sort_ascending
                                          )
+
+        if search_mode == "fulltext" and search_text:
+            try:
+                return self._document_service.search(search_text, cursor, page_size, include_total)
+            except ValueError as ex:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ex))
+
+        if pagination == "cursor":
+            try:
+                return self._document_service.find_page(data_filter, cursor, page_size, include_total)
+            except ValueError as ex:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ex))
+
+        if fields:
+            field_names = [field.strip() for field in fields.split(",") if field.strip()]
+            try:
+                return self._document_service.find_fields(data_filter, field_names, page_index, page_size)
+            except ValueError as ex:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ex))
        
         # Call the service to find all students
         result: PagedResult[Document] = self._document_service.find(data_filter, page_index, page_size)
@@ -58,16 +103,218 @@ class DocumentController:
         return result
     
 
+    @document_router.post("/bulk", operation_id="bulk_upload_documents")
+    def bulk_upload(self,
+                    files: list[UploadFile] = File(...),
+                    storage_id: UUID = Form(...),
+                    doc_type: Optional[str] = Form(None),
+                    author: Optional[str] = Form(None),
+                    description: Optional[str] = Form(None)) -> list[BulkUploadItemResult]:
+        """
+        Create documents with their content in one request.
+        - files: the files to store; zip and tar archives are expanded into their members.
+        - storage_id, doc_type, author, description: metadata applied to every document.
+        :return: One result per file, reporting the new document id or the error.
+        """
+        try:
+            template = Document(storage_id=storage_id, doc_type=doc_type, author=author, description=description)
+            return self._document_service.add_many_with_content(files, template)
+        except Exception as ex:
+            raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ex)
+        )
+
+
+    @document_router.post("/export", operation_id="export_documents")
+    def export_documents(self, export_request: DocumentExportRequest):
+        """
+        Download several documents as one ZIP archive, streamed as it is built.
+        - ids: documents to export, in archive order; or
+        - search_text, sort_on, sort_ascending: filter selecting the documents to export.
+        :return: StreamingResponse with the ZIP archive.
+        """
+        try:
+            if export_request.ids is not None:
+                archive = self._document_service.export_documents(document_ids=export_request.ids)
+            else:
+                data_filter = SimpleSearchFilter(search_text=export_request.search_text,
+                                                 sort_on=export_request.sort_on,
+                                                 sort_ascending=export_request.sort_ascending
+                                                 )
+                archive = self._document_service.export_documents(data_filter=data_filter)
+
+            return StreamingResponse(archive,
+                                     media_type="application/zip",
+                                     headers={"Content-Disposition": 'attachment; filename="documents.zip"'})
+        except Exception as ex:
+            raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ex)
+        )
+
+
     @document_router.post("/{id}/content", operation_id="set_document_content")
-    def set_document_content(self,id: UUID, file: UploadFile = File(...)):
+    def set_document_content(self,id: UUID, file: UploadFile = File(...),
+                             ingest: str = Query("sync", pattern="^(sync|async)$")):
         """
         Upload or replace file content for an existing document.
+        With ingest=async the file is spooled and written to storage in the background: the response
+        is 202 with the ingest job, to be followed with GET /documents/ingest-jobs/{job_id}.
         - document_id: UUID of the document.
         - file: uploaded file stream.
         """
         try:
+            if ingest == "async":
+                job = self._document_service.ingest_document_content(id, file)
+                return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=job.model_dump(mode="json"))
+
             updated_doc = self._document_service.set_document_content(id, file)
             return updated_doc
+        except IngestQueueFullException as ex:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(ex))
+        except Exception as ex:
+            raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ex)
+        )
+
+
+    @document_router.get("/ingest-jobs/{job_id}", operation_id="get_ingest_job")
+    def get_ingest_job(self, job_id: UUID) -> IngestJobStatus:
+        """
+        Get the status of an asynchronous upload, which is completed once its content is recorded on
+        the document. Reading it also resumes a job whose process is gone.
+        - job_id: id returned by POST /documents/{id}/content?ingest=async.
+        """
+        try:
+            return self._document_service.get_ingest_job(job_id)
+        except NotFoundException as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except Exception as ex:
+            raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ex)
+        )
+
+
+    @document_router.post("/{id}/upload-url", operation_id="get_document_upload_url")
+    def get_document_upload_url(self, id: UUID, upload_request: DocumentUploadRequest) -> DocumentContentUrl:
+        """
+        Get a short-lived URL to upload a document's file directly to storage, bypassing the API.
+        Once the file is uploaded, call upload-complete with the same filename.
+        - document_id: UUID of the document.
+        - filename: name of the file to upload.
+        """
+        try:
+            return self._document_service.get_document_upload_url(id, upload_request.filename)
+        except Exception as ex:
+            raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ex)
+        )
+
+
+    @document_router.post("/{id}/upload-complete", operation_id="complete_document_upload")
+    def complete_document_upload(self, id: UUID, upload_request: DocumentUploadRequest) -> Document:
+        """
+        Record a file uploaded through upload-url as the content of a document.
+        - document_id: UUID of the document.
+        - filename: name of the uploaded file.
+        """
+        try:
+            return self._document_service.complete_document_upload(id, upload_request.filename)
+        except Exception as ex:
+            raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ex)
+        )
+
+
+    @document_router.post("/{id}/upload-sessions", operation_id="create_upload_session",
+                          status_code=status.HTTP_201_CREATED)
+    def create_upload_session(self, id: UUID, session_request: UploadSessionRequest) -> UploadSession:
+        """
+        Start a resumable upload of a large file, sent in numbered chunks of chunk_size bytes.
+        - document_id: UUID of the document.
+        - filename, size: name and size in bytes of the file being uploaded.
+        """
+        try:
+            return self._document_service.create_upload_session(id, session_request.filename, session_request.size)
+        except NotFoundException as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except Exception as ex:
+            raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ex)
+        )
+
+
+    @document_router.put("/upload-sessions/{upload_id}/chunks/{index}", operation_id="upload_session_chunk")
+    def upload_session_chunk(self, upload_id: UUID, index: int,
+                             chunk: bytes = Body(..., media_type="application/octet-stream")) -> UploadSession:
+        """
+        Upload one chunk of an upload session as the raw request body. Chunks may be sent in any
+        order and in parallel; a failed chunk is simply sent again.
+        - upload_id: id returned when the session was created.
+        - index: zero-based number of the chunk.
+        """
+        try:
+            return self._document_service.upload_session_chunk(upload_id, index, chunk)
+        except NotFoundException as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except Exception as ex:
+            raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ex)
+        )
+
+
+    @document_router.get("/upload-sessions/{upload_id}", operation_id="get_upload_session")
+    def get_upload_session(self, upload_id: UUID) -> UploadSession:
+        """
+        Get an upload session with the byte ranges received so far, to resume it after an interruption.
+        - upload_id: id returned when the session was created.
+        """
+        try:
+            return self._document_service.get_upload_session(upload_id)
+        except NotFoundException as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except Exception as ex:
+            raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ex)
+        )
+
+
+    @document_router.post("/upload-sessions/{upload_id}/complete", operation_id="complete_upload_session")
+    def complete_upload_session(self, upload_id: UUID) -> Document:
+        """
+        Assemble the chunks of an upload session into the document's content, once every chunk was received.
+        - upload_id: id returned when the session was created.
+        """
+        try:
+            return self._document_service.complete_upload_session(upload_id)
+        except NotFoundException as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except Exception as ex:
+            raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ex)
+        )
+
+
+    @document_router.delete("/upload-sessions/{upload_id}", operation_id="abort_upload_session")
+    def abort_upload_session(self, upload_id: UUID):
+        """
+        Cancel an upload session and discard its chunks.
+        - upload_id: id returned when the session was created.
+        """
+        try:
+            self._document_service.abort_upload_session(upload_id)
+            return {"message": f"Upload session {upload_id} cancelled"}
+        except NotFoundException as e:
+            raise HTTPException(status_code=404, detail=str(e))
         except Exception as ex:
             raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -77,13 +324,20 @@ class DocumentController:
 
 
     @document_router.get("/{id}/document",operation_id="get_document_by_Id")
-    def get_document(self,id: UUID) -> Document:
+    def get_document(self,id: UUID, response: Response,
+                     if_none_match: Optional[str] = Header(None, alias="If-None-Match")) -> Document:
         """
         Get document metadata by ID.
+        Sends an ETag of the metadata and answers a matching If-None-Match with 304.
         - document_id: UUID of the document.
         """
         try:
             document = self._document_service.get_by_id(id)
+            etag = document_etag(document)
+            if is_not_modified(if_none_match, None, etag, None):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+            response.headers["ETag"] = etag
             return document
         except Exception as ex:
             raise HTTPException(
@@ -93,24 +347,158 @@ class DocumentController:
 
 
     @document_router.get("/{id}/content", operation_id="get_document_content")
-    def get_document_content(self,id: UUID):
+    def get_document_content(self,id: UUID,
+                             range_header: Optional[str] = Header(None, alias="Range"),
+                             if_range: Optional[str] = Header(None, alias="If-Range"),
+                             accept_encoding: Optional[str] = Header(None, alias="Accept-Encoding"),
+                             if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+                             if_modified_since: Optional[str] = Header(None, alias="If-Modified-Since"),
+                             delivery: str = Query("stream", pattern="^(stream|redirect|url)$")):
         """
             Download the file content of a document by ID.
+            Honours Range (single and multiple byte ranges) and If-Range with a 206 response.
+            Content kept on local disk, or in a local cache of the storage, is sent with a zero-copy
+            file response.
+            Content stored compressed is sent as stored with Content-Encoding when the client
+            accepts its codec, otherwise it is decompressed on the fly (without range support).
+            A matching If-None-Match / If-Modified-Since is answered with 304 from the validators
+            recorded on upload, without reading the content.
+            With delivery=redirect (302) or delivery=url (JSON with url and expires_at), clients are sent
+            to a short-lived read-only URL of the storage instead; storages that cannot provide one, and
+            compressed content the client cannot decode, are streamed as usual.
             - document_id: UUID of the document.
-            :return: StreamingResponse with the file content.
+            :return: FileResponse or StreamingResponse with the file content.
             """
         
         try:
-            file_stream, filename = self._document_service.get_document_content(id)
+            document = self._document_service.get_document_for_content(id)
+            media_type = document.mime_type or "application/octet-stream"
+
+            if delivery != "stream" and (not document.content_codec
+                                         or accepts_encoding(accept_encoding, document.content_codec)):
+                content_url = self._document_service.get_document_content_url(document)
+                if content_url and delivery == "redirect":
+                    return RedirectResponse(content_url.url, status_code=status.HTTP_302_FOUND,
+                                            headers={"Cache-Control": "no-store"})
+                if content_url:
+                    return content_url
+
+            # Validators recorded on upload answer conditional requests without touching storage,
+            # documents uploaded before they were recorded ask the storage for them
+            properties = (DocumentContentProperties.from_document(document)
+                          or self._document_service.get_document_content_properties(document))
+
+            decode = document.content_codec is not None and not accepts_encoding(accept_encoding, document.content_codec)
+            # The decoded bytes differ from the stored ones, so their entity tag is only weak
+            etag = f"W/{properties.etag.removeprefix('W/')}" if decode and properties.etag else properties.etag
+
+            if is_not_modified(if_none_match, if_modified_since, properties.etag, properties.last_modified):
+                # A 304 repeats the validator the 200 would have sent
+                headers = self._content_headers(properties)
+                if etag:
+                    headers["ETag"] = etag
+                if document.content_codec:
+                    headers["Vary"] = "Accept-Encoding"
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+            if decode:
+                file_stream, filename = self._document_service.open_document_content(document)
+                headers = {"Content-Disposition": f'attachment; filename="{filename}"', "Vary": "Accept-Encoding"}
+                if etag:
+                    headers["ETag"] = etag
+                if properties.last_modified:
+                    headers["Last-Modified"] = format_http_date(properties.last_modified)
+                return StreamingResponse(file_stream, media_type=media_type, headers=headers)
+
+            if range_header:
+                ranges = None
+                if if_range is None or if_range_matches(if_range, properties.etag, properties.last_modified):
+                    ranges = parse_range_header(range_header, properties.size)
+
+                if ranges == []:
+                    return Response(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                                    headers={"Content-Range": f"bytes */{properties.size}"})
+                if ranges:
+                    return self._partial_content_response(document, media_type, ranges, properties)
+
+            local_file = self._document_service.get_document_content_file(document)
+            if local_file:
+                # Cached copies stay pinned until the response has been sent
+                return FileResponse(local_file.path,
+                                    stat_result=local_file.stat_result,
+                                    media_type=media_type,
+                                    filename=document.name,
+                                    headers=self._content_headers(properties, document.content_codec),
+                                    background=BackgroundTask(local_file.release) if local_file.release else None)
+
+            file_stream, filename = self._document_service.open_document_content(document, decompress=False)
 
             fileresponseData = StreamingResponse(
                                                 file_stream,
-                                                media_type="application/octet-stream",
-                                                headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+                                                media_type=media_type,
+                                                headers={"Content-Disposition": f'attachment; filename="{filename}"',
+                                                         **self._content_headers(properties, document.content_codec)}
                                                 )
             return fileresponseData
         except Exception as e:
             raise HTTPException(status_code=400, detail=str(e))
+
+
+    def _content_headers(self, properties: DocumentContentProperties | None,
+                         content_codec: str | None = None) -> dict[str, str]:
+        """ Headers advertising range support, the validators of the content when known,
+        and the encoding of content sent as stored compressed. """
+        headers = {"Accept-Ranges": "bytes"}
+        if properties and properties.etag:
+            headers["ETag"] = properties.etag
+        if properties and properties.last_modified:
+            headers["Last-Modified"] = format_http_date(properties.last_modified)
+        if content_codec:
+            headers["Content-Encoding"] = content_codec
+            headers["Vary"] = "Accept-Encoding"
+        return headers
+
+
+    def _partial_content_response(self, document: Document, media_type: str, ranges: list[tuple[int, int]],
+                                  properties: DocumentContentProperties) -> StreamingResponse:
+        """
+        Build a 206 response for the requested byte ranges.
+        A single range is sent as-is, several ranges as multipart/byteranges.
+        """
+        headers = self._content_headers(properties, document.content_codec)
+
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            headers["Content-Range"] = f"bytes {start}-{end}/{properties.size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(self._document_service.get_document_content_range(document, start, end - start + 1),
+                                     status_code=status.HTTP_206_PARTIAL_CONTENT,
+                                     media_type=media_type,
+                                     headers=headers)
+
+        boundary = uuid4().hex
+        part_headers = [
+            (f"--{boundary}\r\n"
+             f"Content-Type: {media_type}\r\n"
+             f"Content-Range: bytes {start}-{end}/{properties.size}\r\n\r\n").encode()
+            for start, end in ranges
+        ]
+        closing = f"--{boundary}--\r\n".encode()
+        headers["Content-Length"] = str(
+            sum(len(part) + (end - start + 1) + 2 for part, (start, end) in zip(part_headers, ranges)) + len(closing)
+        )
+
+        def multipart_body() -> Iterator[bytes]:
+            for part, (start, end) in zip(part_headers, ranges):
+                yield part
+                yield from self._document_service.get_document_content_range(document, start, end - start + 1)
+                yield b"\r\n"
+            yield closing
+
+        return StreamingResponse(multipart_body(),
+                                 status_code=status.HTTP_206_PARTIAL_CONTENT,
+                                 media_type=f"multipart/byteranges; boundary={boundary}",
+                                 headers=headers)
         
 
     @document_router.delete("/{id}/document", operation_id="delete_document")
@@ -126,4 +514,46 @@ class DocumentController:
         except NotFoundException as e:
             raise HTTPException(status_code=404, detail=str(e))
         except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+            raise HTTPException(status_code=500, detail=str(e))
+
+
+    @document_router.post("/bulk-delete", operation_id="bulk_delete_documents")
+    def bulk_delete_documents(self, ids: list[UUID] = Body(...)) -> list[BulkDeleteItemResult]:
+        """
+        Delete several documents and their content.
+        - ids: UUIDs of the documents to delete.
+        :return: One result per id, reporting whether it was deleted and why not.
+        """
+        try:
+            return self._document_service.delete_documents(ids)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+
+    @document_router.post("/batch-get", operation_id="batch_get_documents")
+    def batch_get_documents(self, batch_request: DocumentBatchGetRequest) -> DocumentBatchGetResult:
+        """
+        Get the metadata of several documents in one request.
+        - ids: UUIDs of the documents, at most MAX_BATCH_GET_IDS.
+        :return: The documents found, in request order, and the ids that were not found.
+        """
+        try:
+            return self._document_service.get_documents(batch_request.ids)
+        except Exception as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+    @document_router.get("/content-cache/stats", operation_id="get_content_cache_stats")
+    def get_content_cache_stats(self) -> list[dict]:
+        """
+        Get the hit ratio, eviction counters and size of each local disk cache of storage content.
+        """
+        return self._document_service.get_content_cache_stats()
+
+
+    @document_router.get("/metadata-cache/stats", operation_id="get_metadata_cache_stats")
+    def get_metadata_cache_stats(self) -> dict:
+        """
+        Get the hit and miss counters of the document metadata cache.
+        """
+        return self._document_service.get_metadata_cache_stats()
@@ -0,0 +1,14 @@
+from typing import Any, Optional
+from pydantic import BaseModel
+
+
+class DocumentRowPage(BaseModel):
+    """
+    One page of document list rows holding only the requested fields.
+    Rows are plain column name/value mappings; physical_path is never among them.
+    """
+
+    items: list[dict[str, Any]]
+    total_count: Optional[int] = None
+    page_index: int
+    page_size: int
@@ -1,20 +1,50 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+import json
 import os
 from pathlib import Path
-from typing import BinaryIO
-from uuid import UUID
+import shutil
+import threading
+import time
+from typing import AsyncIterator, BinaryIO, Callable, Iterable, Iterator
+from uuid import UUID, uuid4
+import anyio
 from fastapi import UploadFile
-from fastapi_injector import Injected
-from injector import inject
+from fastapi_injector import Injected, RequestScopeFactory
+from injector import Injector, inject
+from sqlalchemy import Engine
+from sqlalchemy.orm import Session
 from pylekhagaar.app_settings import AppSettings
+from pylekhagaar.core.contracts.iasync_storage_provider import IAsyncStorageProvider
+from pylekhagaar.core.contracts.iasync_storage_provider_factory import IAsyncStorageProviderFactory
+from pylekhagaar.core.contracts.idocument_async_repository import IDocumentAsyncRepository
+from pylekhagaar.core.contracts.idocument_metadata_cache import IDocumentMetadataCache
 from pylekhagaar.core.contracts.idocument_permission_checker import IDocumentPermissionChecker
 from pylekhagaar.core.contracts.idocument_repository import IDocumentRepository
 from pylekhagaar.core.contracts.idocument_service import IDocumentService
 from pylekhagaar.core.contracts.idocument_storage_type_repository import IDocStorageTypeRepository
-from pylekhagaar.core.contracts.istorage_provider import IStorageProvider
+from pylekhagaar.core.contracts.istorage_provider import DocumentContentFile, DocumentContentProperties, IStorageProvider
 from pylekhagaar.core.contracts.istorage_provider_factory import IStorageProviderFactory
+from pylekhagaar.core.exceptions.ingest_queue_full_exception import IngestQueueFullException
 from pylekhagaar.core.enum.storage_type_enum import StorageTypeEnum
-from pylekhagaar.helpers.helper_functions import DocumentLocationGenerator, guess_mime
+from pylekhagaar.helpers.helper_functions import (DiskCache, DocumentLocationGenerator, guess_mime, is_archive_upload,
+                                                  iter_archive_uploads, iter_stream_chunks, prefetch_chunks, stream_zip,
+                                                  unique_archive_name)
+from pylekhagaar.core.schemas.bulk_delete_result import BulkDeleteItemResult
+from pylekhagaar.core.schemas.bulk_upload_result import BulkUploadItemResult
 from pylekhagaar.core.schemas.document import Document
+from pylekhagaar.core.schemas.document_batch_get_result import DocumentBatchGetResult
+from pylekhagaar.core.schemas.document_content_url import DocumentContentUrl
+from pylekhagaar.core.schemas.document_cursor_page import DocumentCursorPage
+from pylekhagaar.core.schemas.document_row_page import DocumentRowPage
+from pylekhagaar.core.schemas.ingest_job_status import IngestJobStatus
+from pylekhagaar.core.schemas.upload_session import UploadSession
+from pylekhagaar.modules.document.document_repository_impl import replace_document_content
+from pycrud.core.contracts.icrud_logger import ICrudLogger
+from pycrud.core.contracts.idata_filter import IDataFilter
+from pycrud.core.data_filters.simple_search_filter import SimpleSearchFilter
 from pycrud.core.exceptions.not_found_exception import NotFoundException
 from pycrud.service.base_tenant_service_impl import BaseTenantServiceImpl
 
@@ -23,6 +53,61 @@ config = AppSettings()
 TEMP_DIRECTORY = Path(config.TEMP_DIRECTORY)
 TEMP_DIRECTORY.mkdir(exist_ok=True)
 
+# Number of content writes a bulk upload sends to the storage provider in parallel
+BULK_UPLOAD_CONCURRENCY = 8
+
+# Number of documents an export opens ahead of the one being written to the archive
+EXPORT_PREFETCH_DOCUMENTS = 4
+
+try:
+    import fcntl
+except ImportError:  # Windows locks job files with msvcrt instead
+    fcntl = None
+    import msvcrt
+
+
+# Uploads spooled for asynchronous ingest: <job id>.part holds the content, <job id>.json the job manifest
+# and <job id>.lock is locked by the process running the job. The OS drops that lock when the process
+# dies, so a job whose lock is free and that has not finished was abandoned and can be resumed.
+INGEST_DIRECTORY = TEMP_DIRECTORY / "ingest"
+INGEST_DIRECTORY.mkdir(exist_ok=True)
+
+# Number of spooled uploads written to storage in parallel by this process
+INGEST_WORKERS = 4
+
+# Spooled uploads accepted while earlier ones are still being written; further uploads are refused
+INGEST_MAX_QUEUED_JOBS = 256
+
+# Attempts made to write a spooled upload to storage, waiting INGEST_RETRY_DELAY_SECONDS * 2^n between them
+INGEST_MAX_ATTEMPTS = 5
+INGEST_RETRY_DELAY_SECONDS = 2
+
+# Statuses of jobs that have not finished: resumed when abandoned
+INGEST_UNFINISHED_STATUSES = ("pending", "running", "stored")
+
+# Manifests of finished jobs are removed after this long
+INGEST_JOB_RETENTION_SECONDS = 7 * 24 * 3600
+
+_ingest_executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest")
+
+# Jobs queued or running in this process
+_active_ingest_jobs: set[UUID] = set()
+_active_ingest_jobs_lock = threading.Lock()
+
+# Resumable upload sessions: <upload id>/session.json holds the manifest and <upload id>/chunks/<n>
+# marks chunk n as stored, so concurrent chunk uploads never rewrite a shared file
+UPLOAD_SESSION_DIRECTORY = TEMP_DIRECTORY / "upload_sessions"
+UPLOAD_SESSION_DIRECTORY.mkdir(exist_ok=True)
+
+# Size of every chunk of an upload session but the last, and of the Azure blocks they are staged as
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Azure block blobs hold at most 50,000 blocks, which caps uploads at about 390 GB
+UPLOAD_MAX_CHUNKS = 50000
+
+# Sessions not completed this long after they were created are discarded with their chunks
+UPLOAD_SESSION_TTL_SECONDS = 24 * 3600
+
 
 class DocumentServiceImpl(IDocumentService, BaseTenantServiceImpl[Document]):
     """Implementation of Document service operations."""
@@ -37,6 +122,11 @@ class DocumentServiceImpl(IDocumentService, BaseTenantServiceImpl[Document]):
                 permission_checker: IDocumentPermissionChecker = Injected(IDocumentPermissionChecker),
                 docstorage_type: IDocStorageTypeRepository = Injected(IDocStorageTypeRepository),
                 storage_provider_factory:IStorageProviderFactory = Injected(IStorageProviderFactory),
+                async_storage_provider_factory: IAsyncStorageProviderFactory = Injected(IAsyncStorageProviderFactory),
+                document_async_repository: IDocumentAsyncRepository = Injected(IDocumentAsyncRepository),
+                metadata_cache: IDocumentMetadataCache = Injected(IDocumentMetadataCache),
+                session: Session = Injected(Session),
+                logger: ICrudLogger = Injected(ICrudLogger),
                 # doc_location_generator: DocumentLocationGenerator = Injected(DocumentLocationGenerator)
                 ):
 
@@ -47,6 +137,12 @@ class DocumentServiceImpl(IDocumentService, BaseTenantServiceImpl[Document]):
         self._permission_checker: IDocumentPermissionChecker = permission_checker
         self._docstorage_type: IDocStorageTypeRepository = docstorage_type
         self._storage_provider_factory = storage_provider_factory
+        self._async_storage_provider_factory = async_storage_provider_factory
+        self._document_async_repository = document_async_repository
+        self._metadata_cache = metadata_cache
+        # Ingest workers outlive the request, so they open sessions of their own on its engine
+        self._engine = session.get_bind()
+        self._logger = logger.get_logger(__name__)
         # self.doc_location_generator = doc_location_generator
 
 
@@ -66,6 +162,42 @@ class DocumentServiceImpl(IDocumentService, BaseTenantServiceImpl[Document]):
         return document
 
 
+    def find_fields(self, data_filter: SimpleSearchFilter, fields: list[str], page_index: int = -1,
+                    page_size: int = 10) -> DocumentRowPage:
+        """ Find documents, returning only the requested fields of each.
+        :param data_filter: Search text and sort order.
+        :param fields: Names of the fields to return; id is always included and physical_path never is.
+        :param page_index: Zero-based page number, or -1 for all documents.
+        :param page_size: Number of documents per page.
+        :return: The page of rows.
+        """
+        return self._document_repository.find_fields(data_filter, fields, page_index, page_size)
+
+
+    def find_page(self, data_filter: SimpleSearchFilter, cursor: str | None = None, page_size: int = 10,
+                  include_total: bool = False) -> DocumentCursorPage:
+        """ Find documents with keyset (cursor) pagination.
+        :param data_filter: Search text and sort order.
+        :param cursor: next_cursor of the previous page, or None for the first page.
+        :param page_size: Number of documents per page.
+        :param include_total: Whether to also count all matching documents.
+        :return: The page of documents (physical_path is cleared) and the cursor of the next one.
+        """
+        return self._document_repository.find_page(data_filter, cursor, page_size, include_total)
+
+
+    def search(self, search_text: str, cursor: str | None = None, page_size: int = 10,
+               include_total: bool = False) -> DocumentCursorPage:
+        """ Full-text search over document metadata, best matches first.
+        :param search_text: Words or partial file name to search for.
+        :param cursor: next_cursor of the previous page, or None for the first page.
+        :param page_size: Number of documents per page.
+        :param include_total: Whether to also count all matching documents.
+        :return: The page of documents (physical_path is cleared) and the cursor of the next one.
+        """
+        return self._document_repository.search(search_text, cursor, page_size, include_total)
+
+
     def add(self, item: Document) -> Document:
         """ Add a new document.
         :param document: Document object to be added.
@@ -80,33 +212,467 @@ class DocumentServiceImpl(IDocumentService, BaseTenantServiceImpl[Document]):
         return savedDocumentMeta
     
 
+    def add_many_with_content(self, uploads: list[UploadFile], template: Document) -> list[BulkUploadItemResult]:
+        """ Create one document per uploaded file and store its content.
+        Zip and tar uploads are expanded into their members. All metadata rows are inserted
+        in one batch, content writes run in parallel, then the stored locations are recorded
+        in one batch. The rows of files whose content could not be written are deleted.
+        :param uploads: Uploaded files or archives.
+        :param template: Document holding the metadata shared by every file (storage_id, doc_type, ...).
+        :return: One result per file, in upload order.
+        """
+        files: list[UploadFile] = []
+        archive_members: list[UploadFile] = []
+        for upload in uploads:
+            if is_archive_upload(upload):
+                members = list(iter_archive_uploads(upload))
+                archive_members.extend(members)
+                files.extend(members)
+            else:
+                files.append(upload)
+
+        try:
+            documents = self._document_repository.add_many([
+                template.model_copy(update={"name": file.filename, "mime_type": guess_mime(file.filename)})
+                for file in files
+            ])
+
+            storage_type: IStorageProvider = self._storage_provider_factory.get_storage_provider(template.storage_id)
+            with ThreadPoolExecutor(max_workers=BULK_UPLOAD_CONCURRENCY, thread_name_prefix="bulk-upload") as executor:
+                writes = [executor.submit(storage_type.write_document_content, document, file)
+                          for document, file in zip(documents, files)]
+
+            results: list[BulkUploadItemResult] = []
+            written: list[Document] = []
+            failed: list[UUID] = []
+            for document, write in zip(documents, writes):
+                try:
+                    written.append(write.result())
+                    results.append(BulkUploadItemResult(name=document.name, id=document.id, success=True))
+                except Exception as ex:
+                    failed.append(document.id)
+                    results.append(BulkUploadItemResult(name=document.name, success=False, error=str(ex)))
+
+            self._document_repository.update_content_many(written)
+            if failed:
+                # No document is left behind without its content
+                self._document_repository.delete_many(failed)
+            return results
+        finally:
+            for member in archive_members:
+                member.file.close()
+
+
     def set_document_content(self, document_id: UUID, source_file_location: UploadFile) -> Document:
         """ Set or update the content of a document by uploading a file.
         :param document_id: UUID of the document to update.
         :param source_file: UploadFile object containing the file to upload.
         :return: Updated Document object with metadata (physical_path is cleared).
         """
-        document = super().get_by_id(document_id)
+        document = self._get_document_for_update(document_id)
+
+        storage_type: IStorageProvider = self._storage_provider_factory.get_storage_provider(document.storage_id)
+        document:Document = storage_type.set_document_content(document, source_file_location)
+        
+        return document
+
+
+    def ingest_document_content(self, document_id: UUID, source_file_location: UploadFile) -> IngestJobStatus:
+        """ Spool an upload to disk, then write it to storage and record it on the document in the background.
+        :param document_id: UUID of the document to update.
+        :param source_file: UploadFile object containing the file to upload.
+        :return: Status of the new ingest job.
+        """
+        document = self.get_document_for_content(document_id)
+        _purge_finished_ingest_jobs()
+
+        job_id = uuid4()
+        with _active_ingest_jobs_lock:
+            if len(_active_ingest_jobs) >= INGEST_MAX_QUEUED_JOBS:
+                raise IngestQueueFullException("Too many uploads are waiting to be stored, retry later")
+            # The slot is taken before spooling, so concurrent uploads cannot overshoot the limit
+            _active_ingest_jobs.add(job_id)
+
+        try:
+            with open(_ingest_payload_path(job_id), "wb") as payload:
+                shutil.copyfileobj(source_file_location.file, payload, 1024 * 1024)
+                payload.flush()
+                os.fsync(payload.fileno())
+
+            manifest = {
+                "job_id": str(job_id),
+                "document_id": str(document.id),
+                "filename": source_file_location.filename,
+                "status": "pending",
+                "attempts": 0,
+                "error": None,
+                "document": document.model_dump(mode="json"),
+            }
+            _save_ingest_manifest(manifest)
+
+            self._start_ingest_job(manifest, reserved=True)
+        except BaseException:
+            with _active_ingest_jobs_lock:
+                _active_ingest_jobs.discard(job_id)
+            raise
+        self._logger.info(f"Queued ingest job {job_id} for document {document.id}")
+        return _ingest_job_status(manifest)
+
+
+    def get_ingest_job(self, job_id: UUID) -> IngestJobStatus:
+        """ Get the status of an ingest job, resuming the job if the process that ran it is gone.
+        :param job_id: Id returned by ingest_document_content.
+        :return: Status of the job.
+        """
+        manifest = _load_ingest_manifest(job_id)
+        if manifest is None:
+            raise NotFoundException(detail="Ingest job not found for specified Id")
+        self.get_document_for_content(UUID(manifest["document_id"]))
+
+        if manifest["status"] in INGEST_UNFINISHED_STATUSES and self._start_ingest_job(manifest):
+            self._logger.warning(f"Resumed abandoned ingest job {job_id}")
+
+        return _ingest_job_status(manifest)
+
+
+    def resume_ingest_jobs(self) -> int:
+        """ Resume every unfinished ingest job whose process is gone, e.g. after a crash or a restart.
+        Applications do so at startup with resume_ingest_jobs_at_startup.
+        :return: Number of jobs resumed.
+        """
+        return _resume_ingest_jobs(self._storage_provider_factory, self._engine, self._metadata_cache, self._logger)
+
+
+    def _start_ingest_job(self, manifest: dict, reserved: bool = False) -> bool:
+        """ Run a job on the ingest workers unless this or another process already runs it.
+        :param reserved: Whether the job already holds its slot in _active_ingest_jobs.
+        :return: Whether the job was started.
+        """
+        return _queue_ingest_job(manifest, self._storage_provider_factory, self._engine, self._metadata_cache,
+                                 self._logger, reserved)
+
+
+    async def set_document_content_async(self, document_id: UUID, source_file_location: UploadFile) -> Document:
+        """ Asynchronous counterpart of set_document_content: the content is transferred by the
+        asynchronous storage provider without holding a thread.
+        :param document_id: UUID of the document to update.
+        :param source_file: UploadFile object containing the file to upload.
+        :return: Updated Document object with metadata (physical_path is cleared).
+        """
+        document = await self.get_document_for_content_async(document_id)
+
+        storage_type: IAsyncStorageProvider = await self._async_storage_provider_factory.get_storage_provider(document.storage_id)
+        stored = await storage_type.write_document_content(document.model_copy(), source_file_location)
+        await anyio.to_thread.run_sync(self._record_written_content, document, stored)
+
+        stored.physical_path = None
+        return stored
+
+
+    async def get_by_id_async(self, id: UUID) -> Document:
+        """ Asynchronous counterpart of get_by_id, reading through the async repository.
+        :param id: UUID of the document to retrieve.
+        :return: Document object with metadata (physical_path is cleared).
+        """
+        document = await self.get_document_for_content_async(id)
+        document.physical_path = None
+        return document
+
+
+    async def find_page_async(self, data_filter: SimpleSearchFilter, cursor: str | None = None, page_size: int = 10,
+                              include_total: bool = False) -> DocumentCursorPage:
+        """ Asynchronous counterpart of find_page, reading through the async repository. """
+        return await self._document_async_repository.find_page(data_filter, cursor, page_size, include_total)
+
+
+    async def get_document_for_content_async(self, document_id: UUID) -> Document:
+        """ Asynchronous counterpart of get_document_for_content. """
+        document = await self._document_async_repository.get_by_id(document_id)
         if not document:
             raise NotFoundException(detail="Document not found for specified Id")
 
+        return document
+
+
+    async def open_document_content_async(self, document: Document,
+                                          decompress: bool = True) -> tuple[AsyncIterator[bytes], str]:
+        """ Get the file content of an already loaded document from the asynchronous storage provider.
+        :param document: Document returned by get_document_for_content_async.
+        :param decompress: Whether compressed content is decoded, or returned as stored.
+        :return: Tuple containing an asynchronous iterator over the file content and the filename.
+        """
+        storage_type: IAsyncStorageProvider = await self._async_storage_provider_factory.get_storage_provider(document.storage_id)
+        return await storage_type.get_document_content(document, decompress)
+
+
+    async def get_document_content_properties_async(self, document: Document) -> DocumentContentProperties:
+        """ Asynchronous counterpart of get_document_content_properties. """
+        storage_type: IAsyncStorageProvider = await self._async_storage_provider_factory.get_storage_provider(document.storage_id)
+        return await storage_type.get_document_content_properties(document)
+
+
+    async def get_document_content_range_async(self, document: Document, offset: int, length: int) -> AsyncIterator[bytes]:
+        """ Asynchronous counterpart of get_document_content_range. """
+        storage_type: IAsyncStorageProvider = await self._async_storage_provider_factory.get_storage_provider(document.storage_id)
+        async for chunk in storage_type.get_document_content_range(document, offset, length):
+            yield chunk
+
+
+    def get_document_upload_url(self, document_id: UUID, filename: str) -> DocumentContentUrl:
+        """ Get a short-lived URL to which a client uploads a document's content directly.
+        :param document_id: UUID of the document.
+        :param filename: Name of the file being uploaded.
+        :return: The URL and its expiry time.
+        """
+        document = self.get_document_for_content(document_id)
+
         storage_type: IStorageProvider = self._storage_provider_factory.get_storage_provider(document.storage_id)
-        document:Document = storage_type.set_document_content(document_id, source_file_location)
-        
+        upload_url = storage_type.get_document_upload_url(document, filename)
+        if upload_url is None:
+            raise ValueError("The storage of this document does not support direct uploads")
+        return upload_url
+
+
+    def complete_document_upload(self, document_id: UUID, filename: str) -> Document:
+        """ Record content uploaded through get_document_upload_url on its document.
+        :param document_id: UUID of the document.
+        :param filename: Name of the uploaded file.
+        :return: Updated Document object with metadata (physical_path is cleared).
+        """
+        document = self._get_document_for_update(document_id)
+
+        storage_type: IStorageProvider = self._storage_provider_factory.get_storage_provider(document.storage_id)
+        return storage_type.complete_document_upload(document, filename)
+
+
+    def create_upload_session(self, document_id: UUID, filename: str, size: int) -> UploadSession:
+        """ Start a resumable upload of a document's content, sent as numbered chunks of UPLOAD_CHUNK_SIZE bytes.
+        Expired sessions are discarded first.
+        :param document_id: UUID of the document.
+        :param filename: Name of the file being uploaded.
+        :param size: Size of the file in bytes.
+        :return: The new session, with its chunk size and count.
+        """
+        if not filename or "/" in filename or "\\" in filename:
+            raise ValueError(f"Invalid file name '{filename}'")
+        chunk_count = -(-size // UPLOAD_CHUNK_SIZE)
+        if chunk_count > UPLOAD_MAX_CHUNKS:
+            raise ValueError(f"Uploads are limited to {UPLOAD_MAX_CHUNKS * UPLOAD_CHUNK_SIZE} bytes")
+
+        document = self.get_document_for_content(document_id)
+        self._purge_expired_upload_sessions()
+
+        manifest = {
+            "upload_id": str(uuid4()),
+            "document_id": str(document.id),
+            "storage_id": str(document.storage_id),
+            "filename": filename,
+            "size": size,
+            "chunk_size": UPLOAD_CHUNK_SIZE,
+            "chunk_count": chunk_count,
+            "expires_at": (datetime.now(timezone.utc) + timedelta(seconds=UPLOAD_SESSION_TTL_SECONDS)).isoformat(),
+        }
+        session = _upload_session(manifest)
+
+        storage_type: IStorageProvider = self._storage_provider_factory.get_storage_provider(document.storage_id)
+        storage_type.begin_chunked_upload(document, session)
+        (_upload_session_directory(session.upload_id) / "chunks").mkdir(parents=True)
+        _save_upload_session_manifest(manifest)
+        return session
+
+
+    def upload_session_chunk(self, upload_id: UUID, index: int, chunk: bytes) -> UploadSession:
+        """ Store one chunk of an upload session. Chunks may arrive in any order and in parallel,
+        and a chunk sent again replaces the earlier copy.
+        :param upload_id: Id returned by create_upload_session.
+        :param index: Zero-based number of the chunk.
+        :param chunk: The bytes of the chunk: chunk_size of them, fewer only for the last chunk.
+        :return: The session with the byte ranges received so far.
+        """
+        manifest, document = self._load_upload_session(upload_id)
+        if not 0 <= index < manifest["chunk_count"]:
+            raise ValueError(f"Chunk {index} is outside of 0..{manifest['chunk_count'] - 1}")
+        expected_size = min(manifest["chunk_size"], manifest["size"] - index * manifest["chunk_size"])
+        if len(chunk) != expected_size:
+            raise ValueError(f"Chunk {index} must be {expected_size} bytes, got {len(chunk)}")
+
+        storage_type: IStorageProvider = self._storage_provider_factory.get_storage_provider(document.storage_id)
+        storage_type.write_document_chunk(document, _upload_session(manifest), index, chunk)
+        (_upload_session_directory(upload_id) / "chunks" / str(index)).touch()
+        return _upload_session(manifest)
+
+
+    def get_upload_session(self, upload_id: UUID) -> UploadSession:
+        """ Get an upload session with the byte ranges received so far, to resume it.
+        :param upload_id: Id returned by create_upload_session.
+        :return: The session.
+        """
+        manifest, _ = self._load_upload_session(upload_id)
+        return _upload_session(manifest)
+
+
+    def complete_upload_session(self, upload_id: UUID) -> Document:
+        """ Assemble the chunks of an upload session into the document's content, replacing the previous one.
+        :param upload_id: Id returned by create_upload_session.
+        :return: Updated Document object with metadata (physical_path is cleared).
+        """
+        manifest, document = self._load_upload_session(upload_id, for_update=True)
+        session = _upload_session(manifest)
+        missing_count = session.chunk_count - len(_received_upload_chunks(upload_id))
+        if missing_count:
+            raise ValueError(f"{missing_count} of {session.chunk_count} chunks have not been received")
+
+        storage_type: IStorageProvider = self._storage_provider_factory.get_storage_provider(document.storage_id)
+        stored = storage_type.complete_chunked_upload(document.model_copy(), session)
+        self._record_written_content(document, stored)
+        shutil.rmtree(_upload_session_directory(upload_id), ignore_errors=True)
+
+        stored.physical_path = None
+        return stored
+
+
+    def abort_upload_session(self, upload_id: UUID) -> None:
+        """ Cancel an upload session and discard the chunks received so far.
+        :param upload_id: Id returned by create_upload_session.
+        """
+        manifest, document = self._load_upload_session(upload_id)
+        storage_type: IStorageProvider = self._storage_provider_factory.get_storage_provider(document.storage_id)
+        storage_type.abort_chunked_upload(_upload_session(manifest))
+        shutil.rmtree(_upload_session_directory(upload_id), ignore_errors=True)
+
+
+    def _load_upload_session(self, upload_id: UUID, for_update: bool = False) -> tuple[dict, Document]:
+        """ Load the manifest of an unexpired upload session along with its document, which must belong to the current tenant.
+        for_update loads the document with _get_document_for_update, for replacing its content.
+        """
+        manifest = _load_upload_session_manifest(upload_id)
+        if manifest is None or datetime.fromisoformat(manifest["expires_at"]) <= datetime.now(timezone.utc):
+            raise NotFoundException(detail="Upload session not found for specified Id")
+        document_id = UUID(manifest["document_id"])
+        document = self._get_document_for_update(document_id) if for_update else self.get_document_for_content(document_id)
+        return manifest, document
+
+
+    def _purge_expired_upload_sessions(self) -> None:
+        """ Discard the chunks and manifests of upload sessions past their expiry. """
+        now = datetime.now(timezone.utc)
+        for manifest_path in UPLOAD_SESSION_DIRECTORY.glob("*/session.json"):
+            try:
+                with open(manifest_path) as manifest_file:
+                    manifest = json.load(manifest_file)
+                if datetime.fromisoformat(manifest["expires_at"]) > now:
+                    continue
+                storage_type: IStorageProvider = self._storage_provider_factory.get_storage_provider(
+                    UUID(manifest["storage_id"]))
+                storage_type.abort_chunked_upload(_upload_session(manifest))
+            except Exception as ex:
+                self._logger.warning(f"Failed to discard expired upload session {manifest_path.parent.name}: {ex}")
+                continue
+            shutil.rmtree(manifest_path.parent, ignore_errors=True)
+
+
+    def get_document_for_content(self, document_id: UUID) -> Document:
+        """ Load a document once for a content operation.
+        The returned Document still carries physical_path for the storage provider and must
+        not be returned to clients as-is. It is read through the metadata cache when the cache is
+        shared by every process; an in-process cache may point at content another process has
+        since replaced, so the database is read instead.
+        :param document_id: UUID of the document.
+        :return: The Document with its storage details.
+        """
+        if self._metadata_cache.is_shared():
+            document = self._document_repository.get_by_id(document_id)
+        else:
+            document = self._document_repository.get_by_id_uncached(document_id)
+        if not document:
+            raise NotFoundException(detail="Document not found for specified Id")
+
         return document
 
 
-    def get_document_content(self, document_id: UUID) -> tuple[BinaryIO, str]:
-        """ Get the file content of a document by its ID.
-        :param document_id: UUID of the document to retrieve.
-        :return: Tuple containing a binary stream of the file content and the filename.
+    def _get_document_for_update(self, document_id: UUID) -> Document:
+        """ Load a document whose content is about to be replaced or deleted, always from the database:
+        the content it points at is released, and a cached entry older than the last update would
+        release content already released and leave the current one behind.
+        :param document_id: UUID of the document.
+        :return: The Document with its storage details.
         """
-        document = super().get_by_id(document_id)
+        document = self._document_repository.get_by_id_uncached(document_id)
         if not document:
             raise NotFoundException(detail="Document not found for specified Id")
-        
+
+        return document
+
+
+    def get_document_content(self, document_id: UUID) -> tuple[BinaryIO | Iterable[bytes], str]:
+        """ Get the file content of a document by its ID.
+        :param document_id: UUID of the document to retrieve.
+        :return: Tuple containing a binary stream (or chunk iterator) of the file content and the filename.
+        """
+        return self.open_document_content(self.get_document_for_content(document_id))
+
+
+    def open_document_content(self, document: Document,
+                              decompress: bool = True) -> tuple[BinaryIO | Iterable[bytes], str]:
+        """ Get the file content of an already loaded document.
+        :param document: Document returned by get_document_for_content.
+        :param decompress: Whether compressed content is decoded, or returned as stored.
+        :return: Tuple containing a binary stream (or chunk iterator) of the file content and the filename.
+        """
         storage_type: IStorageProvider = self._storage_provider_factory.get_storage_provider(document.storage_id)
-        return storage_type.get_document_content(document_id)
+        return storage_type.get_document_content(document, decompress)
+
+
+    def get_document_content_file(self, document: Document) -> DocumentContentFile | None:
+        """ Get the local file holding a document's content, if its storage keeps it (or a cached copy) on local disk.
+        :param document: Document returned by get_document_for_content.
+        :return: DocumentContentFile to be released once sent, or None.
+        """
+        storage_type: IStorageProvider = self._storage_provider_factory.get_storage_provider(document.storage_id)
+        return storage_type.get_document_content_file(document)
+
+
+    def get_document_content_url(self, document: Document) -> DocumentContentUrl | None:
+        """ Get a short-lived URL to download a document's content directly from its storage.
+        :param document: Document returned by get_document_for_content.
+        :return: The URL and its expiry time, or None if the storage cannot provide one.
+        """
+        storage_type: IStorageProvider = self._storage_provider_factory.get_storage_provider(document.storage_id)
+        return storage_type.get_document_content_url(document)
+
+
+    def get_metadata_cache_stats(self) -> dict:
+        """ Get the counters of the document metadata cache.
+        :return: The cache backend with its hits, misses and, for the local backend, size and evictions.
+        """
+        return self._metadata_cache.stats()
+
+
+    def get_content_cache_stats(self) -> list[dict]:
+        """ Get the counters of every local disk cache of storage content in this process.
+        :return: One entry per cache with its size, hit ratio, hits, misses and evictions.
+        """
+        return [cache.stats() for cache in DiskCache.instances()]
+
+
+    def get_document_content_properties(self, document: Document) -> DocumentContentProperties:
+        """ Get the size and validators of a document's content without reading it.
+        :param document: Document returned by get_document_for_content.
+        :return: DocumentContentProperties of the stored content.
+        """
+        storage_type: IStorageProvider = self._storage_provider_factory.get_storage_provider(document.storage_id)
+        return storage_type.get_document_content_properties(document)
+
+
+    def get_document_content_range(self, document: Document, offset: int, length: int) -> Iterable[bytes]:
+        """ Get a byte range of a document's content.
+        :param document: Document returned by get_document_for_content.
+        :param offset: Position of the first byte to return.
+        :param length: Number of bytes to return.
+        :return: Iterator over the requested bytes.
+        """
+        storage_type: IStorageProvider = self._storage_provider_factory.get_storage_provider(document.storage_id)
+        return storage_type.get_document_content_range(document, offset, length)
     
 
     def delete_document(self, document_id: UUID) -> bool:
@@ -114,14 +680,365 @@ class DocumentServiceImpl(IDocumentService, BaseTenantServiceImpl[Document]):
         :param document_id: UUID of the document to delete.
         :return: True if deletion was successful, False otherwise.
         """
-        document = super().get_by_id(document_id)
-        if not document:
-            raise NotFoundException(detail="Document not found for specified Id")
+        document = self._get_document_for_update(document_id)
         
         storage_type: IStorageProvider = self._storage_provider_factory.get_storage_provider(document.storage_id)
-        return storage_type.delete_document_content(document_id)
+        return storage_type.delete_document_content(document)
 
 
-    
-    
-    
\ No newline at end of file
+    def get_documents(self, document_ids: list[UUID]) -> DocumentBatchGetResult:
+        """ Get the metadata of several documents at once.
+        :param document_ids: Ids of the documents to get.
+        :return: The documents found, in request order (physical_path is not loaded), and the ids not found.
+        """
+        documents = self._document_repository.get_many_metadata(document_ids)
+        found_ids = {document.id for document in documents}
+        missing_ids = [id for id in dict.fromkeys(document_ids) if id not in found_ids]
+        return DocumentBatchGetResult(items=documents, missing_ids=missing_ids)
+
+
+    def delete_documents(self, document_ids: list[UUID]) -> list[BulkDeleteItemResult]:
+        """ Delete several documents: their stored content, grouped by storage, then their metadata
+        in one set-based statement. Metadata of documents whose content could not be deleted is kept.
+        :param document_ids: Ids of the documents to delete.
+        :return: One result per distinct id, in request order.
+        """
+        # A repeated id must not release its content twice
+        document_ids = list(dict.fromkeys(document_ids))
+        documents = self._document_repository.get_many(document_ids)
+
+        by_storage: dict[UUID, list[Document]] = {}
+        for document in documents:
+            by_storage.setdefault(document.storage_id, []).append(document)
+
+        errors: dict[UUID, str | None] = {}
+        for storage_id, storage_documents in by_storage.items():
+            storage_type: IStorageProvider = self._storage_provider_factory.get_storage_provider(storage_id)
+            errors.update(storage_type.delete_document_contents(storage_documents))
+
+        self._document_repository.delete_many([id for id, error in errors.items() if error is None])
+
+        return [
+            BulkDeleteItemResult(id=id, success=False, error="Document not found") if id not in errors
+            else BulkDeleteItemResult(id=id, success=errors[id] is None, error=errors[id])
+            for id in document_ids
+        ]
+
+
+    def _record_written_content(self, current: Document, stored: Document) -> None:
+        """ Save content written with write_document_content on its document and release the content it replaces. """
+        self._document_repository.update_content_many([stored])
+
+        if current.content_hash or (current.physical_path and current.physical_path != stored.physical_path):
+            storage_type: IStorageProvider = self._storage_provider_factory.get_storage_provider(current.storage_id)
+            errors = storage_type.delete_document_contents([current])
+            if errors.get(current.id):
+                self._logger.warning(f"Failed to release previous content of document {current.id}: {errors[current.id]}")
+
+
+    def export_documents(self, document_ids: list[UUID] | None = None,
+                         data_filter: IDataFilter | None = None) -> Iterator[bytes]:
+        """ Stream a ZIP archive of the content of several documents.
+        Metadata and storage providers are resolved up front; the archive is then built
+        incrementally while the next documents are opened and prefetched in parallel.
+        :param document_ids: Ids of the documents to export, in archive order.
+        :param data_filter: Filter selecting the documents to export when no ids are given.
+        :return: Iterator over the bytes of the ZIP archive.
+        """
+        if document_ids is not None:
+            documents = self._document_repository.get_many(document_ids)
+        else:
+            documents = self._document_repository.find_all(data_filter)
+        documents = [document for document in documents if document.physical_path]
+
+        storage_providers: dict[UUID, IStorageProvider] = {
+            storage_id: self._storage_provider_factory.get_storage_provider(storage_id)
+            for storage_id in {document.storage_id for document in documents}
+        }
+        return stream_zip(self._iter_export_entries(documents, storage_providers))
+
+
+    def _iter_export_entries(self, documents: list[Document],
+                             storage_providers: dict[UUID, IStorageProvider]) -> Iterator[tuple[str, Iterable[bytes]]]:
+        used_names: set[str] = set()
+        remaining = iter(documents)
+        opening = deque()
+
+        def open_content(document: Document) -> Iterator[bytes]:
+            # Start the download and wait for its first chunk, later chunks are prefetched
+            file_stream, _ = storage_providers[document.storage_id].get_document_content(document)
+            chunks = prefetch_chunks(iter_stream_chunks(file_stream))
+            first_chunk = next(chunks, None)
+            return chain([first_chunk], chunks) if first_chunk is not None else iter(())
+
+        with ThreadPoolExecutor(max_workers=EXPORT_PREFETCH_DOCUMENTS, thread_name_prefix="export-prefetch") as executor:
+            def open_next() -> None:
+                document = next(remaining, None)
+                if document is not None:
+                    opening.append((document, executor.submit(open_content, document)))
+
+            for _ in range(EXPORT_PREFETCH_DOCUMENTS):
+                open_next()
+
+            while opening:
+                document, content = opening.popleft()
+                open_next()
+                yield unique_archive_name(document.name, used_names), content.result()
+
+
+def resume_ingest_jobs_at_startup(injector: Injector) -> int:
+    """ Resume the ingest jobs abandoned by earlier processes. Call it once from the application's startup, e.g.
+    app.add_event_handler("startup", lambda: resume_ingest_jobs_at_startup(get_injector_instance(app))).
+    Dependencies are resolved in a request scope of its own. Jobs that cannot be resumed are logged and left
+    unfinished; polling them with get_ingest_job resumes them later, with the tenant of that request.
+    :param injector: Injector of the application.
+    :return: Number of jobs resumed.
+    """
+    with injector.get(RequestScopeFactory).create_scope():
+        logger = injector.get(ICrudLogger).get_logger(__name__)
+        try:
+            return _resume_ingest_jobs(injector.get(IStorageProviderFactory), injector.get(Session).get_bind(),
+                                       injector.get(IDocumentMetadataCache), logger)
+        except Exception as ex:
+            logger.error(f"Failed to resume abandoned ingest jobs: {ex}")
+            return 0
+
+
+def _resume_ingest_jobs(storage_provider_factory: IStorageProviderFactory, engine: Engine,
+                        metadata_cache: IDocumentMetadataCache, logger) -> int:
+    """ Resume every unfinished ingest job no process runs. See DocumentServiceImpl.resume_ingest_jobs. """
+    resumed = 0
+    for manifest_path in INGEST_DIRECTORY.glob("*.json"):
+        try:
+            with open(manifest_path) as manifest_file:
+                manifest = json.load(manifest_file)
+            if (manifest["status"] in INGEST_UNFINISHED_STATUSES
+                    and _queue_ingest_job(manifest, storage_provider_factory, engine, metadata_cache, logger)):
+                resumed += 1
+        except Exception as ex:
+            logger.error(f"Failed to resume ingest job {manifest_path.stem}: {ex}")
+
+    if resumed:
+        logger.warning(f"Resumed {resumed} abandoned ingest jobs")
+    return resumed
+
+
+def _queue_ingest_job(manifest: dict, storage_provider_factory: IStorageProviderFactory, engine: Engine,
+                      metadata_cache: IDocumentMetadataCache, logger, reserved: bool = False) -> bool:
+    """ Queue a job with the storage provider of its document and record its content once stored.
+    See _start_ingest_job.
+    """
+    storage_type: IStorageProvider = storage_provider_factory.get_storage_provider(
+        UUID(manifest["document"]["storage_id"]))
+    return _start_ingest_job(manifest, storage_type,
+                             lambda stored: _record_ingested_content(engine, metadata_cache, logger, storage_type, stored),
+                             reserved)
+
+
+def _record_ingested_content(engine: Engine, metadata_cache: IDocumentMetadataCache, logger,
+                             storage_type: IStorageProvider, stored: Document) -> None:
+    """ Record content stored by an ingest worker on its document, then release the content it replaced.
+    Runs on the worker after the request is gone, so it uses a session of its own rather than the repository.
+    """
+    with Session(engine) as session:
+        released = replace_document_content(session, stored)
+        session.commit()
+    metadata_cache.invalidate(stored.tenant_id, [stored.id])
+
+    if released:
+        errors = storage_type.delete_document_contents(released)
+        for document in released:
+            if errors.get(document.id):
+                logger.warning(f"Failed to release content {document.physical_path} of document {document.id}: "
+                               f"{errors[document.id]}")
+
+
+def _ingest_payload_path(job_id: UUID | str) -> Path:
+    return INGEST_DIRECTORY / f"{job_id}.part"
+
+
+def _ingest_manifest_path(job_id: UUID | str) -> Path:
+    return INGEST_DIRECTORY / f"{job_id}.json"
+
+
+def _save_ingest_manifest(manifest: dict) -> None:
+    """ Replace a job manifest atomically, so a crash never leaves a partial one behind. """
+    manifest_path = _ingest_manifest_path(manifest["job_id"])
+    incoming_path = manifest_path.with_suffix(".json.tmp")
+    with open(incoming_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file)
+        manifest_file.flush()
+        os.fsync(manifest_file.fileno())
+    os.replace(incoming_path, manifest_path)
+
+
+def _load_ingest_manifest(job_id: UUID) -> dict | None:
+    try:
+        with open(_ingest_manifest_path(job_id)) as manifest_file:
+            return json.load(manifest_file)
+    except FileNotFoundError:
+        return None
+
+
+def _ingest_job_status(manifest: dict) -> IngestJobStatus:
+    return IngestJobStatus(job_id=manifest["job_id"], document_id=manifest["document_id"], status=manifest["status"],
+                           attempts=manifest["attempts"], error=manifest["error"])
+
+
+def _lock_ingest_job(job_id: UUID | str) -> int | None:
+    """ Lock the lock file of a job without waiting. The lock is held until the returned descriptor
+    is closed or the process dies.
+    :return: The descriptor holding the lock, or None if another process holds it.
+    """
+    lock_fd = os.open(INGEST_DIRECTORY / f"{job_id}.lock", os.O_RDWR | os.O_CREAT)
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(lock_fd, msvcrt.LK_NBLCK, 1)
+        return lock_fd
+    except OSError:
+        os.close(lock_fd)
+        return None
+
+
+def _start_ingest_job(manifest: dict, storage_type: IStorageProvider,
+                      record_content: Callable[[Document], None], reserved: bool = False) -> bool:
+    """ Queue a job on the ingest workers once its lock is taken.
+    :param reserved: Whether the caller already added the job to _active_ingest_jobs.
+    :return: Whether the job was queued, False if this or another process already runs it or it has finished.
+    """
+    job_id = UUID(manifest["job_id"])
+    if not reserved:
+        with _active_ingest_jobs_lock:
+            if job_id in _active_ingest_jobs:
+                return False
+            _active_ingest_jobs.add(job_id)
+
+    lock_fd = _lock_ingest_job(job_id)
+    # The job may have progressed while its manifest was read without the lock
+    current = _load_ingest_manifest(job_id) if lock_fd is not None else None
+    if current is None or current["status"] not in INGEST_UNFINISHED_STATUSES:
+        if lock_fd is not None:
+            os.close(lock_fd)
+        with _active_ingest_jobs_lock:
+            _active_ingest_jobs.discard(job_id)
+        return False
+
+    manifest.clear()
+    manifest.update(current)
+    _ingest_executor.submit(_run_ingest_job, current, storage_type, record_content, lock_fd)
+    return True
+
+
+def _run_ingest_job(manifest: dict, storage_type: IStorageProvider,
+                    record_content: Callable[[Document], None], lock_fd: int) -> None:
+    """
+    Write a spooled upload to storage, retrying with exponential backoff, then record it on the document.
+    A job found in the stored status was written by a process that died before recording it, so only
+    the recording is left. A failed recording leaves the job stored, to be resumed later.
+    """
+    job_id = UUID(manifest["job_id"])
+    payload_path = _ingest_payload_path(job_id)
+    try:
+        while manifest["status"] != "stored":
+            if manifest["attempts"] >= INGEST_MAX_ATTEMPTS:
+                manifest["status"] = "failed"
+                _save_ingest_manifest(manifest)
+                payload_path.unlink(missing_ok=True)
+                return
+
+            manifest["attempts"] += 1
+            manifest["status"] = "running"
+            _save_ingest_manifest(manifest)
+            try:
+                with open(payload_path, "rb") as payload:
+                    upload = UploadFile(file=payload, filename=manifest["filename"])
+                    stored = storage_type.write_document_content(Document.model_validate(manifest["document"]), upload)
+            except Exception as ex:
+                manifest["error"] = str(ex)
+                if manifest["attempts"] < INGEST_MAX_ATTEMPTS:
+                    time.sleep(INGEST_RETRY_DELAY_SECONDS * 2 ** (manifest["attempts"] - 1))
+                continue
+
+            manifest.update(status="stored", error=None, document=stored.model_dump(mode="json"))
+            _save_ingest_manifest(manifest)
+            payload_path.unlink(missing_ok=True)
+
+        try:
+            record_content(Document.model_validate(manifest["document"]))
+        except Exception as ex:
+            manifest["error"] = str(ex)
+            _save_ingest_manifest(manifest)
+            return
+
+        manifest.update(status="completed", error=None)
+        _save_ingest_manifest(manifest)
+    finally:
+        os.close(lock_fd)
+        with _active_ingest_jobs_lock:
+            _active_ingest_jobs.discard(job_id)
+
+
+def _purge_finished_ingest_jobs() -> None:
+    """ Remove manifests of jobs that finished more than INGEST_JOB_RETENTION_SECONDS ago. """
+    expired_before = time.time() - INGEST_JOB_RETENTION_SECONDS
+    for manifest_path in INGEST_DIRECTORY.glob("*.json"):
+        try:
+            if manifest_path.stat().st_mtime > expired_before:
+                continue
+            with open(manifest_path) as manifest_file:
+                status = json.load(manifest_file)["status"]
+            if status in ("completed", "failed"):
+                manifest_path.unlink()
+                manifest_path.with_suffix(".lock").unlink(missing_ok=True)
+        except (OSError, ValueError, KeyError):
+            continue
+
+
+def _upload_session_directory(upload_id: UUID | str) -> Path:
+    return UPLOAD_SESSION_DIRECTORY / str(upload_id)
+
+
+def _save_upload_session_manifest(manifest: dict) -> None:
+    """ Write a session manifest atomically, so a crash never leaves a partial one behind. """
+    manifest_path = _upload_session_directory(manifest["upload_id"]) / "session.json"
+    incoming_path = manifest_path.with_suffix(".json.tmp")
+    with open(incoming_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file)
+        manifest_file.flush()
+        os.fsync(manifest_file.fileno())
+    os.replace(incoming_path, manifest_path)
+
+
+def _load_upload_session_manifest(upload_id: UUID) -> dict | None:
+    try:
+        with open(_upload_session_directory(upload_id) / "session.json") as manifest_file:
+            return json.load(manifest_file)
+    except FileNotFoundError:
+        return None
+
+
+def _received_upload_chunks(upload_id: UUID | str) -> list[int]:
+    """ Numbers of the chunks stored so far, in ascending order. """
+    try:
+        return sorted(int(marker.name) for marker in (_upload_session_directory(upload_id) / "chunks").iterdir())
+    except FileNotFoundError:
+        return []
+
+
+def _upload_session(manifest: dict) -> UploadSession:
+    """ Build the UploadSession of a manifest, merging its received chunks into byte ranges. """
+    chunk_size, size = manifest["chunk_size"], manifest["size"]
+    received_ranges: list[tuple[int, int]] = []
+    for index in _received_upload_chunks(manifest["upload_id"]):
+        first, last = index * chunk_size, min((index + 1) * chunk_size, size) - 1
+        if received_ranges and received_ranges[-1][1] + 1 == first:
+            received_ranges[-1] = (received_ranges[-1][0], last)
+        else:
+            received_ranges.append((first, last))
+
+    return UploadSession(upload_id=manifest["upload_id"], document_id=manifest["document_id"],
+                         filename=manifest["filename"], size=size, chunk_size=chunk_size,
+                         chunk_count=manifest["chunk_count"], received_ranges=received_ranges,
+                         expires_at=manifest["expires_at"])
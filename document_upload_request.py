@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+
+
+class DocumentUploadRequest(BaseModel):
+    """
+    Names the file a client uploads directly to storage for a document.
+    """
+
+    filename: str
@@ -1,8 +1,29 @@
+import base64
+from collections import OrderedDict
 from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+import hashlib
+import io
+import json
 import mimetypes
 import os
 from pathlib import Path
+import queue
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from typing import AsyncIterable, AsyncIterator, BinaryIO, Callable, Generic, Hashable, Iterable, Iterator, TypeVar
 
+try:
+    import zstandard
+except ImportError:  # compression at rest is optional
+    zstandard = None
+
+from fastapi import UploadFile
 from pylekhagaar.app_settings import AppSettings
 from pylekhagaar.core.schemas.document import Document
 
@@ -15,14 +36,723 @@ def guess_mime(file_path: str) -> str:
     return mime_type or "application/octet-stream"
 
 
+def compute_sha256(file: BinaryIO, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-256 of a seekable stream, reading it in chunks.
+    The stream is rewound before and after hashing.
+    """
+    digest = hashlib.sha256()
+    file.seek(0)
+    while chunk := file.read(chunk_size):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def content_addressed_path(content_hash: str) -> str:
+    """ Relative location of a content-addressed payload, fanned out by hash prefix. """
+    return f"cas/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}"
+
+
+def encode_cursor(values: list) -> str:
+    """ Encode JSON-serializable values into an opaque, URL-safe pagination cursor. """
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type) -> list:
+    """ Decode a cursor produced by encode_cursor. When types are given, the cursor must hold
+    exactly one value of each type, in order. Raises ValueError if it is malformed. """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as ex:
+        raise ValueError("Invalid cursor") from ex
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    # Exact type match, so that true does not pass for an int
+    if types and (len(values) != len(types) or any(type(value) is not type_ for value, type_ in zip(values, types))):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+# Archive members are spooled in memory up to this size, then to a temporary file
+ARCHIVE_MEMBER_SPOOL_SIZE = 1024 * 1024
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz")
+
+
+def is_archive_upload(upload: UploadFile) -> bool:
+    """ Whether an upload is a zip or tar archive whose members are the actual files. """
+    return (upload.filename or "").lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def iter_archive_uploads(upload: UploadFile) -> Iterator[UploadFile]:
+    """
+    Yield each regular file of a zip or tar upload as its own UploadFile.
+    Members are read one at a time and spooled, so the archive is never loaded whole.
+    The caller owns the returned files and must close them.
+    """
+    upload.file.seek(0)
+    if (upload.filename or "").lower().endswith(".zip"):
+        with zipfile.ZipFile(upload.file) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                with archive.open(info) as member:
+                    yield _spool_upload(os.path.basename(info.filename), member)
+    else:
+        with tarfile.open(fileobj=upload.file, mode="r|*") as archive:
+            for info in archive:
+                if not info.isfile():
+                    continue
+                yield _spool_upload(os.path.basename(info.name), archive.extractfile(info))
+
+
+def _spool_upload(filename: str, source: BinaryIO) -> UploadFile:
+    spooled = tempfile.SpooledTemporaryFile(max_size=ARCHIVE_MEMBER_SPOOL_SIZE)
+    shutil.copyfileobj(source, spooled, 1024 * 1024)
+    spooled.seek(0)
+    return UploadFile(file=spooled, filename=filename)
+
+
+# Range headers asking for more ranges than this are ignored and the full content is served
+MAX_BYTE_RANGES = 16
+
+
+def parse_range_header(range_header: str, size: int) -> list[tuple[int, int]] | None:
+    """
+    Parse an HTTP Range header against a content of the given size.
+    :param range_header: Value of the Range header, e.g. "bytes=0-499,-500".
+    :param size: Total size of the content in bytes.
+    :return: List of (start, end) inclusive byte positions, an empty list if no range
+             is satisfiable, or None if the header is invalid and must be ignored.
+    """
+    unit, _, range_set = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not range_set.strip():
+        return None
+
+    specs = range_set.split(",")
+    if len(specs) > MAX_BYTE_RANGES:
+        return None
+
+    ranges: list[tuple[int, int]] = []
+    for spec in specs:
+        first, separator, last = spec.strip().partition("-")
+        if not separator:
+            return None
+        try:
+            if first:
+                start = int(first)
+                end = int(last) if last else size - 1
+                if last and end < start:
+                    return None
+            else:
+                # Suffix range: the last N bytes
+                suffix_length = int(last)
+                if suffix_length == 0:
+                    continue
+                start = max(size - suffix_length, 0)
+                end = size - 1
+        except ValueError:
+            return None
+
+        if start >= size:
+            continue
+        ranges.append((start, min(end, size - 1)))
+
+    return ranges
+
+
+def if_range_matches(if_range: str, etag: str | None, last_modified: datetime | None) -> bool:
+    """
+    Evaluate an If-Range header against the current validators of the content.
+    An entity tag must match strongly; a date must equal the last modification time.
+    """
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return etag is not None and not etag.startswith("W/") and if_range == etag
+
+    if last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_range)
+    except (TypeError, ValueError):
+        return False
+    return int(since.timestamp()) == int(last_modified.timestamp())
+
+
+def is_not_modified(if_none_match: str | None, if_modified_since: str | None,
+                    etag: str | None, last_modified: datetime | None) -> bool:
+    """
+    Evaluate If-None-Match / If-Modified-Since against the current validators of the content.
+    Entity tags are compared weakly; If-Modified-Since is only used without If-None-Match.
+    :return: True if the client's copy is current and a 304 can be sent.
+    """
+    if if_none_match is not None:
+        if etag is None:
+            return False
+        opaque_tag = etag.removeprefix("W/")
+        return any(candidate.strip() == "*" or candidate.strip().removeprefix("W/") == opaque_tag
+                   for candidate in if_none_match.split(","))
+
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return int(last_modified.timestamp()) <= int(since.timestamp())
+
+
+def document_etag(document: Document) -> str:
+    """ Strong entity tag of a document's metadata, derived from its serialized form. """
+    return f'"{hashlib.sha256(document.model_dump_json().encode()).hexdigest()[:32]}"'
+
+
+def format_http_date(value: datetime) -> str:
+    """ Format a datetime as an HTTP-date (RFC 7231), e.g. for Last-Modified. """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def accepts_encoding(accept_encoding: str | None, coding: str) -> bool:
+    """ Whether an Accept-Encoding header lets the response use the given content-coding. """
+    if not accept_encoding:
+        return False
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip().lower() not in (coding, "*"):
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                return float(q[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+# Content codec recorded on documents stored zstd-compressed
+ZSTD_CODEC = "zstd"
+
+# zstd level used when a storage does not set configParam["compression_level"]
+DEFAULT_COMPRESSION_LEVEL = 3
+
+# MIME types worth compressing at rest, besides text/*
+COMPRESSIBLE_MIME_TYPES = {
+    "application/json",
+    "application/xml",
+    "application/javascript",
+    "application/x-ndjson",
+    "application/rtf",
+    "image/svg+xml",
+    "image/tiff",
+    "image/bmp",
+}
+
+# Bytes of an upload compressed to estimate how well the whole of it compresses
+COMPRESSION_SAMPLE_SIZE = 64 * 1024
+
+# Content is only stored compressed if the sample shrinks to at most this fraction of its size
+COMPRESSION_MAX_RATIO = 0.8
+
+
+def choose_content_codec(file: BinaryIO, mime_type: str | None, level: int = DEFAULT_COMPRESSION_LEVEL) -> str | None:
+    """
+    Decide whether an upload should be stored compressed: its MIME type must be a compressible one
+    and a sample from its start must shrink enough. The stream is rewound afterwards.
+    :return: ZSTD_CODEC, or None to store the content as-is.
+    """
+    if zstandard is None or not mime_type:
+        return None
+    if not (mime_type.startswith("text/") or mime_type in COMPRESSIBLE_MIME_TYPES):
+        return None
+
+    file.seek(0)
+    sample = file.read(COMPRESSION_SAMPLE_SIZE)
+    file.seek(0)
+    if not sample:
+        return None
+
+    compressed = zstandard.ZstdCompressor(level=level).compress(sample)
+    return ZSTD_CODEC if len(compressed) <= len(sample) * COMPRESSION_MAX_RATIO else None
+
+
+def compress_stream(file: BinaryIO, level: int = DEFAULT_COMPRESSION_LEVEL) -> BinaryIO:
+    """ Wrap a stream so that reading it yields its content zstd-compressed, without buffering it whole. """
+    file.seek(0)
+    return io.BufferedReader(zstandard.ZstdCompressor(level=level).stream_reader(file, closefd=False))
+
+
+def decompress_chunks(chunks: Iterable[bytes], codec: str | None) -> Iterator[bytes]:
+    """ Decode stored content chunk by chunk according to the codec recorded on its document. """
+    if codec is None:
+        yield from chunks
+        return
+    if codec != ZSTD_CODEC:
+        raise ValueError(f"Unsupported content codec '{codec}'")
+    if zstandard is None:
+        raise RuntimeError("The zstandard package is required to read compressed documents")
+
+    decompressor = zstandard.ZstdDecompressor().decompressobj()
+    for chunk in chunks:
+        if data := decompressor.decompress(chunk):
+            yield data
+
+
+async def decompress_chunks_async(chunks: AsyncIterable[bytes], codec: str | None) -> AsyncIterator[bytes]:
+    """ Asynchronous counterpart of decompress_chunks. """
+    if codec is None:
+        async for chunk in chunks:
+            yield chunk
+        return
+    if codec != ZSTD_CODEC:
+        raise ValueError(f"Unsupported content codec '{codec}'")
+    if zstandard is None:
+        raise RuntimeError("The zstandard package is required to read compressed documents")
+
+    decompressor = zstandard.ZstdDecompressor().decompressobj()
+    async for chunk in chunks:
+        if data := decompressor.decompress(chunk):
+            yield data
+
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Thread-safe in-memory cache bounded by entry count with least-recently-used eviction
+    and an optional time-to-live per entry. on_evict, if given, is called with the key and
+    value of every entry evicted to make room.
+    """
+
+    def __init__(self, max_entries: int = 128, ttl_seconds: float | None = None,
+                 on_evict: Callable[[K, V], None] | None = None):
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._on_evict = on_evict
+        self._entries: OrderedDict[K, tuple[float | None, V]] = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        """ Return the cached value for key, or default if it is missing or expired. """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: K, value: V) -> None:
+        """ Insert or replace the value for key, evicting the least recently used entries if full. """
+        expires_at = time.monotonic() + self._ttl_seconds if self._ttl_seconds is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                evicted_key, (_, evicted_value) = self._entries.popitem(last=False)
+                self.evictions += 1
+                if self._on_evict is not None:
+                    self._on_evict(evicted_key, evicted_value)
+
+    def get_or_create(self, key: K, factory: Callable[[], V]) -> V:
+        """ Return the cached value for key, creating and caching it under the lock if missing. """
+        with self._lock:
+            value = self.get(key)
+            if value is None:
+                value = factory()
+                self.put(key, value)
+            return value
+
+    def pop(self, key: K, default: V | None = None) -> V | None:
+        """ Remove key from the cache and return its value. """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[1] if entry is not None else default
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def drain(self) -> list[V]:
+        """ Remove every entry and return their values, expired ones included. """
+        with self._lock:
+            values = [value for _, value in self._entries.values()]
+            self._entries.clear()
+            return values
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, int]:
+        """ Return hit, miss and eviction counters along with the current size. """
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class DiskCache:
+    """
+    Thread-safe cache of files on local disk, bounded by total bytes with least-recently-used eviction.
+    Each entry carries the ETag it was fetched at and only serves lookups for that ETag.
+    Concurrent misses on the same key are collapsed into a single fetch.
+    Files handed out by get_or_fetch are pinned until released, so eviction never removes a file being sent.
+    Each process uses its own subdirectory, emptied when the cache is created along with those left by
+    processes that no longer run.
+    """
+
+    _instances: dict[str, "DiskCache"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, directory: str, max_bytes: int, max_entry_bytes: int | None = None):
+        self.directory = os.path.join(directory, str(os.getpid()))
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes if max_entry_bytes is not None else max_bytes // 8
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory)
+        self._remove_dead_process_directories(directory)
+
+        self._entries: OrderedDict[Hashable, tuple[str, str, int]] = OrderedDict()
+        self._in_flight: dict[Hashable, threading.Event] = {}
+        # Pin counts of handed out files, and pinned files already dropped from the cache
+        self._pins: dict[str, int] = {}
+        self._dropped_while_pinned: set[str] = set()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def shared(cls, directory: str, max_bytes: int) -> "DiskCache":
+        """ Return the process-wide cache for directory, creating it on first use.
+        A different max_bytes resizes the existing cache instead of replacing it. """
+        with cls._instances_lock:
+            cache = cls._instances.get(directory)
+            if cache is None:
+                cache = cls._instances[directory] = cls(directory, max_bytes)
+            elif cache.max_bytes != max_bytes:
+                cache.resize(max_bytes)
+            return cache
+
+    @classmethod
+    def instances(cls) -> list["DiskCache"]:
+        with cls._instances_lock:
+            return list(cls._instances.values())
+
+    def get_or_fetch(self, key: Hashable, etag: str, size: int | None,
+                     fetch: Callable[[BinaryIO], None]) -> str | None:
+        """
+        Return the path of the cached file for key at etag, fetching it on a miss.
+        The file is pinned and stays on disk until release(path) is called, even if it is evicted meanwhile.
+        :param size: Expected size of the content; content larger than max_entry_bytes is not cached.
+        :param fetch: Writes the content at etag into the given file; it should fail if the content changed.
+        :return: Path of the pinned cached file, or None if the content is not cached (too large, or the fetch failed).
+        """
+        if size is not None and size > self.max_entry_bytes:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == etag and os.path.exists(entry[0]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._pin(entry[0])
+            self.misses += 1
+
+            fetching = self._in_flight.get(key)
+            if fetching is None:
+                fetching = self._in_flight[key] = threading.Event()
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            # Another request is fetching the same content, use its result
+            fetching.wait()
+            with self._lock:
+                entry = self._entries.get(key)
+                return self._pin(entry[0]) if entry is not None and entry[1] == etag else None
+
+        path = os.path.join(self.directory, uuid.uuid4().hex)
+        try:
+            with open(path, "wb") as file:
+                fetch(file)
+            fetched_size = os.path.getsize(path)
+            if fetched_size > self.max_entry_bytes:
+                os.remove(path)
+                return None
+
+            with self._lock:
+                self._discard(key)
+                self._entries[key] = (path, etag, fetched_size)
+                self.total_bytes += fetched_size
+                self._pin(path)
+                self._evict()
+            return path
+        except Exception:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            fetching.set()
+
+    def release(self, path: str) -> None:
+        """ Unpin a file returned by get_or_fetch, removing it if it was dropped from the cache meanwhile. """
+        with self._lock:
+            count = self._pins.get(path, 0) - 1
+            if count > 0:
+                self._pins[path] = count
+                return
+            self._pins.pop(path, None)
+            if path in self._dropped_while_pinned:
+                self._dropped_while_pinned.discard(path)
+                self._remove_file(path)
+
+    def invalidate(self, key: Hashable) -> None:
+        """ Drop the cached file for key, if any. """
+        with self._lock:
+            self._discard(key)
+
+    def resize(self, max_bytes: int) -> None:
+        """ Change the byte budget in place, evicting least recently used files beyond it. """
+        with self._lock:
+            self.max_entry_bytes = self.max_entry_bytes * max_bytes // self.max_bytes if self.max_bytes else max_bytes // 8
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _pin(self, path: str) -> str:
+        # Must be called with the lock held
+        self._pins[path] = self._pins.get(path, 0) + 1
+        return path
+
+    def _evict(self) -> None:
+        # Must be called with the lock held. The most recent entry is kept even if it alone exceeds the budget.
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            self._discard(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _discard(self, key: Hashable) -> None:
+        # Must be called with the lock held. Pinned files are removed once released.
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[2]
+            if entry[0] in self._pins:
+                self._dropped_while_pinned.add(entry[0])
+            else:
+                self._remove_file(entry[0])
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _remove_dead_process_directories(directory: str) -> None:
+        """ Remove the subdirectories left by worker processes that exited without cleaning up. """
+        if os.name != "posix":
+            # Probing a process with signal 0 is POSIX only; on Windows os.kill terminates the process
+            return
+        for name in os.listdir(directory):
+            if not name.isdigit() or int(name) == os.getpid():
+                continue
+            try:
+                os.kill(int(name), 0)
+            except ProcessLookupError:
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+            except PermissionError:
+                # The process exists but belongs to another user
+                pass
+
+    def stats(self) -> dict[str, int | float | str]:
+        """ Return hit ratio, hit, miss and eviction counters along with the current size. """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "directory": self.directory,
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "pinned": len(self._pins),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def iter_stream_chunks(stream: BinaryIO | Iterable[bytes], chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    """ Iterate over the content returned by a storage provider, whether a file-like object or a chunk iterator.
+    File-like objects are closed once exhausted. """
+    if not hasattr(stream, "read"):
+        yield from stream
+        return
+
+    try:
+        while chunk := stream.read(chunk_size):
+            yield chunk
+    finally:
+        stream.close()
+
+
+def unique_archive_name(name: str | None, used_names: set[str]) -> str:
+    """ Return name, or "name (2).ext", "name (3).ext"... if an entry with that name already exists. """
+    name = name or "document"
+    stem, extension = os.path.splitext(name)
+    candidate, counter = name, 1
+    while candidate in used_names:
+        counter += 1
+        candidate = f"{stem} ({counter}){extension}"
+    used_names.add(candidate)
+    return candidate
+
+
+class _ZipStreamSink(io.RawIOBase):
+    """ Write-only, non-seekable target for ZipFile that hands the written bytes back to the caller. """
+
+    def __init__(self):
+        self._pending: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._pending.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._pending)
+        self._pending.clear()
+        return data
+
+
+def stream_zip(entries: Iterable[tuple[str, Iterable[bytes]]]) -> Iterator[bytes]:
+    """
+    Build a ZIP archive incrementally and yield it as it is produced, without a temporary file.
+    Memory stays bounded by the size of the chunks of the entries.
+    :param entries: (name, chunks) pairs, one per archive member.
+    :return: Iterator over the bytes of the archive.
+    """
+    sink = _ZipStreamSink()
+    # The sink is not seekable, so ZipFile writes sizes and CRCs in data descriptors after each member
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, chunks in entries:
+            with archive.open(name, mode="w", force_zip64=True) as member:
+                for chunk in chunks:
+                    member.write(chunk)
+                    if data := sink.drain():
+                        yield data
+            if data := sink.drain():
+                yield data
+    yield sink.drain()
+
+
+class _PrefetchFailure:
+    """ Carries an exception raised by the prefetch thread over to the consumer. """
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def prefetch_chunks(chunks: Iterable[bytes], depth: int = 1) -> Iterator[bytes]:
+    """
+    Iterate over chunks while a background thread fetches the next ones.
+    At most `depth` chunks are buffered ahead of the consumer, so memory stays
+    bounded no matter how large the underlying content is.
+    :param chunks: Source iterable, e.g. an Azure StorageStreamDownloader.chunks().
+    :param depth: Number of chunks to prefetch. 0 disables prefetching.
+    :return: Iterator yielding the same chunks in order.
+    """
+    if depth <= 0:
+        yield from chunks
+        return
+
+    buffer: queue.Queue = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+    end_of_stream = object()
+
+    def put(item) -> bool:
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for chunk in chunks:
+                if not put(chunk):
+                    return
+        except BaseException as ex:
+            put(_PrefetchFailure(ex))
+            return
+        put(end_of_stream)
+
+    threading.Thread(target=produce, name="chunk-prefetch", daemon=True).start()
+
+    try:
+        while True:
+            item = buffer.get()
+            if item is end_of_stream:
+                return
+            if isinstance(item, _PrefetchFailure):
+                raise item.error
+            yield item
+    finally:
+        # Consumer finished or went away (e.g. client disconnected): release the producer
+        stopped.set()
+
+
 class DocumentLocationGenerator:
+    """
+    Allocates storage folders for documents.
+    Sequence folder counters are kept in memory per hour directory and rebuilt lazily from
+    disk the first time a directory is seen, so allocating a slot costs O(1) regardless of
+    how many files the tree already holds. Share one instance across uploads.
+    """
 
     config = AppSettings()
     BASE_DOC_STORE_DIRECTORY = Path(config.BASE_DOC_STORE_DIRECTORY)
     BASE_DOC_STORE_DIRECTORY.mkdir(exist_ok=True)
 
-    def __init__(self,file_limit: int = 100):
+    _shared_instance: "DocumentLocationGenerator | None" = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self,file_limit: int = 100, max_tracked_directories: int = 1024):
         self.file_limit = file_limit
+        # hour directory -> [current sequence number, files allocated in it]
+        self._sequence_state: LRUCache[str, list[int]] = LRUCache(max_entries=max_tracked_directories)
+        self._lock = threading.Lock()
+
+
+    @classmethod
+    def shared(cls) -> "DocumentLocationGenerator":
+        """ The instance shared by every provider writing to the document store, so their
+        sequence folder counters agree. """
+        with cls._shared_lock:
+            if cls._shared_instance is None:
+                cls._shared_instance = cls()
+            return cls._shared_instance
 
 
     def generate_doc_location(self, document: Document | None) -> str:
@@ -47,8 +777,6 @@ class DocumentLocationGenerator:
             str(document.created_at.hour),
         )
 
-        os.makedirs(path, exist_ok=True)
-
         # Optionally create a "sequence folder" (C# had CreateSequenceFolder)
         sequence_folder_path = self._create_sequence_folder(path)
 
@@ -57,41 +785,60 @@ class DocumentLocationGenerator:
 
     def _create_sequence_folder(self, base_category_path: str) -> str:
         """
-        Creates or selects a sequence-based subfolder under base_category_path.
+        Reserves a file slot in a sequence-based subfolder under base_category_path.
         - Starts with 0001 if none exists.
-        - If last folder reaches file_limit, create next (0002, 0003, etc.)
+        - If the current folder reaches file_limit, moves on to the next (0002, 0003, etc.)
         - Returns the folder path.
         """
-        # Get all existing subfolders
-        directories = [
-            d for d in os.listdir(base_category_path)
-            if os.path.isdir(os.path.join(base_category_path, d))
+        with self._lock:
+            state = self._sequence_state.get(base_category_path)
+            if state is None:
+                state = self._load_sequence_state(base_category_path)
+                self._sequence_state.put(base_category_path, state)
+
+            if state[1] >= self.file_limit:
+                state[0] = self._claim_next_sequence_folder(base_category_path, state[0])
+                state[1] = 0
+
+            state[1] += 1
+            return os.path.join(base_category_path, f"{state[0]:04d}")
+
+
+    def _load_sequence_state(self, base_category_path: str) -> list[int]:
+        """
+        Rebuild the counters of an hour directory from disk: the last sequence folder
+        and the number of files already in it.
+        """
+        os.makedirs(base_category_path, exist_ok=True)
+
+        sequence_numbers = [
+            int(entry.name) for entry in os.scandir(base_category_path)
+            if entry.is_dir() and entry.name.isdigit()
         ]
-        directories.sort()
 
-        if not directories:
+        if not sequence_numbers:
             # No subfolder exists, create 0001
-            sequence_folder_path = os.path.join(base_category_path, "0001")
-            os.makedirs(sequence_folder_path, exist_ok=True)
-            return sequence_folder_path
-
-        # Use last directory
-        last_directory = directories[-1]
-        last_directory_path = os.path.join(base_category_path, last_directory)
-
-        # Count files in last directory
-        file_count = len([
-            f for f in os.listdir(last_directory_path)
-            if os.path.isfile(os.path.join(last_directory_path, f))
-        ])
-
-        if file_count >= self.file_limit:
-            # Create new sequence folder
-            sequence_no = int(last_directory) + 1
-            new_sequence_folder = f"{sequence_no:04d}"  # zero-padded like 0002
-            new_sequence_folder_path = os.path.join(base_category_path, new_sequence_folder)
-            os.makedirs(new_sequence_folder_path, exist_ok=True)
-            return new_sequence_folder_path
-
-        # Use existing folder
-        return last_directory_path
\ No newline at end of file
+            os.makedirs(os.path.join(base_category_path, "0001"), exist_ok=True)
+            return [1, 0]
+
+        last_sequence_no = max(sequence_numbers)
+        file_count = sum(
+            1 for entry in os.scandir(os.path.join(base_category_path, f"{last_sequence_no:04d}"))
+            if entry.is_file()
+        )
+        return [last_sequence_no, file_count]
+
+
+    @staticmethod
+    def _claim_next_sequence_folder(base_category_path: str, sequence_no: int) -> int:
+        """
+        Create the next free sequence folder. Folders created by another process are
+        skipped, so each process fills folders it created itself.
+        """
+        while True:
+            sequence_no += 1
+            try:
+                os.mkdir(os.path.join(base_category_path, f"{sequence_no:04d}"))
+                return sequence_no
+            except FileExistsError:
+                continue
@@ -0,0 +1,74 @@
+from abc import ABC
+from abc import abstractmethod
+from typing import AsyncIterator
+from fastapi import UploadFile
+from pylekhagaar.core.contracts.istorage_provider import DocumentContentProperties
+from pylekhagaar.core.enum.storage_type_enum import StorageTypeEnum
+from pylekhagaar.core.schemas.document import Document
+from pylekhagaar.core.schemas.storage_type import DocStorageType
+
+
+class IAsyncStorageProvider(ABC):
+    """
+    Asynchronous counterpart of IStorageProvider for the content transfers themselves, so a
+    single worker can hold many uploads and downloads in flight without blocking threads.
+    Metadata bookkeeping (reference counts, deletes) stays with IStorageProvider.
+    """
+
+    @property
+    @abstractmethod
+    def storage_type(self) -> StorageTypeEnum:
+        """ Returns the type of storage provider. """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def initialize(self, storage_type: DocStorageType) -> None:
+        """
+        Initialize the storage provider with the given storage type.
+        :param storage_type: The type of storage to initialize.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def write_document_content(self, document: Document, source_file_location: UploadFile) -> Document:
+        """
+        Write uploaded content to storage without persisting any document metadata.
+        The content is stored as uploaded, at the document's own location.
+        :param document: The document the content belongs to.
+        :param source_file_location: The uploaded file.
+        :return: The Document with name, mime_type, physical_path and the content properties set,
+                 and content_hash and content_codec cleared.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get_document_content(self, document: Document,
+                                   decompress: bool = True) -> tuple[AsyncIterator[bytes], str | None]:
+        """
+        Retrieve the content of a document as an asynchronous iterator of chunks.
+        :param document: The already loaded document to read.
+        :param decompress: Whether content stored compressed (document.content_codec) is decoded,
+                           or returned as stored.
+        :return: An iterator over the document's content and its filename.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get_document_content_properties(self, document: Document) -> DocumentContentProperties:
+        """
+        Retrieve the size and validators of a document's content as stored, without reading it.
+        :param document: The already loaded document.
+        :return: The DocumentContentProperties of the stored content.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def get_document_content_range(self, document: Document, offset: int, length: int) -> AsyncIterator[bytes]:
+        """
+        Retrieve a byte range of a document's content as stored. Only the requested bytes are read from storage.
+        :param document: The already loaded document.
+        :param offset: Zero-based position of the first byte to return.
+        :param length: Number of bytes to return.
+        :return: An asynchronous iterator of chunks covering exactly the requested range.
+        """
+        raise NotImplementedError()
@@ -0,0 +1,14 @@
+from abc import ABC
+from abc import abstractmethod
+import uuid
+from pylekhagaar.core.contracts.iasync_storage_provider import IAsyncStorageProvider
+
+
+class IAsyncStorageProviderFactory(ABC):
+    @abstractmethod
+    async def get_storage_provider(self, storage_id: uuid.UUID) -> IAsyncStorageProvider:
+        """ Get the initialized asynchronous storage provider of a storage.
+        :param storage_id: Id of the DocStorageType to get the provider of.
+        :return: An instance of IAsyncStorageProvider.
+        """
+        raise NotImplementedError()
@@ -0,0 +1,34 @@
+from abc import ABC
+from abc import abstractmethod
+from uuid import UUID
+from pylekhagaar.core.schemas.document import Document
+from pylekhagaar.core.schemas.document_cursor_page import DocumentCursorPage
+from pycrud.core.data_filters.simple_search_filter import SimpleSearchFilter
+
+
+class IDocumentAsyncRepository(ABC):
+    """
+    Asynchronous read access to document metadata, for routes served without a worker thread.
+    """
+
+    @abstractmethod
+    async def get_by_id(self, id: UUID) -> Document | None:
+        """
+        Load a document of the current tenant, keeping its storage details.
+        :param id: UUID of the document.
+        :return: The Document, or None if it does not exist.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def find_page(self, data_filter: SimpleSearchFilter, cursor: str | None = None, page_size: int = 10,
+                        include_total: bool = False) -> DocumentCursorPage:
+        """
+        Find documents with keyset pagination, like IDocumentRepository.find_page.
+        :param data_filter: Search text and sort order.
+        :param cursor: next_cursor of the previous page, or None for the first page.
+        :param page_size: Number of documents per page.
+        :param include_total: Whether to also count all matching documents.
+        :return: The page of documents (physical_path is cleared) and the cursor of the next one.
+        """
+        raise NotImplementedError()
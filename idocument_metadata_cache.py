@@ -0,0 +1,51 @@
+from abc import ABC
+from abc import abstractmethod
+from uuid import UUID
+from pylekhagaar.core.schemas.document import Document
+
+
+class IDocumentMetadataCache(ABC):
+    """
+    Cache of document metadata keyed by (tenant, id), in front of DocumentRepositoryImpl.get_by_id.
+    Implementations hand out copies, so callers may modify the Documents they get.
+    """
+
+    @abstractmethod
+    def get(self, tenant_id, document_id: UUID) -> Document | None:
+        """
+        Return a copy of the cached document, or None if it is not cached.
+        :param tenant_id: Tenant the document belongs to.
+        :param document_id: UUID of the document.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def put(self, tenant_id, document: Document) -> None:
+        """
+        Cache a copy of a document as loaded from the database.
+        :param tenant_id: Tenant the document belongs to.
+        :param document: The document, with its storage details.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def invalidate(self, tenant_id, document_ids: list[UUID]) -> None:
+        """
+        Drop documents from the cache after they were updated or deleted.
+        :param tenant_id: Tenant the documents belong to.
+        :param document_ids: UUIDs of the documents.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def is_shared(self) -> bool:
+        """
+        Whether the cache is shared by every process, so each sees the invalidations of the others.
+        Entries of a cache that is not may point at content another process has since replaced.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """ Return the backend name with hit, miss (and, where known, size and eviction) counters. """
+        raise NotImplementedError()
@@ -0,0 +1,17 @@
+from typing import Optional
+from uuid import UUID
+from pydantic import BaseModel
+
+
+class IngestJobStatus(BaseModel):
+    """
+    Progress of content uploaded for asynchronous ingest.
+    status is one of pending, running, stored (written to storage, not yet recorded on the
+    document), completed or failed.
+    """
+
+    job_id: UUID
+    document_id: UUID
+    status: str
+    attempts: int = 0
+    error: Optional[str] = None
@@ -0,0 +1,5 @@
+class IngestQueueFullException(Exception):
+    """
+    Raised when an upload for asynchronous ingest is refused because too many earlier ones
+    are still waiting to be stored. Clients should retry later.
+    """
@@ -1,14 +1,62 @@
 from abc import ABC
 from abc import abstractmethod
-from typing import BinaryIO
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import os
+from typing import BinaryIO, Callable, Iterable
 from uuid import UUID
 from fastapi import UploadFile
 from pylekhagaar.core.enum.storage_type_enum import StorageTypeEnum
 from pylekhagaar.core.schemas.document import Document
+from pylekhagaar.core.schemas.document_content_url import DocumentContentUrl
 from pylekhagaar.core.schemas.storage_type import DocStorageType
+from pylekhagaar.core.schemas.upload_session import UploadSession
+
+
+@dataclass(frozen=True)
+class DocumentContentProperties:
+    """ Size and validators of the stored content of a document. """
+    size: int
+    etag: str | None = None
+    last_modified: datetime | None = None
+
+    @classmethod
+    def from_stat_result(cls, stat_result: os.stat_result) -> "DocumentContentProperties":
+        """ Build the properties of a local file from its stat result. """
+        return cls(
+            size=stat_result.st_size,
+            etag=f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"',
+            last_modified=datetime.fromtimestamp(stat_result.st_mtime, timezone.utc),
+        )
+
+    @classmethod
+    def from_document(cls, document: Document) -> "DocumentContentProperties | None":
+        """ The properties recorded on a document when its content was written, or None if not recorded. """
+        if document.content_size is None or not document.content_etag:
+            return None
+        return cls(size=document.content_size, etag=document.content_etag, last_modified=document.content_modified_at)
+
+    def record_on(self, document: Document) -> None:
+        """ Record these properties on a document, to be saved with its metadata. """
+        document.content_size = self.size
+        document.content_etag = self.etag
+        document.content_modified_at = self.last_modified
+
+
+@dataclass(frozen=True)
+class DocumentContentFile:
+    """ Local file holding the stored content of a document. """
+    path: str
+    stat_result: os.stat_result
+    # Called once the file has been sent, for files the provider must keep in place until then
+    release: Callable[[], None] | None = None
 
 
 class IStorageProvider(ABC):
+    """
+    Stores and retrieves document content. Callers load the Document once and pass it in,
+    so providers never re-read document metadata.
+    """
 
     @property
     @abstractmethod
@@ -27,30 +75,154 @@ class IStorageProvider(ABC):
 
 
     @abstractmethod
-    def set_document_content(self, document_id: UUID, source_file_location: UploadFile) -> Document:
+    def set_document_content(self, document: Document, source_file_location: UploadFile) -> Document:
         """
         Set or update the content of a document.
-        :param document_id: The unique identifier of the document.
+        :param document: The already loaded document whose content is set.
         :param source_file_location: The file path where the new content is located.
         :return: The updated Document with new content information.
         """
         raise NotImplementedError()
     
     @abstractmethod
-    def get_document_content(self, document_id: UUID) -> tuple[BinaryIO, str | None]:
+    def write_document_content(self, document: Document, source_file_location: UploadFile) -> Document:
+        """
+        Store the content of a document without updating its metadata in the database,
+        so several writes can run concurrently and be persisted together afterwards.
+        A content-addressed payload is referenced (IDocumentRepository.acquire_content_reference) before
+        the provider looks for an existing copy, so the caller records it without acquiring it again.
+        :param document: The document the content belongs to.
+        :param source_file_location: The uploaded file holding the content.
+        :return: The Document with name, mime_type, physical_path, content_hash, content_codec and
+                 the content properties (content_size, content_etag, content_modified_at) set.
+        """
+        raise NotImplementedError()
+    
+    @abstractmethod
+    def get_document_content(self, document: Document,
+                             decompress: bool = True) -> tuple[BinaryIO | Iterable[bytes], str | None]:
+        """
+        Retrieve the content of a document as a binary stream or an iterator of chunks.
+        :param document: The already loaded document to read.
+        :param decompress: Whether content stored compressed (document.content_codec) is decoded,
+                           or returned as stored.
+        :return: A binary stream (or chunk iterator) of the document's content and its filename.
+        """
+        raise NotImplementedError()
+    
+    def get_document_content_file(self, document: Document) -> DocumentContentFile | None:
+        """
+        Retrieve the local file holding a document's content, so it can be sent with a
+        zero-copy file response. Providers whose content is not on local disk return None.
+        The file holds the content as stored, i.e. compressed if document.content_codec is set.
+        Callers must call its release, when set, once the file has been sent.
+        :param document: The already loaded document.
+        :return: The DocumentContentFile, or None.
+        """
+        return None
+
+    def get_document_content_url(self, document: Document) -> DocumentContentUrl | None:
+        """
+        Create a short-lived, read-only URL from which clients download a document's content
+        directly from storage. Providers that cannot hand out such URLs return None.
+        :param document: The already loaded document.
+        :return: The URL and its expiry time, or None.
+        """
+        return None
+
+    def get_document_upload_url(self, document: Document, filename: str) -> DocumentContentUrl | None:
+        """
+        Create a short-lived, write-only URL to which a client uploads a document's content directly,
+        to be followed by complete_document_upload. Providers that cannot hand out such URLs return None.
+        :param document: The already loaded document.
+        :param filename: Name of the file being uploaded.
+        :return: The URL and its expiry time, or None.
+        """
+        return None
+
+    def complete_document_upload(self, document: Document, filename: str) -> Document:
+        """
+        Record content uploaded through get_document_upload_url on the document, replacing its previous content.
+        :param document: The already loaded document.
+        :param filename: Name of the uploaded file, as passed to get_document_upload_url.
+        :return: The updated Document (physical_path is cleared).
+        """
+        raise NotImplementedError("This storage does not support direct uploads")
+
+    def begin_chunked_upload(self, document: Document, session: UploadSession) -> None:
+        """
+        Prepare storage to receive the chunks of an upload session, in any order.
+        :param document: The already loaded document.
+        :param session: The new upload session.
+        """
+        raise NotImplementedError("This storage does not support chunked uploads")
+
+    def write_document_chunk(self, document: Document, session: UploadSession, index: int, chunk: bytes) -> None:
+        """
+        Store one chunk of an upload session. Chunks may be written concurrently, and writing
+        a chunk again replaces it.
+        :param document: The already loaded document.
+        :param session: The upload session.
+        :param index: Zero-based number of the chunk.
+        :param chunk: The bytes of the chunk, exactly as long as the session expects.
+        """
+        raise NotImplementedError("This storage does not support chunked uploads")
+
+    def complete_chunked_upload(self, document: Document, session: UploadSession) -> Document:
+        """
+        Assemble the chunks of an upload session into the document's new content.
+        Like write_document_content, document metadata in the database is left to the caller.
+        :param document: The already loaded document.
+        :param session: The upload session, whose chunks have all been written.
+        :return: The Document with name, mime_type, physical_path, content_hash, content_codec
+                 and content properties set.
+        """
+        raise NotImplementedError("This storage does not support chunked uploads")
+
+    def abort_chunked_upload(self, session: UploadSession) -> None:
+        """
+        Discard the chunks of an upload session that will not be completed.
+        :param session: The expired or cancelled upload session.
+        """
+        pass
+
+    @abstractmethod
+    def get_document_content_properties(self, document: Document) -> DocumentContentProperties:
+        """
+        Retrieve the size and validators of a document's content without reading it.
+        Like byte ranges, they describe the content as stored.
+        :param document: The already loaded document.
+        :return: The DocumentContentProperties of the stored content.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def get_document_content_range(self, document: Document, offset: int, length: int) -> Iterable[bytes]:
         """
-        Retrieve the content of a document as a binary stream.
-        :param document_id: The unique identifier of the document.
-        :return: A binary stream of the document's content.
+        Retrieve a byte range of a document's content. Only the requested bytes are read from storage.
+        :param document: The already loaded document.
+        :param offset: Zero-based position of the first byte to return.
+        :param length: Number of bytes to return.
+        :return: An iterator of chunks covering exactly the requested range.
         """
         raise NotImplementedError()
     
     @abstractmethod
-    def delete_document_content(self, document_id: UUID) -> bool:
+    def delete_document_content(self, document: Document) -> bool:
         """
         Deletes both the metadata entry and the physical file (if it exists).
         Returns True if deleted, False otherwise.
-        :param document_id: The unique identifier of the document to be deleted.
+        :param document: The already loaded document to be deleted.
         :return: A boolean indicating whether the document was successfully deleted.
         """
-        raise NotImplementedError()
\ No newline at end of file
+        raise NotImplementedError()
+
+    @abstractmethod
+    def delete_document_contents(self, documents: list[Document]) -> dict[UUID, str | None]:
+        """
+        Deletes the stored content of several documents in as few storage calls as possible.
+        Metadata entries are left to the caller.
+        :param documents: The already loaded documents whose content is deleted.
+        :return: For each document id, None if its content is gone, or the error that prevented it.
+        """
+        raise NotImplementedError()
@@ -0,0 +1,116 @@
+import os
+from typing import AsyncIterator
+import anyio
+from fastapi import UploadFile
+from fastapi_injector import Injected
+from injector import inject
+from pylekhagaar.core.contracts.iasync_storage_provider import IAsyncStorageProvider
+from pylekhagaar.core.contracts.istorage_provider import DocumentContentProperties
+from pylekhagaar.core.enum.storage_type_enum import StorageTypeEnum
+from pylekhagaar.core.schemas.document import Document
+from pylekhagaar.core.schemas.storage_type import DocStorageType
+from pylekhagaar.helpers.helper_functions import DocumentLocationGenerator, decompress_chunks_async, guess_mime
+from pycrud.core.contracts.icrud_logger import ICrudLogger
+from pycrud.core.exceptions.not_found_exception import NotFoundException
+
+
+# Size of the reads and writes issued while transferring a file
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+class LocalFileAsyncStorageProviderImpl(IAsyncStorageProvider):
+    """ Transfers document content to and from the local document store with non-blocking file I/O. """
+
+    @inject
+    def __init__(self, logger: ICrudLogger = Injected(ICrudLogger)):
+        self._logger = logger.get_logger(__name__)
+
+
+    @property
+    def storage_type(self) -> StorageTypeEnum:
+        return StorageTypeEnum.LOCAL_FS
+
+    async def initialize(self, storage_type: DocStorageType) -> None:
+        assert storage_type.storageType == StorageTypeEnum.LOCAL_FS
+        self._logger.info("Initialized async Local File Storage Provider")
+
+
+    async def write_document_content(self, document: Document, source_file_location: UploadFile) -> Document:
+        """ Write an uploaded file to the document store without touching document metadata in the database.
+        :param document: The Document the content belongs to.
+        :param source_file: UploadFile object containing the file to write.
+        :return: The Document with name, mime_type, physical_path and content properties set.
+        """
+        destination_folder_path = await anyio.to_thread.run_sync(
+            DocumentLocationGenerator.shared().generate_doc_location, document)
+        destination_file_path = os.path.join(destination_folder_path, f"{document.id}_{source_file_location.filename}")
+
+        await source_file_location.seek(0)
+        async with await anyio.open_file(destination_file_path, "wb") as dest_file:
+            while chunk := await source_file_location.read(READ_CHUNK_SIZE):
+                await dest_file.write(chunk)
+
+        DocumentContentProperties.from_stat_result(await anyio.Path(destination_file_path).stat()).record_on(document)
+        document.physical_path = destination_file_path
+        document.name = source_file_location.filename
+        document.mime_type = guess_mime(source_file_location.filename)
+        document.content_hash = None
+        document.content_codec = None
+        return document
+
+
+    async def get_document_content(self, document: Document,
+                                   decompress: bool = True) -> tuple[AsyncIterator[bytes], str]:
+        """ Get the file content of a document.
+        :param document: The already loaded Document to read.
+        :param decompress: Whether compressed content is decoded while it is read.
+        :return: Tuple containing an asynchronous iterator over the file content and the filename.
+        """
+        physical_path = await self._get_physical_path(document)
+        chunks = self._read_file(physical_path, 0, None)
+        if decompress and document.content_codec:
+            chunks = decompress_chunks_async(chunks, document.content_codec)
+        return chunks, document.name
+
+
+    async def get_document_content_properties(self, document: Document) -> DocumentContentProperties:
+        """ Get the size and validators of a document's file from a single stat.
+        :param document: The already loaded Document.
+        :return: DocumentContentProperties of the stored file.
+        """
+        return DocumentContentProperties.from_stat_result(await anyio.Path(await self._get_physical_path(document)).stat())
+
+
+    async def get_document_content_range(self, document: Document, offset: int, length: int) -> AsyncIterator[bytes]:
+        """ Get a byte range of a document's file using a seek and bounded reads.
+        :param document: The already loaded Document.
+        :param offset: Position of the first byte to return.
+        :param length: Number of bytes to return.
+        :return: Asynchronous iterator over the requested bytes.
+        """
+        async for chunk in self._read_file(await self._get_physical_path(document), offset, length):
+            yield chunk
+
+
+    @staticmethod
+    async def _get_physical_path(document: Document) -> str:
+        """ Resolve the physical path of a document's file, failing if it does not exist. """
+        if not document.physical_path or not await anyio.Path(document.physical_path).exists():
+            raise NotFoundException(detail=f"Document file not found for ID: {document.id}")
+
+        return document.physical_path
+
+
+    @staticmethod
+    async def _read_file(physical_path: str, offset: int, length: int | None) -> AsyncIterator[bytes]:
+        """ Read length bytes of a file from offset, or up to its end if length is None. """
+        async with await anyio.open_file(physical_path, "rb") as file:
+            await file.seek(offset)
+            remaining = length
+            while remaining is None or remaining > 0:
+                chunk = await file.read(READ_CHUNK_SIZE if remaining is None else min(READ_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
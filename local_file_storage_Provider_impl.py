@@ -1,6 +1,6 @@
 from pathlib import Path
-from typing import BinaryIO
-from pylekhagaar.core.contracts.istorage_provider import IStorageProvider
+from typing import BinaryIO, Iterator
+from pylekhagaar.core.contracts.istorage_provider import DocumentContentFile, DocumentContentProperties, IStorageProvider
 from fastapi_injector import Injected
 from pylekhagaar.core.contracts.istorage_provider import IStorageProvider
 from pylekhagaar.core.contracts.idocument_repository import IDocumentRepository
@@ -13,7 +13,9 @@ from pycrud.core.exceptions.not_found_exception import NotFoundException
 from pylekhagaar.helpers.helper_functions import DocumentLocationGenerator
 import os
 
-from uuid import UUID
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+from uuid import UUID, uuid4
 from fastapi import UploadFile
 from fastapi_injector import Injected
 from injector import inject
@@ -21,8 +23,11 @@ from pylekhagaar.app_settings import AppSettings
 from pylekhagaar.core.contracts.idocument_repository import IDocumentRepository
 from pylekhagaar.core.contracts.istorage_provider import IStorageProvider
 from pylekhagaar.core.enum.storage_type_enum import StorageTypeEnum
-from pylekhagaar.helpers.helper_functions import DocumentLocationGenerator, guess_mime
+from pylekhagaar.helpers.helper_functions import (DEFAULT_COMPRESSION_LEVEL, ZSTD_CODEC, DocumentLocationGenerator,
+                                                  choose_content_codec, compress_stream, content_addressed_path,
+                                                  decompress_chunks, guess_mime, iter_stream_chunks)
 from pylekhagaar.core.schemas.document import Document
+from pylekhagaar.core.schemas.upload_session import UploadSession
 from pycrud.core.exceptions.not_found_exception import NotFoundException
 from pycrud.core.contracts.icrud_logger import ICrudLogger
 
@@ -30,6 +35,15 @@ config = AppSettings()
 TEMP_DIRECTORY = Path(config.TEMP_DIRECTORY)
 TEMP_DIRECTORY.mkdir(exist_ok=True)
 
+# Size of the reads issued while streaming a byte range of a file
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Number of files removed in parallel by a bulk delete
+DELETE_CONCURRENCY = 16
+
+# Shared by all uploads so sequence folder counters survive across requests
+_document_location_generator = DocumentLocationGenerator.shared()
+
 class LocalFileStorageProviderImpl(IStorageProvider):
     @inject
     def __init__(self,
@@ -38,6 +52,9 @@ class LocalFileStorageProviderImpl(IStorageProvider):
                 ):
             self._document_repository: IDocumentRepository = document_repository
             self._logger = logger.get_logger(__name__)
+            self._content_addressed = False
+            self._compression = False
+            self._compression_level = DEFAULT_COMPRESSION_LEVEL
 
 
     @property
@@ -46,68 +63,305 @@ class LocalFileStorageProviderImpl(IStorageProvider):
 
     def initialize(self, storage_type: DocStorageType) -> None:
         assert storage_type.storageType == StorageTypeEnum.LOCAL_FS, "Authenticator type must be AZURE_BLOB"
+        config = storage_type.configParam or {}
+        # Store each distinct payload once under its SHA-256, shared by every document with that content
+        self._content_addressed = bool(config.get("content_addressed", False))
+        # Store compressible uploads zstd-compressed (configParam["compression"] = "zstd")
+        self._compression = config.get("compression") == ZSTD_CODEC
+        self._compression_level = int(config.get("compression_level", DEFAULT_COMPRESSION_LEVEL))
         self._logger.info("Initialized Azure Blob Storage Provider")
 
 
 
-    def set_document_content(self, document_id: UUID, source_file_location: UploadFile) -> Document:
+    def set_document_content(self, document: Document, source_file_location: UploadFile) -> Document:
         """ Set or update the content of a document by uploading a file.
-        :param document_id: UUID of the document to update.
+        :param document: The already loaded Document to update.
         :param source_file: UploadFile object containing the file to upload.
         :return: Updated Document object with metadata (physical_path is cleared).
         """
-        document =self._document_repository.get_by_id(document_id)
-        if not document:
-            raise NotFoundException(detail="Document not found for specified Id")
-
+        previous_path, previous_hash = document.physical_path, document.content_hash
 
-        # Generate destination file path
-        doclocationGenerator = DocumentLocationGenerator()
-        destination_folder_path = doclocationGenerator.generate_doc_location(document)
+        document = self.write_document_content(document, source_file_location)
 
-        new_file_name = f"{document.id}_{source_file_location.filename}"
-        destination_file_path = os.path.join(destination_folder_path, new_file_name)
-
-        # If old file exists, delete it
-        if document.physical_path and os.path.exists(document.physical_path):
-            os.remove(document.physical_path)
-
-        # Ensure temp directory exists
-        os.makedirs(TEMP_DIRECTORY, exist_ok=True)
-
-        # Write uploaded file to destination
-        with open(destination_file_path, "wb") as dest_file:
-            while chunk := source_file_location.file.read(1024 * 1024):  # write in chunks (1 MB)
-                dest_file.write(chunk)
+        # Release the previous content once the new one is stored
+        if previous_hash or previous_path != document.physical_path:
+            self._release_content(document.storage_id, previous_path, previous_hash)
 
         # Update database with new physical path
-        document.name = source_file_location.filename
-        document.physical_path = destination_file_path
-        document.mime_type = guess_mime(destination_file_path)
-        
         updated = self._document_repository.update(document)
 
         # Clear path before returning (to mimic C#)
         updated.physical_path = None
         return updated
+
+
+    def write_document_content(self, document: Document, source_file_location: UploadFile) -> Document:
+        """ Write an uploaded file to disk without touching document metadata in the database.
+        :param document: The Document the content belongs to.
+        :param source_file: UploadFile object containing the file to write.
+        :return: The Document with name, mime_type, physical_path, content_hash, content_codec
+                 and content properties set. A content-addressed payload is already referenced.
+        """
+        mime_type = guess_mime(source_file_location.filename)
+
+        if self._content_addressed:
+            destination_file_path, document.content_hash = self._store_content_addressed(document, source_file_location)
+            document.content_codec = None
+        else:
+            # Generate destination file path
+            destination_folder_path = _document_location_generator.generate_doc_location(document)
+
+            new_file_name = f"{document.id}_{source_file_location.filename}"
+            destination_file_path = os.path.join(destination_folder_path, new_file_name)
+
+            document.content_codec = self._choose_content_codec(source_file_location, mime_type)
+            source = source_file_location.file
+            if document.content_codec:
+                source = compress_stream(source, self._compression_level)
+
+            # Write uploaded file to destination
+            with open(destination_file_path, "wb") as dest_file:
+                while chunk := source.read(1024 * 1024):  # write in chunks (1 MB)
+                    dest_file.write(chunk)
+            document.content_hash = None
+
+        DocumentContentProperties.from_stat_result(os.stat(destination_file_path)).record_on(document)
+        document.name = source_file_location.filename
+        document.physical_path = destination_file_path
+        document.mime_type = mime_type
+        return document
     
-    def get_document_content(self, document_id: UUID) -> tuple[BinaryIO, str]:
-        """ Get the file content of a document by its ID.
-        :param document_id: UUID of the document to retrieve.
-        :return: Tuple containing a binary stream of the file content and the filename.
+    def get_document_content(self, document: Document, decompress: bool = True) -> tuple[BinaryIO | Iterator[bytes], str]:
+        """ Get the file content of a document.
+        :param document: The already loaded Document to read.
+        :param decompress: Whether compressed content is decoded while it is read.
+        :return: Tuple containing a binary stream (or chunk iterator) of the file content and the filename.
         """
-        return self._document_repository.get_document_content(document_id)
+        file_stream = open(self._get_physical_path(document), "rb")
+        if decompress and document.content_codec:
+            return decompress_chunks(iter_stream_chunks(file_stream, READ_CHUNK_SIZE), document.content_codec), document.name
+        return file_stream, document.name
     
 
+    def get_document_content_file(self, document: Document) -> DocumentContentFile:
+        """ Get the path of a document's file along with its stat result.
+        :param document: The already loaded Document.
+        :return: DocumentContentFile of the stored file.
+        """
+        physical_path = self._get_physical_path(document)
+        return DocumentContentFile(physical_path, os.stat(physical_path))
 
-    
-    def delete_document_content(self, document_id: UUID) -> bool:
+
+    def get_document_content_properties(self, document: Document) -> DocumentContentProperties:
+        """ Get the size and validators of a document's file from a single stat.
+        :param document: The already loaded Document.
+        :return: DocumentContentProperties of the stored file.
+        """
+        return DocumentContentProperties.from_stat_result(os.stat(self._get_physical_path(document)))
+
+
+    def get_document_content_range(self, document: Document, offset: int, length: int) -> Iterator[bytes]:
+        """ Get a byte range of a document's file using a seek and a bounded read.
+        :param document: The already loaded Document.
+        :param offset: Position of the first byte to return.
+        :param length: Number of bytes to return.
+        :return: Iterator over the requested bytes.
+        """
+        return self._read_file_range(self._get_physical_path(document), offset, length)
+
+
+    def delete_document_content(self, document: Document) -> bool:
         """ Deletes both the metadata entry and the physical file (if it exists).
             Returns True if deleted, False otherwise."""
 
-        document = self._document_repository.get_by_id(document_id)
-        if not document:
-            raise NotFoundException("Document not found")
+        # Delete file if exists (and no other document shares it)
+        self._release_content(document.storage_id, document.physical_path, document.content_hash)
 
         # Delete metadata entry
-        return self._document_repository.delete_document(document_id)
\ No newline at end of file
+        self._document_repository.delete(document.id)
+        return True
+
+
+    def delete_document_contents(self, documents: list[Document]) -> dict[UUID, str | None]:
+        """ Delete the files of several documents with parallel unlinks. Metadata entries are left untouched.
+        Content-addressed files are released instead, and only removed with their last reference.
+        :param documents: The already loaded Documents whose files are deleted.
+        :return: For each document id, None if its file is gone, or the error that prevented it.
+        """
+        results: dict[UUID, str | None] = {}
+        paths: dict[UUID, str] = {}
+        for document in documents:
+            try:
+                if document.content_hash:
+                    # A failed removal rolls the release back, so the reference stays with the file
+                    self._document_repository.release_content_reference(document.storage_id, document.content_hash,
+                                                                         self._remove_file)
+                elif document.physical_path:
+                    paths[document.id] = document.physical_path
+                results[document.id] = None
+            except Exception as ex:
+                results[document.id] = str(ex)
+
+        with ThreadPoolExecutor(max_workers=DELETE_CONCURRENCY, thread_name_prefix="file-delete") as executor:
+            removals = {document_id: executor.submit(self._remove_file, physical_path)
+                        for document_id, physical_path in paths.items()}
+
+        for document_id, removal in removals.items():
+            if error := removal.exception():
+                results[document_id] = str(error)
+        return results
+
+
+    def begin_chunked_upload(self, document: Document, session: UploadSession) -> None:
+        """ Create the file the chunks of an upload session are written into, preallocated to its full size.
+        :param document: The already loaded Document.
+        :param session: The new upload session.
+        """
+        part_path = self._chunked_upload_path(session)
+        os.makedirs(os.path.dirname(part_path), exist_ok=True)
+        with open(part_path, "wb") as part_file:
+            if session.size and hasattr(os, "posix_fallocate"):
+                os.posix_fallocate(part_file.fileno(), 0, session.size)
+            else:
+                part_file.truncate(session.size)
+
+
+    def write_document_chunk(self, document: Document, session: UploadSession, index: int, chunk: bytes) -> None:
+        """ Write a chunk at its position in the session's file with positional writes, so chunks
+        can be written concurrently through their own file descriptors.
+        :param document: The already loaded Document.
+        :param session: The upload session.
+        :param index: Zero-based number of the chunk.
+        :param chunk: The bytes of the chunk.
+        """
+        part_fd = os.open(self._chunked_upload_path(session), os.O_WRONLY | getattr(os, "O_BINARY", 0))
+        try:
+            offset = index * session.chunk_size
+            view = memoryview(chunk)
+            while view:
+                if hasattr(os, "pwrite"):
+                    written = os.pwrite(part_fd, view, offset)
+                else:
+                    os.lseek(part_fd, offset, os.SEEK_SET)
+                    written = os.write(part_fd, view)
+                view = view[written:]
+                offset += written
+            # The chunk is reported as received once this returns, so it must survive a crash
+            os.fsync(part_fd)
+        finally:
+            os.close(part_fd)
+
+
+    def complete_chunked_upload(self, document: Document, session: UploadSession) -> Document:
+        """ Move the assembled file of an upload session to the document's location. Content is stored
+        as sent, without compression or content addressing.
+        :param document: The already loaded Document.
+        :param session: The upload session.
+        :return: The Document with its new file and content properties; metadata is not saved.
+        """
+        destination_folder_path = _document_location_generator.generate_doc_location(document)
+        destination_file_path = os.path.join(destination_folder_path, f"{document.id}_{session.filename}")
+        os.replace(self._chunked_upload_path(session), destination_file_path)
+
+        DocumentContentProperties.from_stat_result(os.stat(destination_file_path)).record_on(document)
+        document.name = session.filename
+        document.physical_path = destination_file_path
+        document.mime_type = guess_mime(session.filename)
+        document.content_hash = None
+        document.content_codec = None
+        return document
+
+
+    def abort_chunked_upload(self, session: UploadSession) -> None:
+        """ Delete the partially written file of an upload session.
+        :param session: The expired or cancelled upload session.
+        """
+        self._remove_file(self._chunked_upload_path(session))
+
+
+    @staticmethod
+    def _chunked_upload_path(session: UploadSession) -> str:
+        """ File an upload session is assembled in, on the same file system as the documents so completing it is a rename. """
+        return os.path.join(DocumentLocationGenerator.BASE_DOC_STORE_DIRECTORY, "uploads", f"{session.upload_id}.part")
+
+
+    def _choose_content_codec(self, source_file_location: UploadFile, mime_type: str) -> str | None:
+        """ Codec to store an upload with, or None to store it as-is. """
+        if not self._compression:
+            return None
+        return choose_content_codec(source_file_location.file, mime_type, self._compression_level)
+
+
+    @staticmethod
+    def _remove_file(physical_path: str) -> None:
+        try:
+            os.remove(physical_path)
+        except FileNotFoundError:
+            pass
+
+
+    def _store_content_addressed(self, document: Document, source_file_location: UploadFile) -> tuple[str, str]:
+        """
+        Write an upload under its SHA-256, computed while streaming it to disk, and reference it for the document.
+        The copy is discarded if the same payload is already stored.
+        :return: Tuple containing the payload path and its hash.
+        """
+        base_directory = DocumentLocationGenerator.BASE_DOC_STORE_DIRECTORY
+        incoming_directory = os.path.join(base_directory, "cas", "incoming")
+        os.makedirs(incoming_directory, exist_ok=True)
+
+        digest = hashlib.sha256()
+        incoming_path = os.path.join(incoming_directory, uuid4().hex)
+        with open(incoming_path, "wb") as dest_file:
+            while chunk := source_file_location.file.read(1024 * 1024):
+                digest.update(chunk)
+                dest_file.write(chunk)
+        content_hash = digest.hexdigest()
+
+        # Referenced before looking for the payload: a release deletes the payload before it commits,
+        # so while the reference is held an existing payload cannot disappear
+        payload_path = self._document_repository.acquire_content_reference(
+            document.storage_id, content_hash, os.path.join(base_directory, content_addressed_path(content_hash)))
+        try:
+            if os.path.exists(payload_path):
+                os.remove(incoming_path)
+            else:
+                os.makedirs(os.path.dirname(payload_path), exist_ok=True)
+                os.replace(incoming_path, payload_path)
+        except Exception:
+            self._document_repository.release_content_reference(document.storage_id, content_hash)
+            self._remove_file(incoming_path)
+            raise
+
+        return payload_path, content_hash
+
+
+    def _release_content(self, storage_id: UUID, physical_path: str | None, content_hash: str | None) -> None:
+        """ Remove a document's file, or drop its reference if the file is content-addressed
+        and only remove it once no document points at it anymore. """
+        if content_hash:
+            self._document_repository.release_content_reference(storage_id, content_hash, self._remove_file)
+        elif physical_path:
+            self._remove_file(physical_path)
+
+
+    @staticmethod
+    def _get_physical_path(document: Document) -> str:
+        """ Resolve the physical path of a document's file, failing if it does not exist. """
+        if not document.physical_path or not os.path.exists(document.physical_path):
+            raise NotFoundException(detail=f"Document file not found for ID: {document.id}")
+
+        return document.physical_path
+
+
+    @staticmethod
+    def _read_file_range(physical_path: str, offset: int, length: int) -> Iterator[bytes]:
+        with open(physical_path, "rb") as file:
+            file.seek(offset)
+            remaining = length
+            while remaining > 0:
+                chunk = file.read(min(READ_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
@@ -1,7 +1,6 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.responses import StreamingResponse
 from azure.storage.blob import BlobServiceClient
-from io import BytesIO
 import os
 
 app = FastAPI(title="Azure Blob Storage Emulator API")
@@ -18,8 +17,15 @@ AZURITE_CONN_STR = (
 
 CONTAINER_NAME = "test-container"
 
+# Downloads are streamed in ranged GETs of this size instead of buffered whole
+DOWNLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
 # Initialize BlobServiceClient
-blob_service_client = BlobServiceClient.from_connection_string(AZURITE_CONN_STR)
+blob_service_client = BlobServiceClient.from_connection_string(
+    AZURITE_CONN_STR,
+    max_single_get_size=DOWNLOAD_CHUNK_SIZE,
+    max_chunk_get_size=DOWNLOAD_CHUNK_SIZE,
+)
 
 # Ensure the container exists
 try:
@@ -65,8 +71,7 @@ def download_file(filename: str):
     try:
         blob_client = container_client.get_blob_client(filename)
         stream = blob_client.download_blob()
-        file_data = stream.readall()
-        return StreamingResponse(BytesIO(file_data), media_type="application/octet-stream",
+        return StreamingResponse(stream.chunks(), media_type="application/octet-stream",
                                  headers={"Content-Disposition": f"attachment; filename={filename}"})
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"File not found: {e}")
@@ -0,0 +1,65 @@
+-- Upgrades an existing PostgreSQL document_detail table to the schema of DocumentModel.
+-- New databases get the same schema from metadata.create_all (see document_model.py).
+-- Every statement is idempotent, so the script can be re-run safely.
+--
+-- The Document schema (pylekhagaar.core.schemas.document) must expose the new optional
+-- fields content_hash, content_codec, content_size, content_etag and content_modified_at.
+-- search_vector stays internal to the database.
+
+BEGIN;
+
+-- Content-addressed storage: hash of the payload a document points at
+ALTER TABLE document_detail ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
+CREATE INDEX IF NOT EXISTS ix_document_detail_content_hash ON document_detail (content_hash);
+
+-- Reference counts of content-addressed payloads, per storage
+CREATE TABLE IF NOT EXISTS document_content_reference (
+    storage_id UUID NOT NULL,
+    content_hash VARCHAR(64) NOT NULL,
+    physical_path VARCHAR(1000) NOT NULL,
+    reference_count INTEGER NOT NULL,
+    PRIMARY KEY (storage_id, content_hash)
+);
+
+-- Compression at rest, and the size and validators recorded on upload
+ALTER TABLE document_detail ADD COLUMN IF NOT EXISTS content_codec VARCHAR(20);
+ALTER TABLE document_detail ADD COLUMN IF NOT EXISTS content_size BIGINT;
+ALTER TABLE document_detail ADD COLUMN IF NOT EXISTS content_etag VARCHAR(100);
+ALTER TABLE document_detail ADD COLUMN IF NOT EXISTS content_modified_at TIMESTAMP WITH TIME ZONE;
+
+-- Keyset pagination walks (tenant, sort key, id) in index order
+CREATE INDEX IF NOT EXISTS ix_document_detail_tenant_created_at ON document_detail (tenant_id, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_document_detail_tenant_name ON document_detail (tenant_id, coalesce(name, ''), id);
+
+-- Full-text search over name, description and author, maintained by a trigger
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+ALTER TABLE document_detail ADD COLUMN IF NOT EXISTS search_vector TSVECTOR;
+
+CREATE OR REPLACE FUNCTION document_detail_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(NEW.author, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS document_detail_search_vector_trigger ON document_detail;
+CREATE TRIGGER document_detail_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description, author ON document_detail
+    FOR EACH ROW EXECUTE FUNCTION document_detail_search_vector_update();
+
+-- Index the documents written before the trigger existed
+UPDATE document_detail
+SET search_vector =
+    setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(description, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(author, '')), 'C')
+WHERE search_vector IS NULL;
+
+-- On large tables, create these two with CREATE INDEX CONCURRENTLY outside the transaction instead
+CREATE INDEX IF NOT EXISTS ix_document_detail_search_vector ON document_detail USING gin (search_vector);
+CREATE INDEX IF NOT EXISTS ix_document_detail_name_trgm ON document_detail USING gin (name gin_trgm_ops);
+
+COMMIT;
@@ -0,0 +1,148 @@
+import logging
+import os
+from uuid import uuid4
+
+import pytest
+
+from pylekhagaar.core.schemas.document import Document
+from pylekhagaar.modules.document.document_metadata_cache_impl import LocalDocumentMetadataCache
+from pylekhagaar.modules.document.document_service_impl import DocumentServiceImpl
+from pylekhagaar.modules.document.local_file_storage_Provider_impl import LocalFileStorageProviderImpl
+from pycrud.core.exceptions.not_found_exception import NotFoundException
+
+
+class RecordingRepository:
+    """ Document repository that records the calls made to it. Only the methods content operations
+    need are implemented, so any other call fails the test. """
+
+    def __init__(self, documents: list[Document]):
+        self.documents = {document.id: document for document in documents}
+        self.calls: list[str] = []
+
+    def get_by_id(self, id):
+        self.calls.append("get_by_id")
+        document = self.documents.get(id)
+        return document.model_copy() if document else None
+
+    def get_by_id_uncached(self, id):
+        self.calls.append("get_by_id_uncached")
+        document = self.documents.get(id)
+        return document.model_copy() if document else None
+
+    def delete(self, id):
+        self.calls.append("delete")
+        return self.documents.pop(id, None) is not None
+
+
+class StaticStorageProviderFactory:
+    def __init__(self, provider):
+        self._provider = provider
+
+    def get_storage_provider(self, storage_id):
+        return self._provider
+
+
+class StandardLogger:
+    def get_logger(self, name):
+        return logging.getLogger(name)
+
+
+class SharedMetadataCache(LocalDocumentMetadataCache):
+    """ Stands in for a cache shared by every process, such as RedisDocumentMetadataCache. """
+
+    def is_shared(self) -> bool:
+        return True
+
+
+class UnboundSession:
+    def get_bind(self):
+        return None
+
+
+@pytest.fixture
+def stored_document(tmp_path):
+    content_path = tmp_path / "report.txt"
+    content_path.write_bytes(b"0123456789")
+    return Document.model_construct(id=uuid4(), name="report.txt", mime_type="text/plain", storage_id=uuid4(),
+                                    physical_path=str(content_path), content_hash=None, content_codec=None,
+                                    content_size=None, content_etag=None, content_modified_at=None)
+
+
+@pytest.fixture
+def repository(stored_document):
+    return RecordingRepository([stored_document])
+
+
+@pytest.fixture
+def metadata_cache():
+    return LocalDocumentMetadataCache()
+
+
+@pytest.fixture
+def service(repository, metadata_cache):
+    provider = LocalFileStorageProviderImpl(document_repository=repository, logger=StandardLogger())
+    return DocumentServiceImpl(document_repository=repository,
+                               permission_checker=None,
+                               docstorage_type=None,
+                               storage_provider_factory=StaticStorageProviderFactory(provider),
+                               metadata_cache=metadata_cache,
+                               session=UnboundSession(),
+                               async_storage_provider_factory=None,
+                               document_async_repository=None,
+                               logger=StandardLogger())
+
+
+def test_get_document_content_loads_metadata_once(service, repository, stored_document):
+    file_stream, filename = service.get_document_content(stored_document.id)
+    with file_stream:
+        assert file_stream.read() == b"0123456789"
+
+    assert filename == "report.txt"
+    assert repository.calls == ["get_by_id_uncached"]
+
+
+def test_content_request_loads_metadata_once(service, repository, stored_document):
+    # The sequence of the content route: load once, then only pass the document along
+    document = service.get_document_for_content(stored_document.id)
+    properties = service.get_document_content_properties(document)
+    content_range = b"".join(service.get_document_content_range(document, 2, 3))
+    local_file = service.get_document_content_file(document)
+    file_stream, _ = service.open_document_content(document, decompress=False)
+    with file_stream:
+        content = file_stream.read()
+
+    assert properties.size == 10
+    assert content_range == b"234"
+    assert local_file.path == stored_document.physical_path
+    assert content == b"0123456789"
+    assert repository.calls == ["get_by_id_uncached"]
+
+
+def test_get_document_for_content_bypasses_an_in_process_cache(service, repository, stored_document):
+    service.get_document_for_content(stored_document.id)
+    service.get_document_for_content(stored_document.id)
+
+    assert repository.calls == ["get_by_id_uncached", "get_by_id_uncached"]
+
+
+@pytest.mark.parametrize("metadata_cache", [SharedMetadataCache()])
+def test_get_document_for_content_reads_through_a_shared_cache(service, repository, stored_document):
+    service.get_document_for_content(stored_document.id)
+
+    assert repository.calls == ["get_by_id"]
+
+
+def test_get_document_for_content_raises_for_unknown_documents(service, repository):
+    with pytest.raises(NotFoundException):
+        service.get_document_for_content(uuid4())
+    assert repository.calls == ["get_by_id_uncached"]
+
+
+# Deleting releases the content the document points at, so it is never loaded from a cache
+@pytest.mark.parametrize("metadata_cache", [LocalDocumentMetadataCache(), SharedMetadataCache()])
+def test_delete_document_reads_the_database_and_removes_the_file(service, repository, stored_document):
+    assert service.delete_document(stored_document.id) is True
+
+    assert not os.path.exists(stored_document.physical_path)
+    assert repository.documents == {}
+    assert repository.calls == ["get_by_id_uncached", "delete"]
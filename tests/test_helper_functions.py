@@ -0,0 +1,310 @@
+import io
+import os
+import subprocess
+import sys
+import threading
+import time
+import zipfile
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from pylekhagaar.helpers import helper_functions
+from pylekhagaar.helpers.helper_functions import (DiskCache, DocumentLocationGenerator, LRUCache, format_http_date,
+                                                  if_range_matches, is_not_modified, parse_range_header,
+                                                  prefetch_chunks, stream_zip)
+
+
+LAST_MODIFIED = datetime(2024, 5, 6, 7, 8, 9, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("range_header, expected", [
+    ("bytes=0-499", [(0, 499)]),
+    ("bytes=900-", [(900, 999)]),
+    ("bytes=-100", [(900, 999)]),
+    ("bytes=0-0,-1", [(0, 0), (999, 999)]),
+    ("bytes=500-5000", [(500, 999)]),
+    ("bytes=-5000", [(0, 999)]),
+    ("BYTES = 0-9", [(0, 9)]),
+    ("bytes=1000-", []),
+    ("bytes=-0", []),
+    ("items=0-9", None),
+    ("bytes=", None),
+    ("bytes=9-0", None),
+    ("bytes=a-b", None),
+    ("bytes=10", None),
+    ("bytes=" + ",".join(["0-0"] * 17), None),
+])
+def test_parse_range_header(range_header, expected):
+    assert parse_range_header(range_header, 1000) == expected
+
+
+@pytest.mark.parametrize("if_range, etag, last_modified, expected", [
+    ('"abc"', '"abc"', None, True),
+    ('"abc"', '"xyz"', None, False),
+    ('W/"abc"', 'W/"abc"', None, False),
+    ('"abc"', 'W/"abc"', None, False),
+    ('"abc"', None, None, False),
+    (format_http_date(LAST_MODIFIED), None, LAST_MODIFIED, True),
+    (format_http_date(LAST_MODIFIED), None, LAST_MODIFIED + timedelta(seconds=1), False),
+    (format_http_date(LAST_MODIFIED), None, None, False),
+    ("not a date", None, LAST_MODIFIED, False),
+])
+def test_if_range_matches(if_range, etag, last_modified, expected):
+    assert if_range_matches(if_range, etag, last_modified) is expected
+
+
+@pytest.mark.parametrize("if_none_match, if_modified_since, etag, expected", [
+    ('"abc"', None, '"abc"', True),
+    ('"xyz", "abc"', None, '"abc"', True),
+    ("*", None, '"abc"', True),
+    ('W/"abc"', None, '"abc"', True),
+    ('"abc"', None, 'W/"abc"', True),
+    ('"xyz"', None, '"abc"', False),
+    ('"abc"', None, None, False),
+    # If-Modified-Since is ignored when If-None-Match is present
+    ('"xyz"', format_http_date(LAST_MODIFIED), '"abc"', False),
+    (None, format_http_date(LAST_MODIFIED), '"abc"', True),
+    (None, format_http_date(LAST_MODIFIED + timedelta(hours=1)), '"abc"', True),
+    (None, format_http_date(LAST_MODIFIED - timedelta(seconds=1)), '"abc"', False),
+    (None, "not a date", '"abc"', False),
+    (None, None, '"abc"', False),
+])
+def test_is_not_modified(if_none_match, if_modified_since, etag, expected):
+    assert is_not_modified(if_none_match, if_modified_since, etag, LAST_MODIFIED) is expected
+
+
+def test_stream_zip_builds_a_readable_archive():
+    big = os.urandom(3 * 1024 * 1024)
+    entries = [("a.txt", [b"hello ", b"world"]), ("empty.bin", []), ("big.bin", [big[:1024 * 1024], big[1024 * 1024:]])]
+
+    chunks = list(stream_zip(entries))
+
+    assert len(chunks) > 1
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.namelist() == ["a.txt", "empty.bin", "big.bin"]
+        assert archive.read("a.txt") == b"hello world"
+        assert archive.read("empty.bin") == b""
+        assert archive.read("big.bin") == big
+
+
+def test_stream_zip_reads_entries_lazily():
+    opened = []
+
+    def chunks(name):
+        opened.append(name)
+        yield name.encode()
+
+    archive = stream_zip((name, chunks(name)) for name in ["a", "b"])
+    next(archive)
+
+    assert opened == ["a"]
+
+
+@pytest.mark.parametrize("depth", [0, 1, 4])
+def test_prefetch_chunks_keeps_order(depth):
+    chunks = [bytes([i]) * 10 for i in range(20)]
+    assert list(prefetch_chunks(iter(chunks), depth)) == chunks
+
+
+def test_prefetch_chunks_raises_source_errors():
+    def failing():
+        yield b"a"
+        yield b"b"
+        raise OSError("connection reset")
+
+    received = []
+    with pytest.raises(OSError, match="connection reset"):
+        for chunk in prefetch_chunks(failing(), 2):
+            received.append(chunk)
+    assert received == [b"a", b"b"]
+
+
+def test_prefetch_chunks_stops_reading_once_closed():
+    produced = 0
+
+    def endless():
+        nonlocal produced
+        while True:
+            produced += 1
+            yield b"x"
+
+    chunks = prefetch_chunks(endless(), 2)
+    for _ in range(3):
+        next(chunks)
+    chunks.close()
+
+    time.sleep(0.3)
+    produced_after_close = produced
+    time.sleep(0.3)
+    # At most the chunks buffered ahead of the consumer are read
+    assert produced == produced_after_close
+    assert produced <= 3 + 2 + 1
+
+
+def test_lru_cache_evicts_least_recently_used():
+    evicted = []
+    cache = LRUCache(max_entries=2, on_evict=lambda key, value: evicted.append((key, value)))
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert evicted == [("b", 2)]
+    assert cache.stats() == {"size": 2, "hits": 3, "misses": 1, "evictions": 1}
+
+
+def test_lru_cache_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(helper_functions.time, "monotonic", lambda: now[0])
+    cache = LRUCache(ttl_seconds=10)
+    cache.put("a", 1)
+
+    now[0] += 9
+    assert cache.get("a") == 1
+    now[0] += 2
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_lru_cache_get_or_create_and_drain():
+    cache = LRUCache()
+    assert cache.get_or_create("a", lambda: 1) == 1
+    assert cache.get_or_create("a", lambda: 2) == 1
+    assert cache.pop("a") == 1
+    cache.put("b", 2)
+    cache.put("c", 3)
+
+    assert cache.drain() == [2, 3]
+    assert len(cache) == 0
+
+
+def _writer(content: bytes, calls: list | None = None):
+    def fetch(file):
+        if calls is not None:
+            calls.append(content)
+        file.write(content)
+    return fetch
+
+
+def test_disk_cache_serves_hits_for_the_same_etag(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1000)
+    calls = []
+
+    path = cache.get_or_fetch("k", "v1", 10, _writer(b"0123456789", calls))
+    assert cache.get_or_fetch("k", "v1", 10, _writer(b"other", calls)) == path
+    with open(path, "rb") as file:
+        assert file.read() == b"0123456789"
+
+    new_path = cache.get_or_fetch("k", "v2", 5, _writer(b"fresh", calls))
+    assert new_path != path
+    assert calls == [b"0123456789", b"fresh"]
+    assert cache.stats()["hits"] == 1
+
+
+def test_disk_cache_skips_content_larger_than_an_entry(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=800, max_entry_bytes=100)
+
+    assert cache.get_or_fetch("k", "v1", 101, _writer(b"x" * 101)) is None
+    # A size unknown up front is checked once fetched
+    assert cache.get_or_fetch("k", "v1", None, _writer(b"x" * 101)) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_disk_cache_keeps_pinned_files_until_released(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=100, max_entry_bytes=100)
+
+    first = cache.get_or_fetch("a", "v1", 60, _writer(b"a" * 60))
+    second = cache.get_or_fetch("b", "v1", 60, _writer(b"b" * 60))
+
+    assert cache.stats()["entries"] == 1
+    # Evicted while still being sent
+    assert os.path.exists(first)
+    cache.release(first)
+    assert not os.path.exists(first)
+
+    cache.release(second)
+    assert os.path.exists(second)
+    cache.invalidate("b")
+    assert not os.path.exists(second)
+
+
+def test_disk_cache_collapses_concurrent_misses(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1000)
+    calls = []
+    started = threading.Event()
+
+    def slow_fetch(file):
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        file.write(b"content")
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch("k", "v1", 7, slow_fetch)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert len(set(results)) == 1 and results[0] is not None
+
+
+def test_disk_cache_shared_resizes_in_place(tmp_path):
+    directory = str(tmp_path / "shared")
+    cache = DiskCache.shared(directory, 1000)
+    path = cache.get_or_fetch("k", "v1", 10, _writer(b"0123456789"))
+
+    assert DiskCache.shared(directory, 2000) is cache
+    assert cache.max_bytes == 2000
+    assert os.path.exists(path)
+    cache.release(path)
+
+
+@pytest.mark.skipif(os.name != "posix", reason="dead processes are only detected on POSIX")
+def test_disk_cache_removes_directories_of_dead_processes(tmp_path):
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    (tmp_path / str(exited.pid)).mkdir()
+    (tmp_path / str(exited.pid) / "stale").write_bytes(b"x")
+    (tmp_path / "not-a-pid").mkdir()
+
+    cache = DiskCache(str(tmp_path), max_bytes=1000)
+
+    assert sorted(os.listdir(tmp_path)) == sorted([str(os.getpid()), "not-a-pid"])
+    assert os.listdir(cache.directory) == []
+
+
+def test_document_location_generator_fills_sequence_folders(tmp_path, monkeypatch):
+    monkeypatch.setattr(DocumentLocationGenerator, "BASE_DOC_STORE_DIRECTORY", tmp_path)
+    generator = DocumentLocationGenerator(file_limit=2)
+    document = SimpleNamespace(created_at=LAST_MODIFIED)
+    hour_directory = os.path.join(tmp_path, "2024", "5", "6", "7")
+
+    locations = [generator.generate_doc_location(document) for _ in range(3)]
+
+    assert locations == [os.path.join(hour_directory, "0001")] * 2 + [os.path.join(hour_directory, "0002")]
+    assert all(os.path.isdir(location) for location in locations)
+
+
+def test_document_location_generator_resumes_from_disk(tmp_path, monkeypatch):
+    monkeypatch.setattr(DocumentLocationGenerator, "BASE_DOC_STORE_DIRECTORY", tmp_path)
+    full_folder = tmp_path / "2024" / "5" / "6" / "7" / "0003"
+    full_folder.mkdir(parents=True)
+    for name in ["a", "b"]:
+        (full_folder / name).write_bytes(b"x")
+
+    location = DocumentLocationGenerator(file_limit=2).generate_doc_location(SimpleNamespace(created_at=LAST_MODIFIED))
+
+    assert location == os.path.join(full_folder.parent, "0004")
+
+
+def test_document_location_generator_requires_a_document():
+    with pytest.raises(ValueError):
+        DocumentLocationGenerator().generate_doc_location(None)
@@ -0,0 +1,20 @@
+from datetime import datetime
+from uuid import UUID
+from pydantic import BaseModel
+
+
+class UploadSession(BaseModel):
+    """
+    A resumable upload of a document's content in numbered chunks.
+    Chunk n covers bytes [n * chunk_size, (n + 1) * chunk_size) of the file; only the last one may be shorter.
+    received_ranges lists the bytes stored so far as merged (first, last) byte positions, both inclusive.
+    """
+
+    upload_id: UUID
+    document_id: UUID
+    filename: str
+    size: int
+    chunk_size: int
+    chunk_count: int
+    received_ranges: list[tuple[int, int]] = []
+    expires_at: datetime
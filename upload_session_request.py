@@ -0,0 +1,10 @@
+from pydantic import BaseModel, Field
+
+
+class UploadSessionRequest(BaseModel):
+    """
+    Names and sizes the file a client uploads in chunks through an upload session.
+    """
+
+    filename: str
+    size: int = Field(ge=0)